@@ -1,3 +1,8 @@
+import os
 from pathlib import Path
 
-GAME_DIR: Path = Path("D:/SteamLibrary/steamapps/common/KingdomComeDeliverance2")
\ No newline at end of file
+# KCD2_GAME_DIR points the build at another install, such as one from scripts.synthetic_install
+GAME_DIR: Path = Path(os.environ.get("KCD2_GAME_DIR", "D:/SteamLibrary/steamapps/common/KingdomComeDeliverance2"))
+
+# Build caches that can be deleted at any time to force a full rebuild
+CACHE_DIR: Path = Path(__file__).resolve().parent.parent / "data/cache"
@@ -1,13 +1,25 @@
 import os
 import json
+import argparse
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import xml.etree.ElementTree as ET
 from collections import OrderedDict
 from utils.logger import logger
-from services.data_extract import data_extract
-from services.helper import load_json, save_json, parse_xml, load_data_json, save_data_json, ensure_file_exists, should_filter_item, extract_data, get_subcategory
-from templates.data_json_mappings import construct_item_data, item_stats_mapping, item_attr_mapping, stat_transform, attr_transform
+from services.data_extract import start_data_extract
+from services.pak_extractor import DEFAULT_WORKERS, DEFAULT_MEMORY_CAP
+from scripts.extract_icon import DEFAULT_CONVERT_WORKERS
+from services.build_context import BuildContext
+from services.helper import load_json, save_json, parse_xml
+from services.item_parser import parse_item_files
+from services.localization_index import load_localization_index
+from services.icon_atlas import build_icon_atlases, DEFAULT_ATLAS_SHEETS
+from services.data_shards import write_data_shards
+from services.sqlite_export import export_sqlite
+from services.stage_cache import Stage, StageCache
+from services.stage_scheduler import run_stages
+from services.metrics import Metrics, PROFILERS, set_metrics, track
+from services.output_formats import write_outputs, parse_output_formats, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMATS
 
 def get_version_info(data_dir: Path) -> str:
     """
@@ -47,24 +59,28 @@ def get_version_info(data_dir: Path) -> str:
     logger.info(f"New version {new_version} detected. Created directory: {new_version_dir}")
     return new_version
 
-def export_versioned_data(kcd2_xmls: Dict[str, str], kcd2_icons: Dict[str, str], output_dir: Path) -> None:
+def export_versioned_data(
+    kcd2_xmls: Dict[str, str],
+    kcd2_icons: Dict[str, str],
+    output_dir: Path,
+    formats: Sequence[str] = DEFAULT_OUTPUT_FORMATS
+) -> None:
     """
-    Save kcd2_xmls and kcd2_icons to the versioned output directory.
+    Save kcd2_xmls and kcd2_icons to the versioned output directory, in every requested format.
     """
     kcd2_xmls_file = output_dir / "kcd2_xmls.json"
     kcd2_icons_file = output_dir / "kcd2_icons.json"
 
     # Save XMLs and icons data
     for data, file, label in [(kcd2_xmls, kcd2_xmls_file, "kcd2_xmls"), (kcd2_icons, kcd2_icons_file, "kcd2_icons")]:
-        with open(file, 'w') as f:
-            json.dump(data, f, indent=4)
-        logger.info(f"Saved {label} to {os.path.relpath(file)}")
+        written = write_outputs(data, file, formats)
+        logger.info(f"Saved {label} to {', '.join(os.path.relpath(path) for path in written)}")
 
-def initialize_data_json(version: str, output_dir: Path) -> Path:
+def initialize_data_json(version: str, output_dir: Path, formats: Sequence[str] = DEFAULT_OUTPUT_FORMATS) -> BuildContext:
     """
-    Create a new data.json file using the base_data.json template.
+    Create a new in-memory data.json document using the base_data.json template.
     """
-    logger.info("Initializing a new data.json file from base_data.json...")
+    logger.info("Initializing a new data.json document from base_data.json...")
 
     # Path to the base_data.json template
     base_data_file = Path(__file__).resolve().parent / "templates/base_data.json"
@@ -80,15 +96,9 @@ def initialize_data_json(version: str, output_dir: Path) -> Path:
     # Update the version in the data structure
     base_data["version"]["base"] = version
 
-    # Save the new data.json file
-    data_json_file = output_dir / "data.json"
-    with open(data_json_file, 'w') as f:
-        json.dump(base_data, f, indent=4)
+    return BuildContext(version, output_dir, base_data, formats)
 
-    logger.info(f"New data.json created at {os.path.relpath(data_json_file)}")
-    return data_json_file
-
-def xml_equipment_slot(kcd2_xmls, output_dir):
+def xml_equipment_slot(kcd2_xmls, ctx):
     """Process equipment slot XML data and populate the Armor item_type in data.json."""
     logger.info("Processing equipment slot XML data...")
 
@@ -128,12 +138,10 @@ def xml_equipment_slot(kcd2_xmls, output_dir):
     # Sort armor slots by ID
     armor_types = sorted(armor_types, key=lambda x: x["Id"])
 
-    # Load and update data.json
-    data, data_json_path = load_data_json(output_dir)
-    data["armor_types"] = armor_types
-    save_data_json(data, data_json_path)
+    # Update the build document
+    ctx.data["armor_types"] = armor_types
 
-def xml_weapon_info(kcd2_xmls, output_dir):
+def xml_weapon_info(kcd2_xmls, ctx):
     """Process weapon XML data and populate the Weapons item_type in data.json."""
     logger.info("Processing weapon XML data...")
 
@@ -165,12 +173,10 @@ def xml_weapon_info(kcd2_xmls, output_dir):
         key=lambda x: x["id"]
     )
 
-    # Load and update data.json
-    data, data_json_path = load_data_json(output_dir)
-    data["weapon_types"] = weapon_types
-    save_data_json(data, data_json_path)
+    # Update the build document
+    ctx.data["weapon_types"] = weapon_types
 
-def xml_dice(kcd2_xmls, output_dir):
+def xml_dice(kcd2_xmls, ctx):
     """Process dice badge XML data and populate the Dice item_type in data.json."""
     logger.info("Processing dice badge XML data...")
 
@@ -188,34 +194,25 @@ def xml_dice(kcd2_xmls, output_dir):
         for subtype in dice_badge_subtype_root.findall(".//dice_badge_subtype")
     }
 
-    # Load and update data.json
-    data, data_json_path = load_data_json(output_dir)
-    data["dice_badges"]["types"] = dice_badge_types
-    data["dice_badges"]["subtypes"] = dice_badge_subtypes
-    save_data_json(data, data_json_path)
+    # Update the build document
+    ctx.data["dice_badges"]["types"] = dice_badge_types
+    ctx.data["dice_badges"]["subtypes"] = dice_badge_subtypes
 
 from collections import OrderedDict  # Add this import at the top of the file
 from typing import Dict, List
 
-def xml_items(kcd2_xmls: Dict[str, str], output_dir: Path) -> None:
-    """Process item XML data and populate the Items category in data.json."""
-    logger.info("Processing item XML data...")
-
-    # Explicitly list the IDs of relevant item XML files
-    item_files = ["item", "item_dlc", "item_horse", "item_reward", "item_rewards"]
-
-    # Load existing data.json to get the list of categories and armor_types
-    data_json_path = output_dir / "data.json"
-    ensure_file_exists(data_json_path, "data.json")
-
-    with open(data_json_path, 'r') as f:
-        data = json.load(f)
+# IDs of the relevant item XML files
+ITEM_FILES = ["item", "item_dlc", "item_horse", "item_reward", "item_rewards"]
 
-    # Use the categories list as a filter
-    valid_categories = set(data["categories"])
+def xml_items(kcd2_xmls: Dict[str, str], ctx: BuildContext, workers: int = 1) -> None:
+    """
+    Process item XML data and populate the Items category in data.json.
+    With `workers` > 1 the item files are parsed in chunks on a process pool.
+    """
+    logger.info("Processing item XML data...")
 
-    # Load armor_types into a list of dictionaries
-    armor_types = data.get("armor_types", [])
+    # Use the build document for the list of categories and armor_types
+    data = ctx.data
 
     # Dictionary to store items by subcategory
     categorized_items: Dict[str, List[dict]] = {
@@ -233,29 +230,20 @@ def xml_items(kcd2_xmls: Dict[str, str], output_dir: Path) -> None:
     if not text_ui_items_path.exists():
         raise FileNotFoundError(f"text_ui_items.xml not found: {os.path.relpath(text_ui_items_path)}")
 
-    text_ui_root = parse_xml(text_ui_items_path)
-    text_ui_mapping = {}
-    for row in text_ui_root.findall(".//Row"):
-        if all(row.find(f"Cell[{i}]") is not None for i in [1, 2, 3]):
-            ui_name = row.find("Cell[1]").text
-            item_name = row.find("Cell[3]").text
-            alt_name = row.find("Cell[2]").text
-
-            if not item_name or not alt_name:
-                logger.warning(f"UIName '{ui_name}' has missing ItemName or AltName.")
-
-            text_ui_mapping[ui_name] = {
-                "ItemName": item_name,
-                "AltName": alt_name
-            }
+    localization = load_localization_index(text_ui_items_path)
+    text_ui_mapping = localization.mapping
+    if localization.missing:
+        logger.warning(f"{len(localization.missing)} UINames have a missing ItemName or AltName.")
+        logger.debug(f"UINames with a missing ItemName or AltName: {', '.join(map(str, localization.missing))}")
 
     # Collect missing files
-    missing_files = [file_key for file_key in item_files if file_key not in kcd2_xmls]
+    missing_files = [file_key for file_key in ITEM_FILES if file_key not in kcd2_xmls]
     if missing_files:
         logger.warning(f"Missing files: {', '.join(missing_files)}. Skipping...")
 
-    # Process each relevant item file
-    for file_key in item_files:
+    # Collect the relevant item files that exist on disk
+    item_paths = []
+    for file_key in ITEM_FILES:
         if file_key not in kcd2_xmls:
             continue  # Skip missing files
 
@@ -264,64 +252,101 @@ def xml_items(kcd2_xmls: Dict[str, str], output_dir: Path) -> None:
             logger.warning(f"File {os.path.relpath(file_path)} does not exist. Skipping...")
             continue
 
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-
-            # Extract items from <ItemClasses>
-            for item in root.findall(".//ItemClasses/*"):
-                # Handle regular items
-                if item.tag in valid_categories:
-                    if should_filter_item(item):
-                        continue
-
-                    # Determine the item type and subcategory
-                    item_type = "Armor" if item.tag in ["Hood", "Helmet"] else item.tag
-                    subcategory = get_subcategory(item_type)
-
-                    if subcategory is None:
-                        logger.warning(f"Unknown item type: {item_type}. Skipping...")
-                        continue
-
-                    # Extract attributes and stats
-                    attributes = extract_data(item, item_type, item_attr_mapping, attr_transform, data)
-                    stats = extract_data(item, item_type, item_stats_mapping, stat_transform, data)
-
-                    # Assign Type for Armor items based on filters
-                    if item_type == "Armor":
-                        item_name = attributes.get("Name", "").lower()
-                        for armor_type in armor_types:
-                            for filter_ in armor_type.get("filters", []):
-                                if filter_.lower() in item_name:
-                                    attributes["Type"] = armor_type["Id"]
-                                    break
-                            if "Type" in attributes:  # Stop searching once a match is found
-                                break
-
-                    # Use the centralized function to construct item_data
-                    item_data = construct_item_data(item, attributes, stats, text_ui_mapping)
-
-                    # Add the item to the appropriate subcategory and lookup dictionary
-                    categorized_items[subcategory].append(item_data)
-                    item_lookup[item_data["Id"]] = item_data
-
-            logger.info(f"Processed items from {file_key} ({os.path.relpath(file_path)})")
-        except ET.ParseError as e:
-            logger.warning(f"Failed to parse {file_key} ({os.path.relpath(file_path)}): {e}")
-
-    # Update the Items category in data.json
-    data["items"] = categorized_items
+        item_paths.append((file_key, file_path))
+
+    # Parse and transform the item files, merging them back in file order
+    file_results, armor_stats = parse_item_files(item_paths, data, text_ui_mapping, workers)
+    for file_key, file_path in item_paths:
+        file_items = file_results[file_key]
+        if file_items is None:
+            continue  # Parse failure, already logged
 
-    # Save updated data.json
-    with open(data_json_path, 'w') as f:
-        json.dump(data, f, indent=4)
+        # Add the items to the appropriate subcategory and lookup dictionary
+        for subcategory, item_data in file_items:
+            categorized_items[subcategory].append(item_data)
+            item_lookup[item_data["Id"]] = item_data
+
+        logger.info(f"Processed items from {file_key} ({os.path.relpath(file_path)})")
+
+    # Report armor classification so misclassified armors can be spotted
+    logger.info(f"Armor types: {armor_stats.summary(data.get('armor_types', []))}")
+    if armor_stats.unmatched:
+        logger.debug(f"Armors without an armor type: {', '.join(sorted(armor_stats.unmatched))}")
+
+    # Update the Items category in the build document
+    data["items"] = categorized_items
 
-    logger.info(f"Items data updated in {os.path.relpath(data_json_path)}")
+    logger.info(f"Items data updated ({sum(len(items) for items in categorized_items.values())} items)")
 
-def main():
+def build_stages(workers: int = 1) -> List[Stage]:
+    """
+    The XML build stages, with the kcd2_xmls entries they parse and the data.json keys they touch.
+    The keys a stage reads decide what it waits for; stages are merged into data.json in this order.
+    """
+    return [
+        Stage("equipment_slot", xml_equipment_slot, inputs=("equipment_slot",), writes=("armor_types",)),
+        Stage("weapon_info", xml_weapon_info, inputs=("weapon_class", "ammo_class"), writes=("weapon_types",)),
+        Stage("dice", xml_dice, inputs=("dice_badge_type", "dice_badge_subtype"), writes=("dice_badges",)),
+        Stage(
+            "items",
+            lambda kcd2_xmls, ctx: xml_items(kcd2_xmls, ctx, workers),
+            inputs=(*ITEM_FILES, "text_ui_items"),
+            writes=("items",),
+            # Armor items are classified with the armor_types of xml_equipment_slot
+            reads=("categories", "armor_types")
+        ),
+    ]
+
+def output_formats_arg(value: str) -> List[str]:
+    """argparse type for --output-formats."""
+    try:
+        formats = parse_output_formats(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    if not formats:
+        raise argparse.ArgumentTypeError("at least one output format is required")
+    return formats
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the build command line options."""
+    parser = argparse.ArgumentParser(description="Build data.json from a Kingdom Come: Deliverance 2 install.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used to parse the item tables (default: 1, 0 uses every core)")
+    parser.add_argument("--extract-workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"threads copying members out of the .pak files (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--extract-memory-mb", type=int, default=DEFAULT_MEMORY_CAP // (1024 * 1024),
+                        help=f"memory cap for buffered .pak reads in MB (default: {DEFAULT_MEMORY_CAP // (1024 * 1024)})")
+    parser.add_argument("--convert-workers", type=int, default=DEFAULT_CONVERT_WORKERS,
+                        help=f"processes converting DDS icons to WEBP (default: {DEFAULT_CONVERT_WORKERS})")
+    parser.add_argument("--atlas-sheets", type=int, default=DEFAULT_ATLAS_SHEETS,
+                        help=f"icon atlas sheets per item subcategory (default: {DEFAULT_ATLAS_SHEETS}, 0 skips the atlases)")
+    parser.add_argument("--output-formats", type=output_formats_arg, default=list(DEFAULT_OUTPUT_FORMATS),
+                        help=f"comma separated formats for data.json and the kcd2 indexes, from {', '.join(OUTPUT_FORMATS)} "
+                             f"(default: {','.join(DEFAULT_OUTPUT_FORMATS)})")
+    parser.add_argument("--texconv", default=None,
+                        help="command used to run texconv, e.g. \"wine texconv.exe\" (default: src/bin/texconv.exe)")
+    parser.add_argument("--concurrent-extract", action="store_true",
+                        help="extract the XMLs and icons at the same time, each with half of the memory cap")
+    parser.add_argument("--stage-workers", type=int, default=0,
+                        help="threads running independent build stages at the same time (default: 0, one per stage; "
+                             "1 runs them one at a time, as the benchmark does to measure each stage on its own)")
+    parser.add_argument("--profile-stage", default=None,
+                        help="profile one stage, e.g. pak_scan, pak_extract, dds_convert, dds_unsplit, texconv, "
+                             "xml_extraction, icon_extraction or build:items; saved under <version>/profiles. Only the "
+                             "thread running the stage is profiled, so use one worker to profile the work of pooled stages")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile",
+                        help="cprofile writes a .prof for pstats/snakeviz, sample writes collapsed stacks for flame graphs (default: cprofile)")
+    parser.add_argument("--force", action="store_true",
+                        help="rerun every build stage instead of reusing cached output for unchanged inputs")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
     """
     Main function to orchestrate the build process.
     """
+    args = parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+
     # Define base paths
     base_dir = Path(__file__).resolve().parent.parent  # Root directory: kcd-extract/
     data_dir = base_dir / "src/data"  # Data directory: /src/data
@@ -330,21 +355,64 @@ def main():
     version = get_version_info(data_dir)
     output_dir = data_dir / version
 
-    # Run and save data extraction
-    kcd2_xmls, kcd2_icons = data_extract()
-    export_versioned_data(kcd2_xmls, kcd2_icons, output_dir)
-
-    # Initialize a new data.json file
-    data_json_path = initialize_data_json(version, output_dir)
-
-    # Process XML data
-    xml_equipment_slot(kcd2_xmls, output_dir)
-    xml_weapon_info(kcd2_xmls, output_dir)
-    xml_dice(kcd2_xmls, output_dir)
-    xml_items(kcd2_xmls, output_dir)
+    # Record per-stage metrics, written to metrics.json even when the build fails
+    metrics = set_metrics(Metrics(args.profile_stage, args.profiler, output_dir / "profiles"))
+    try:
+        data_json_path = build(args, workers, version, output_dir)
+    except BaseException:
+        metrics.save(output_dir / "metrics.json", version=version, status="failed")
+        raise
+    metrics.save(output_dir / "metrics.json", version=version, status="succeeded")
+    if args.profile_stage and not metrics.profiles:
+        logger.warning(f"No stage named {args.profile_stage} ran, so nothing was profiled")
 
     # Log completion
     logger.info(f"Build process completed successfully. data.json created at {os.path.relpath(data_json_path)}")
 
+def build(args: argparse.Namespace, workers: int, version: str, output_dir: Path) -> Path:
+    """Run every build stage for `version` and return the path of the saved data.json."""
+    # Run data extraction; with --concurrent-extract the icons keep converting while the XML stages run
+    extraction = start_data_extract(
+        args.extract_workers, args.extract_memory_mb * 1024 * 1024, args.convert_workers, args.texconv, args.concurrent_extract
+    )
+    try:
+        kcd2_xmls = extraction.xmls()
+
+        # Initialize a new data.json document
+        ctx = initialize_data_json(version, output_dir, args.output_formats)
+
+        # Process XML data, skipping the stages whose inputs are unchanged since the last build
+        run_stages(build_stages(workers), kcd2_xmls, ctx, StageCache(force=args.force), args.stage_workers or None)
+    except BaseException:
+        extraction.close()  # Do not leave the icons converting after the build has failed
+        raise
+
+    # Save the extracted XMLs and icons once both sides are done
+    kcd2_xmls, kcd2_icons = extraction.finish()
+    with track("export_versioned_data"):
+        export_versioned_data(kcd2_xmls, kcd2_icons, output_dir, args.output_formats)
+
+    item_count = sum(len(items) for items in ctx.data["items"].values())
+
+    # Pack the item icons into atlas sheets
+    if args.atlas_sheets > 0:
+        with track("icon_atlases", items=item_count):
+            build_icon_atlases(ctx.data["items"], kcd2_icons, output_dir, args.atlas_sheets)
+
+    # Write data.json once, after every stage has succeeded
+    with track("save_data_json", items=item_count) as record:
+        data_json_path = ctx.save()
+        record["bytes"] = data_json_path.stat().st_size
+
+    # Split data.json into shards clients can fetch separately
+    with track("data_shards", items=item_count):
+        write_data_shards(ctx.data, output_dir)
+
+    # Export an indexed SQLite copy for querying
+    with track("sqlite_export", items=item_count) as record:
+        record["bytes"] = export_sqlite(ctx.data, output_dir).stat().st_size
+
+    return data_json_path
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Microbenchmark for the compiled extraction plans against extract_data.
+
+Run from the src directory:
+    python -m scripts.bench_extraction_plans
+"""
+import argparse
+import timeit
+import xml.etree.ElementTree as ET
+from typing import List, Tuple
+from utils.logger import logger
+from services.helper import extract_data
+from services.extraction_plan import compile_item_plans
+from templates.data_json_mappings import item_attr_mapping, item_stats_mapping, attr_transform, stat_transform
+
+# Representative attributes per item_type, shaped like the game's item tables
+SAMPLE_ITEMS = {
+    "MeleeWeapon": {
+        "Id": "000a72ec-f904-4e06-8c57-2eac8ab6ec73", "Name": "shieldCuman_06", "IconId": "shieldCuman_06",
+        "UIInfo": "ui_in_shieldCuman", "UIName": "ui_nm_shieldKiteCuman", "Class": "8", "Skill": "shield",
+        "EquipSlot": "Shield", "Weight": "7.5", "Price": "1300", "MaxQuality": "1", "MaxStatus": "33", "StrReq": "0",
+        "AgiReq": "0", "Charisma": "5", "Conspicuousness": "1", "Visibility": "1", "Attack": "0", "AttackModStab": "0",
+        "AttackModSlash": "0", "AttackModSmash": "0", "Defense": "250"
+    },
+    "Armor": {
+        "Id": "0027df44-5f9c-4c92-9f81-a83ca124c4a8", "Name": "Hood07_m04_C", "IconId": "Hood07_m04_C",
+        "UIInfo": "ui_in_hood07", "UIName": "ui_nm_hood07_m01", "Clothing": "Hood07_m04", "Weight": "0.7",
+        "Price": "1620", "MaxQuality": "4", "MaxStatus": "15", "StrReq": "0", "Charisma": "30",
+        "Conspicuousness": "0.32", "Noise": "0.1", "Visibility": "0.82", "DefenseStab": "2", "DefenseSlash": "3",
+        "DefenseSmash": "5"
+    },
+    "Die": {
+        "Id": "06d3757e-2882-4d75-99f9-1008a4e9d2d1", "Name": "dieUnbalanced", "IconId": "die_b",
+        "UIInfo": "ui_in_dieUnbalanced", "UIName": "ui_nm_dieUnbalanced", "Weight": "0.1", "Price": "100",
+        "SideWeights": "3 4 1 1 2 1", "SideValues": "0 1 2 3 4 5", "Material": "wood"
+    },
+    "DiceBadge": {
+        "Id": "0e292c1d-5d8b-4030-9b47-9dfc0779b095", "Name": "RerollPipsBadgeSilver", "IconId": "RerollPipsBadgeSilver",
+        "UIInfo": "ui_reroll_pips_silver", "UIName": "ui_mn_reroll_pips_dice_badge_silver", "Type": "1",
+        "SubType": "10", "Weight": "0", "Price": "2100"
+    }
+}
+
+def build_items(count: int) -> List[Tuple[str, ET.Element]]:
+    """Create `count` item elements cycling through the sample item_types."""
+    samples = list(SAMPLE_ITEMS.items())
+    return [
+        (item_type, ET.Element(item_type, attributes))
+        for item_type, attributes in (samples[i % len(samples)] for i in range(count))
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extract_data with the compiled extraction plans.")
+    parser.add_argument("--items", type=int, default=2000, help="items per timed run (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per extractor, best is reported (default: 5)")
+    args = parser.parse_args()
+
+    items = build_items(args.items)
+    data: dict = {}
+    plans = compile_item_plans()
+
+    def run_extract_data():
+        return [
+            (extract_data(item, item_type, item_attr_mapping, attr_transform, data),
+             extract_data(item, item_type, item_stats_mapping, stat_transform, data))
+            for item_type, item in items
+        ]
+
+    def run_plans():
+        return [
+            (plans[item_type][0].extract(item, data), plans[item_type][1].extract(item, data))
+            for item_type, item in items
+        ]
+
+    # The plans must be a drop-in replacement, including key order
+    if [list(a.items()) + list(s.items()) for a, s in run_extract_data()] != [list(a.items()) + list(s.items()) for a, s in run_plans()]:
+        logger.error("Compiled plans do not match extract_data output")
+        raise SystemExit(1)
+
+    baseline = min(timeit.repeat(run_extract_data, number=1, repeat=args.repeat))
+    compiled = min(timeit.repeat(run_plans, number=1, repeat=args.repeat))
+    logger.info(f"extract_data:   {baseline / args.items * 1e6:8.2f} us/item")
+    logger.info(f"compiled plans: {compiled / args.items * 1e6:8.2f} us/item")
+    logger.info(f"speedup:        {baseline / compiled:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+End-to-end benchmark of the extraction and build stages against a synthetic install.
+
+    python -m scripts.benchmark --items 20000 --icons 2000
+
+Generates an install with scripts.synthetic_install, copies the code to a scratch workspace (so
+src/data is never touched) and runs every stage there twice: a cold pass on an empty workspace and
+a warm pass that should find everything up to date. Every stage tracked by services.metrics
+(pak scans, extraction, DDS conversion, the build stages...) records wall and CPU time, peak RSS
+and items/s or MB/s. The report is saved under src/data/benchmarks and appended to
+history.jsonl there, to track regressions across commits.
+"""
+import os
+import sys
+import json
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from utils.logger import logger
+from services.helper import atomic_write
+
+# Define base paths
+base_dir = Path(__file__).resolve().parent.parent.parent
+src_dir = base_dir / 'src'
+benchmarks_dir = src_dir / 'data/benchmarks'
+
+PASSES = ["cold", "warm"]
+
+def run_pass(game_dir: Path, workers: int, convert_workers: int, texconv: Optional[str]) -> dict:
+    """
+    One benchmark pass, run inside the workspace: main's build with the build stages run one at a time,
+    so each is measured on its own, recorded with services.metrics. Modules are imported here so they
+    resolve their paths inside the workspace.
+    """
+    import main
+    from services.metrics import Metrics, set_metrics
+
+    argv = ["--workers", str(workers), "--convert-workers", str(convert_workers), "--stage-workers", "1"]
+    if texconv:
+        argv += ["--texconv", texconv]
+    args = main.parse_args(argv)
+
+    metrics = set_metrics(Metrics())
+    data_dir = Path(main.__file__).resolve().parent / 'data'
+    version = main.get_version_info(data_dir)
+    output_dir = data_dir / version
+    main.build(args, args.workers or os.cpu_count() or 1, version, output_dir)
+
+    with open(output_dir / "kcd2_icons.json") as f:
+        icon_count = len(json.load(f))
+    item_count = next(record["items"] for record in metrics.records if record["name"] == "save_data_json")
+    return metrics.to_dict(items=item_count, icons=icon_count)
+
+def copy_workspace(workspace: Path, game_dir: Path) -> None:
+    """
+    Copy the code, without data, logs or caches, to workspace/src. main reads the version before
+    extraction updates version.json, so the workspace starts with the install's, like a checkout does.
+    """
+    shutil.copytree(src_dir, workspace / 'src', ignore=shutil.ignore_patterns('data', 'logs', 'bin', '__pycache__'))
+    (workspace / 'src/data').mkdir()
+    shutil.copy(game_dir / 'whdlversions.json', workspace / 'src/data/version.json')
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=base_dir, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+def _megabytes(value: Optional[float]) -> str:
+    """A peak RSS for the table; n/a where it is not measured, as on Windows."""
+    return "n/a" if value is None else f"{value:.1f}"
+
+def summary_table(report: dict) -> str:
+    lines = [
+        f"{'Benchmark':^92}",
+        f"{'=' * 92}",
+        f"{'Pass':<6}{'Stage':<26}{'Runs':>6}{'Wall s':>10}{'CPU s':>10}{'Peak MB':>10}{'Items/s':>13}{'MB/s':>11}",
+        f"{'-' * 92}",
+    ]
+    for pass_name, result in report["passes"].items():
+        for name, stage in result["summary"].items():
+            lines.append(
+                f"{pass_name:<6}{name:<26}{stage['runs']:>6}{stage['seconds']:>10.3f}{stage['cpu_seconds']:>10.3f}"
+                f"{_megabytes(stage['peak_rss_mb']):>10}{stage.get('items_per_s', ''):>13}{stage.get('mb_per_s', ''):>11}"
+            )
+        lines.append(f"{pass_name:<6}{'total':<26}{'':>6}{result['total_seconds']:>10.3f}{'':>10}{_megabytes(result['peak_rss_mb']):>10}")
+    lines.append(f"{'=' * 92}")
+    return "\n".join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the benchmark command line options."""
+    parser = argparse.ArgumentParser(description="Benchmark data extraction and the build stages on a synthetic install.")
+    parser.add_argument("--items", type=int, default=20000, help="items in the synthetic install (default: 20000)")
+    parser.add_argument("--icons", type=int, default=2000, help="icons in the synthetic install (default: 2000)")
+    parser.add_argument("--icon-size", type=int, default=128, help="icon width and height in pixels (default: 128)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the synthetic install (default: 1)")
+    parser.add_argument("--workers", type=int, default=1, help="processes parsing the item tables (default: 1)")
+    parser.add_argument("--convert-workers", type=int, default=os.cpu_count() or 1,
+                        help="processes converting icons (default: one per core)")
+    parser.add_argument("--texconv", default=None, help="texconv command, for icons Pillow cannot decode")
+    parser.add_argument("--workdir", type=Path, default=None,
+                        help="where to put the install and workspace (default: a temp directory, removed afterwards)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="report file (default: src/data/benchmarks/benchmark_<timestamp>.json)")
+    parser.add_argument("--history", type=Path, default=benchmarks_dir / "history.jsonl",
+                        help="JSON lines file each report is appended to (default: src/data/benchmarks/history.jsonl)")
+    # Internal: run one pass inside the workspace and write its result to this file
+    parser.add_argument("--run-pass", type=Path, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    """Run from the src directory: python -m scripts.benchmark --items 20000 --icons 2000"""
+    args = parse_args(argv)
+    if args.run_pass:
+        result = run_pass(Path(os.environ["KCD2_GAME_DIR"]), args.workers, args.convert_workers, args.texconv)
+        with atomic_write(args.run_pass) as f:
+            json.dump(result, f)
+        return
+
+    from scripts.synthetic_install import generate_install
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="kcd-benchmark-"))
+    try:
+        game_dir = workdir / 'game'
+        workspace = workdir / 'workspace'
+        if workspace.exists():
+            shutil.rmtree(workspace)
+        scale = generate_install(game_dir, args.items, args.icons, args.icon_size, seed=args.seed)
+        copy_workspace(workspace, game_dir)
+
+        report: dict = {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "commit": git_commit(),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+            "scale": scale,
+            "settings": {"workers": args.workers, "convert_workers": args.convert_workers},
+            "passes": {}
+        }
+        # Each pass is a fresh interpreter in the workspace, so module paths point there and memory starts clean
+        env = {**os.environ, "KCD2_GAME_DIR": str(game_dir), "PYTHONPATH": str(workspace / 'src')}
+        env.pop("KCD_EXTRACT_LOG_OWNER", None)
+        for pass_name in PASSES:
+            logger.info(f"Running the {pass_name} benchmark pass...")
+            result_file = workdir / f"{pass_name}.json"
+            command = [
+                sys.executable, "-m", "scripts.benchmark", "--run-pass", str(result_file),
+                "--workers", str(args.workers), "--convert-workers", str(args.convert_workers)
+            ]
+            if args.texconv:
+                command += ["--texconv", args.texconv]
+            with open(workdir / f"{pass_name}.log", 'w') as log_file:
+                completed = subprocess.run(command, cwd=workspace, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+            if completed.returncode != 0:
+                raise RuntimeError(f"The {pass_name} benchmark pass failed, see {workdir / f'{pass_name}.log'}")
+            with open(result_file) as f:
+                report["passes"][pass_name] = json.load(f)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or benchmarks_dir / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(output) as f:
+        json.dump(report, f, indent=4)
+    args.history.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(report, separators=(',', ':')) + "\n")
+
+    logger.info("\n" + summary_table(report))
+    logger.info(f"Benchmark report saved at {os.path.relpath(output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import json
+import argparse
+from pathlib import Path
+from typing import List, Optional
+from utils.logger import logger
+from services.helper import atomic_write
+from services.version_diff import diff_versions, diff_to_markdown
+
+# Define base paths
+base_dir = Path(__file__).resolve().parent.parent.parent
+data_dir = base_dir / 'src/data'
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the diff command line options."""
+    parser = argparse.ArgumentParser(description="Compare the build output of two game versions.")
+    parser.add_argument("old", help="old version, as named under src/data (e.g. 1.1)")
+    parser.add_argument("new", help="new version, as named under src/data (e.g. 1.2)")
+    parser.add_argument("--output-dir", type=Path, default=None,
+                        help="where to write the changelogs (default: the new version's directory)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Diff two versioned outputs and write changelog_<old>_<new>.json and .md.
+    Run from the src directory: python -m scripts.diff_versions 1.1 1.2
+    """
+    args = parse_args(argv)
+    old_dir, new_dir = data_dir / args.old, data_dir / args.new
+    for version_dir in (old_dir, new_dir):
+        if not version_dir.is_dir():
+            raise FileNotFoundError(f"Version directory not found: {os.path.relpath(version_dir)}")
+
+    diff = diff_versions(old_dir, new_dir)
+    output_dir = args.output_dir or new_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Versions contain dots, so the suffixes are appended rather than set with with_suffix
+    changelog_name = f"changelog_{args.old}_{args.new}"
+
+    with atomic_write(output_dir / f"{changelog_name}.json", encoding='utf-8') as f:
+        json.dump(diff, f, indent=4, ensure_ascii=False)
+    with atomic_write(output_dir / f"{changelog_name}.md", encoding='utf-8') as f:
+        f.write(diff_to_markdown(diff))
+
+    items = diff["items"]
+    logger.info(
+        f"{args.old} -> {args.new}: {len(items['added'])} items added, {len(items['removed'])} removed, "
+        f"{len(items['changed'])} changed. Changelogs saved at {os.path.relpath(output_dir / changelog_name)}.json/.md"
+    )
+
+if __name__ == "__main__":
+    main()
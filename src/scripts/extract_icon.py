@@ -1,29 +1,47 @@
+import io
 import os
+import hashlib
 import re
 import shutil
-import zipfile
-import subprocess
 import json
 from PIL import Image
 from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from constants.dir_constants import GAME_DIR
+from services.pak_index import load_pak_index, read_member
+from services.pak_extractor import PakExtractor, DEFAULT_WORKERS, DEFAULT_MEMORY_CAP
+from services.extract_manifest import ExtractManifest
+from services.helper import atomic_write, process_pool_context
+from services.converter_backend import TexconvConverter
+from services.dds_split import merge_split_dds, split_part_number
+from services.metrics import track
 
 # Define paths
 compressed_icons_file = GAME_DIR / 'Data' / 'IPL_GameData.pak'
 
 # Define base paths
 base_dir = Path(__file__).resolve().parent.parent.parent
-dds_unsplitter_file = base_dir / 'src/bin/DDS-Unsplitter.exe'
-texconv_file = base_dir / 'src/bin/texconv.exe'  # Path to texconv.exe
+texconv_file = base_dir / 'src/bin/texconv.exe'  # Default texconv; process_icons takes another command, e.g. a stand-in script
 
 output_dir = base_dir / 'src/data/icons'
 temp_dds_dir = output_dir / 'temp'
 conv_dds_dir = temp_dds_dir / 'conv'
+manifest_file = output_dir / '.extract_manifest.json'
+icons_prefix = 'Libs/UI/Textures/Icons/Items/'
 
-# Ensure output directories exist
+# WEBP encoding is CPU-bound, so conversions default to one process per core
+DEFAULT_CONVERT_WORKERS = os.cpu_count() or 1
+
+# Ensure output directories exist; the temp directories are only created for icons that need the external tools
 output_dir.mkdir(parents=True, exist_ok=True)
-temp_dds_dir.mkdir(parents=True, exist_ok=True)
-conv_dds_dir.mkdir(parents=True, exist_ok=True)
+
+# Pak handles opened by decode_pak_icon, one per pak in each process
+_pak_files: Dict[str, BinaryIO] = {}
+
+# Pixel digest -> the icon that encodes it; a dict, or a manager dict the pool workers share.
+# Icons whose digest is already claimed are not encoded again
+_claimed_digests: Any = {}
 
 def is_empty_directory_tree(directory):
     for root, _, files in os.walk(directory):
@@ -31,103 +49,328 @@ def is_empty_directory_tree(directory):
             return False
     return True
 
-def process_icons(logger, kcd2_icons):
+def convert_dds_file(dds_file_path, webp_file_path):
+    """Convert one DDS file to WEBP and delete the DDS; returns the error message, or None on success."""
+    try:
+        with Image.open(dds_file_path) as img:
+            img.save(webp_file_path, 'WEBP')
+        os.remove(dds_file_path)  # Delete the original file after successful conversion
+    except Exception as e:
+        return str(e)
+    return None
+
+def decode_pak_icon(pak_path, entries):
+    """
+    Read an icon straight from its pak members and open it with Pillow.
+    `entries` is the `.dds` member, followed by its `.dds.N` mip chunks when the icon is split.
+    """
+    pak_file = _pak_files.get(pak_path)
+    if pak_file is None:
+        pak_file = _pak_files[pak_path] = open(pak_path, 'rb')
+    dds = read_member(pak_path, entries[0], pak_file)
+    if len(entries) > 1:
+        dds = merge_split_dds(dds, {
+            split_part_number(entry.name): read_member(pak_path, entry, pak_file) for entry in entries[1:]
+        })
+    return Image.open(io.BytesIO(dds))
+
+def init_claimed_digests(claimed_digests) -> None:
+    """Set the digests encode_pak_icon claims in the current process."""
+    global _claimed_digests
+    _claimed_digests = claimed_digests
+
+def encode_pak_icon(pak_path, entries):
+    """
+    Decode an icon from the pak once and hash its pixels; encode it as WEBP unless another icon
+    already claimed those pixels. Returns (digest, webp bytes or None when claimed, None), or (None, None, error message).
+    """
+    try:
+        with decode_pak_icon(pak_path, entries) as img:
+            pixels = img.convert('RGBA')
+            digest = hashlib.blake2b(f"{pixels.size}".encode('ascii') + pixels.tobytes(), digest_size=16).hexdigest()
+            if _claimed_digests.setdefault(digest, entries[0].name) != entries[0].name:
+                return digest, None, None
+            webp = io.BytesIO()
+            img.save(webp, 'WEBP')
+    except Exception as e:
+        return None, None, str(e)
+    return digest, webp.getvalue(), None
+
+def close_pak_files():
+    """Close the pak handles decode_pak_icon opened in this process."""
+    for pak_file in _pak_files.values():
+        pak_file.close()
+    _pak_files.clear()
+
+class ExtractionCancelled(Exception):
+    """Icon extraction was stopped through its cancel event."""
+
+def map_conversions(convert, tasks, workers, stage="dds_convert", cancel=None, initializer=None, initargs=()) -> List[Tuple[Any, Any]]:
+    """
+    Run `convert(*task)` for every task, on a process pool when `workers` > 1.
+    Returns (task, result) pairs in task order; only the conversions are tracked as `stage`.
+    `initializer(*initargs)` runs in every process that converts, this one included when there is no pool.
+    Once the `cancel` event is set, tasks not started yet are dropped and ExtractionCancelled is raised.
+    """
+    results = []
+    with track(stage, items=len(tasks)):
+        if workers <= 1 or len(tasks) <= 1:
+            if initializer is not None:
+                initializer(*initargs)
+            for task in tasks:
+                if cancel is not None and cancel.is_set():
+                    raise ExtractionCancelled(f"{stage} cancelled")
+                results.append((task, convert(*task)))
+            return results
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context(), initializer=initializer, initargs=initargs) as executor:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            for result in zip(tasks, executor.map(convert, *zip(*tasks), chunksize=chunksize)):
+                if cancel is not None and cancel.is_set():
+                    executor.shutdown(cancel_futures=True)
+                    raise ExtractionCancelled(f"{stage} cancelled")
+                results.append(result)
+    return results
+
+def process_icons(logger, kcd2_icons, workers=DEFAULT_WORKERS, memory_cap=DEFAULT_MEMORY_CAP, convert_workers=DEFAULT_CONVERT_WORKERS, texconv_command=None, cancel=None):
+    texconv_command = texconv_command or texconv_file
     merge_success_count = 0
     merge_fail_count = 0
     convert_success_count = 0
     convert_fail_count = 0
     convert_skipped_count = 0
 
+    # Pak CRCs of the members behind each icon, so only changed icons are extracted again
+    manifest = ExtractManifest.load(manifest_file)
+    pending_icons = {}  # IconId -> (member signature, replaces an existing icon)
+    converted_icons = set()
+    icon_digests = {}  # IconId -> hash of the decoded pixels
+    present_icons = set()
+    own_outputs = {}  # IconId -> the WEBP path the icon converts to when it does not share another icon's
+    dedup_count = 0
+
+    # Aliases share another icon's WEBP, so they are only known from the manifest
+    for IconId, entry in manifest.entries.items():
+        if IconId not in kcd2_icons and (base_dir / entry["output"]).exists():
+            kcd2_icons[IconId] = entry["output"]
+
+    def webp_output(entries):
+        """Path of the WEBP an icon is converted to, relative to base_dir like the kcd2_icons values."""
+        dds_entry = next((entry for entry in entries if entry.name.endswith('.dds')), entries[0])
+        webp_file_path = (output_dir / os.path.relpath(dds_entry.name, icons_prefix)).with_suffix('.webp')
+        return os.path.relpath(webp_file_path, base_dir).replace('\\', '/')
+
     def extract_icons_from_pak():
-        nonlocal convert_skipped_count
+        nonlocal convert_skipped_count, convert_success_count, dedup_count
         logger.info("Processing Icons...")
-        with zipfile.ZipFile(compressed_icons_file, 'r') as pak:
-            for file in pak.namelist():
-                if file.startswith('Libs/UI/Textures/Icons/Items/'):
-                    file_path = (temp_dds_dir / os.path.relpath(file, 'Libs/UI/Textures/Icons/Items')).as_posix()
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    IconId = re.sub(r'\.[^.]+$', '', os.path.splitext(os.path.basename(file_path))[0].replace('_icon', ''))
-                    if IconId in kcd2_icons:
-                        logger.debug(f"Skipped extracting (already exists): {os.path.relpath(file_path, base_dir)}")
-                        convert_skipped_count += 1
-                        continue
-
-                    with pak.open(file) as source, open(file_path, 'wb') as target:
-                        target.write(source.read())
-                    logger.debug(f"Extracted {file} to {os.path.relpath(file_path, base_dir)}")
+        pak_index = load_pak_index(compressed_icons_file)
+        pak_path = str(compressed_icons_file)
+
+        # Group the members by IconId; split icons have .dds.N parts next to the .dds
+        icon_members = {}
+        for entry in pak_index.prefix(icons_prefix):
+            IconId = re.sub(r'\.[^.]+$', '', os.path.splitext(os.path.basename(entry.name))[0].replace('_icon', ''))
+            icon_members.setdefault(IconId, []).append(entry)
+
+        current_icons = {
+            IconId for IconId, entries in icon_members.items()
+            if IconId in kcd2_icons and manifest.is_current(IconId, {entry.name: (entry.crc, entry.file_size) for entry in entries})
+        }
+        # An alias is only current while the icon owning its WEBP is
+        changed_outputs = {webp_output(entries) for IconId, entries in icon_members.items() if IconId not in current_icons}
+        current_icons = {
+            IconId for IconId in current_icons
+            if kcd2_icons[IconId] not in changed_outputs or kcd2_icons[IconId] == webp_output(icon_members[IconId])
+        }
+
+        in_memory = []  # (IconId, [.dds, .dds.N...]) of icons decoded straight from the pak
+        jobs = []  # (entry, temp file) of icons that need the external tools
+        job_icon_ids = []
+
+        def extract_to_temp(IconId, entries):
+            for entry in entries:
+                jobs.append((entry, (temp_dds_dir / os.path.relpath(entry.name, icons_prefix)).as_posix()))
+                job_icon_ids.append(IconId)
+
+        for IconId, entries in icon_members.items():
+            if IconId in current_icons:
+                logger.debug(f"Skipped extracting (unchanged): {IconId}")
+                convert_skipped_count += len(entries)
+                continue
+
+            pending_icons[IconId] = ({entry.name: (entry.crc, entry.file_size) for entry in entries}, IconId in kcd2_icons)
+            # Whole icons and icons split into numbered mip chunks are merged and decoded in memory
+            dds_entries = [entry for entry in entries if entry.name.endswith('.dds')]
+            part_entries = [entry for entry in entries if split_part_number(entry.name) is not None]
+            if len(dds_entries) == 1 and len(dds_entries) + len(part_entries) == len(entries):
+                in_memory.append((IconId, dds_entries + part_entries))
+            else:
+                extract_to_temp(IconId, entries)
+
+        def use_webp(IconId, icon_entries, output):
+            nonlocal convert_success_count
+            dds_name = os.path.basename(icon_entries[0].name)
+            icon_key = os.path.splitext(dds_name)[0].replace('_icon', '')
+            kcd2_icons[icon_key] = output
+            converted_icons.add(icon_key)
+            if len(icon_entries) > 1:
+                # Not a Fixed DDS: that row counts split icons repaired after a failed conversion
+                logger.debug(f"Merged {len(icon_entries) - 1} mip chunks into {dds_name}")
+            convert_success_count += 1
+
+        def fall_back(IconId, icon_entries, error):
+            # Pillow cannot read it directly; hand it to the external tools through temp files
+            logger.debug(f"Falling back to external tools for {os.path.basename(icon_entries[0].name)}: {error}")
+            icon_digests.pop(IconId, None)
+            extract_to_temp(IconId, icon_entries)
+
+        # Only the first icon with given pixels writes its WEBP; the others become aliases of it
+        unique_outputs = {
+            entry["pixels"]: entry["output"] for IconId, entry in manifest.entries.items()
+            if IconId in current_icons and "pixels" in entry
+        }
+
+        # Decode and hash every icon in one pass, and encode only pixels no other icon claimed;
+        # icons with byte-identical members are only decoded once
+        def member_crcs(icon_entries):
+            return tuple((entry.crc, entry.file_size) for entry in icon_entries)
+        encode_tasks = list({member_crcs(icon_entries): (pak_path, icon_entries) for _, icon_entries in in_memory}.values())
+        logger.info(f"Converting {len(encode_tasks)} DDS icons to WEBP format straight from {compressed_icons_file.name}...")
+        manager = process_pool_context().Manager() if convert_workers > 1 and len(encode_tasks) > 1 else None
+        try:
+            claimed_digests = manager.dict(unique_outputs) if manager else dict(unique_outputs)
+            encoded_icons = {
+                member_crcs(icon_entries): result
+                for (_, icon_entries), result in map_conversions(
+                    encode_pak_icon, encode_tasks, convert_workers, cancel=cancel,
+                    initializer=init_claimed_digests, initargs=(claimed_digests,)
+                )
+            }
+        finally:
+            init_claimed_digests({})
+            if manager:
+                manager.shutdown()
+        encoded_webps = {digest: webp for digest, webp, _ in encoded_icons.values() if webp is not None}
+
+        for IconId, icon_entries in in_memory:
+            digest, _, error = encoded_icons[member_crcs(icon_entries)]
+            if error is None and digest in unique_outputs:
+                icon_digests[IconId] = digest
+                use_webp(IconId, icon_entries, unique_outputs[digest])
+                dedup_count += 1
+                continue
+            webp = encoded_webps.get(digest)
+            if error is None and webp is None:
+                error = "the icon that claimed its pixels failed to encode"
+            if error is None:
+                output = webp_output(icon_entries)
+                try:
+                    os.makedirs(os.path.dirname(base_dir / output), exist_ok=True)
+                    with atomic_write(base_dir / output, 'wb') as f:
+                        f.write(webp)
+                except OSError as e:
+                    error = str(e)
+            if error is not None:
+                fall_back(IconId, icon_entries, error)
+                continue
+            icon_digests[IconId] = digest
+            unique_outputs[digest] = output
+            use_webp(IconId, icon_entries, output)
+            logger.debug(f"Successfully converted {os.path.basename(icon_entries[0].name)} to {os.path.basename(output)} using Pillow")
+
+        # WEBPs written for icons that are aliases now
+        for IconId, icon_entries in in_memory:
+            own_output = webp_output(icon_entries)
+            if IconId in icon_digests and kcd2_icons.get(IconId) != own_output and (base_dir / own_output).exists():
+                os.remove(base_dir / own_output)
+
+        # Copy the remaining DDS members concurrently; icons with a failed member stay out of the manifest and are retried
+        errors = PakExtractor(pak_index, workers, memory_cap).extract(jobs)
+        for (entry, file_path), IconId, error in zip(jobs, job_icon_ids, errors):
+            if error is not None:
+                logger.error(f"Failed to extract {entry.name} to {os.path.relpath(file_path, base_dir)}: {error}")
+                pending_icons.pop(IconId, None)
+            else:
+                logger.debug(f"Extracted {entry.name} to {os.path.relpath(file_path, base_dir)}")
+
+        present_icons.update(icon_members)
+        own_outputs.update((IconId, webp_output(entries)) for IconId, entries in icon_members.items())
 
     def convert_dds_to_webp(directory):
         nonlocal convert_success_count, convert_fail_count, convert_skipped_count
         logger.info(f"Converting DDS files to WEBP format in {directory}...")
+        tasks = []
         for root, _, files in os.walk(directory):
             for file in files:
                 if file.endswith('.dds') and not any(char.isdigit() for char in file.split('.')[-1]):
                     dds_file_path = os.path.join(root, file)
-                    IconId = os.path.splitext(os.path.basename(file))[0].replace('_icon', '')
                     webp_file_path = (output_dir / os.path.relpath(dds_file_path, directory)).with_suffix('.webp').as_posix()
                     os.makedirs(os.path.dirname(webp_file_path), exist_ok=True)
-                    try:
-                        with Image.open(dds_file_path) as img:
-                            img.save(webp_file_path, 'WEBP')
-                        kcd2_icons[IconId] = os.path.relpath(webp_file_path, base_dir).replace('\\', '/')
-                        os.remove(dds_file_path)  # Delete the original file after successful conversion
-                        logger.debug(f"Successfully converted {os.path.basename(dds_file_path)} to {os.path.basename(webp_file_path)} using Pillow")
-                        convert_success_count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to convert {os.path.basename(dds_file_path)} to {os.path.basename(webp_file_path)} using Pillow: {e}")
-                        convert_fail_count += 1
-
-    def use_dds_unsplitter():
+                    tasks.append((dds_file_path, webp_file_path))
+        # os.walk order depends on the filesystem; sorted tasks give the same results and log order everywhere
+        tasks.sort()
+
+        # Results come back in task order, so kcd2_icons is filled deterministically
+        for (dds_file_path, webp_file_path), error in map_conversions(convert_dds_file, tasks, convert_workers, "dds_convert_files", cancel):
+            IconId = os.path.splitext(os.path.basename(dds_file_path))[0].replace('_icon', '')
+            if error is None:
+                kcd2_icons[IconId] = os.path.relpath(webp_file_path, base_dir).replace('\\', '/')
+                converted_icons.add(IconId)
+                logger.debug(f"Successfully converted {os.path.basename(dds_file_path)} to {os.path.basename(webp_file_path)} using Pillow")
+                convert_success_count += 1
+            else:
+                logger.error(f"Failed to convert {os.path.basename(dds_file_path)} to {os.path.basename(webp_file_path)} using Pillow: {error}")
+                convert_fail_count += 1
+
+    def merge_split_dds_files():
         nonlocal merge_success_count, merge_fail_count
-        logger.info("Using DDS-Unsplitter on failed DDS Files...")
+        logger.info("Merging split DDS files...")
         for root, _, files in os.walk(temp_dds_dir):
             for file in files:
-                if file.endswith('.dds'):
-                    dds_file_path = os.path.join(root, file)
-                    try:
-                        process = subprocess.Popen([str(dds_unsplitter_file), dds_file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                        for line in process.stdout:
-                            logger.debug(f"DDS-Unsplitter.exe - {line.decode().strip()}")
-                        for line in process.stderr:
-                            logger.debug(f"DDS-Unsplitter.exe - {line.decode().strip()}")
-                        process.wait()
-                        if process.returncode != 0:
-                            raise subprocess.CalledProcessError(process.returncode, process.args)
-                        logger.info(f"Successfully merged {os.path.basename(dds_file_path)} using DDS-Unsplitter.exe")
-                        merge_success_count += 1
-
-                        # Delete any .dds.[0-9] files
-                        for i in range(10):
-                            part_file = f"{dds_file_path}.{i}"
-                            if os.path.exists(part_file):
-                                os.remove(part_file)
-                    except subprocess.CalledProcessError as e:
-                        logger.error(f"Failed to merge {os.path.basename(dds_file_path)} using DDS-Unsplitter: {e}")
-                        merge_fail_count += 1
+                if not file.endswith('.dds'):
+                    continue
+                dds_file_path = os.path.join(root, file)
+                part_files = {
+                    split_part_number(part): os.path.join(root, part)
+                    for part in files if part.startswith(f"{file}.") and split_part_number(part) is not None
+                }
+                if not part_files:
+                    continue
+                try:
+                    with open(dds_file_path, 'rb') as f:
+                        dds = f.read()
+                    parts = {}
+                    for number, part_file in part_files.items():
+                        with open(part_file, 'rb') as f:
+                            parts[number] = f.read()
+                    with atomic_write(dds_file_path, 'wb') as f:
+                        f.write(merge_split_dds(dds, parts))
+                    logger.info(f"Successfully merged {file} from {len(part_files)} mip chunks")
+                    merge_success_count += 1
+                    for part_file in part_files.values():
+                        os.remove(part_file)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to merge {file}: {e}")
+                    merge_fail_count += 1
 
     def convert_merged_dds_to_bc7_unorm():
         nonlocal convert_success_count, convert_fail_count
         logger.info("Converting merged DDS files to BC7_UNORM format...")
-        for file in os.listdir(temp_dds_dir):
-            dds_file_path = os.path.join(temp_dds_dir, file)
-            if os.path.isfile(dds_file_path) and file.endswith('.dds'):
-                try:
-                    texconv_command = [str(texconv_file), '-f', 'BC7_UNORM', '-y', '-o', str(conv_dds_dir), str(dds_file_path)]
-                    process = subprocess.Popen(texconv_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    for line in process.stdout:
-                        logger.debug(f"texconv.exe - {line.decode().strip()}")
-                    for line in process.stderr:
-                        logger.debug(f"texconv.exe - {line.decode().strip()}")
-                    process.wait()
-                    if process.returncode != 0:
-                        raise subprocess.CalledProcessError(process.returncode, process.args)
-                    logger.info(f"Successfully converted {os.path.basename(dds_file_path)} to BC7_UNORM format using texconv.exe")
-                    logger.debug(f"texconv.exe - Command: {' '.join(texconv_command)}")
-                    os.remove(dds_file_path)  # Delete the original file after successful conversion
-                    convert_success_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to convert {os.path.basename(dds_file_path)} to BC7_UNORM using texconv.exe: {e}")
-                    convert_fail_count += 1
+        conv_dds_dir.mkdir(parents=True, exist_ok=True)
+        dds_file_paths = [
+            os.path.join(temp_dds_dir, file) for file in sorted(os.listdir(temp_dds_dir))
+            if file.endswith('.dds') and os.path.isfile(os.path.join(temp_dds_dir, file))
+        ]
+        # texconv takes the files as lists, so a handful of invocations covers every icon
+        converter = TexconvConverter(texconv_command, workers=convert_workers)
+        for dds_file_path, error in zip(dds_file_paths, converter.convert(dds_file_paths, conv_dds_dir)):
+            if error is None:
+                logger.info(f"Successfully converted {os.path.basename(dds_file_path)} to BC7_UNORM format using texconv")
+                os.remove(dds_file_path)  # Delete the original file after successful conversion
+                convert_success_count += 1
+            else:
+                logger.error(f"Failed to convert {os.path.basename(dds_file_path)} to BC7_UNORM using texconv: {error}")
+                convert_fail_count += 1
 
     extract_icons_from_pak()
 
@@ -135,16 +378,39 @@ def process_icons(logger, kcd2_icons):
     if not is_empty_directory_tree(temp_dds_dir):
         convert_dds_to_webp(temp_dds_dir)
         
-        # Check if there are files in temp_dds_dir before proceeding with unsplitter
+        # Check if there are files in temp_dds_dir before merging the split ones
         if not is_empty_directory_tree(temp_dds_dir):
-            use_dds_unsplitter()
+            merged_before = merge_success_count
+            with track("dds_unsplit") as record:
+                merge_split_dds_files()
+                record["items"] = merge_success_count - merged_before
             convert_merged_dds_to_bc7_unorm()
             convert_dds_to_webp(conv_dds_dir)
 
+    close_pak_files()
+
     # If all conversions are successful, delete the temp_dds directory if it is empty
-    if convert_fail_count == 0 and is_empty_directory_tree(temp_dds_dir):
+    if temp_dds_dir.exists() and convert_fail_count == 0 and is_empty_directory_tree(temp_dds_dir):
         shutil.rmtree(temp_dds_dir)
 
+    # Record the icons that made it to WEBP; failed ones are retried on the next run
+    for IconId, (members, replaced) in pending_icons.items():
+        if IconId in converted_icons:
+            fields = {"pixels": icon_digests[IconId]} if IconId in icon_digests else {}
+            manifest.record(IconId, kcd2_icons[IconId], members, replaced=replaced, **fields)
+    if dedup_count:
+        logger.info(f"{dedup_count} icons share the WEBP of an identical icon")
+
+    # Delete icons whose source is no longer in the pak, once the aliases point at their new WEBPs.
+    # A removed icon's WEBP that aliases still share is renamed after one of them, since the icons
+    # directory is indexed by file name on the next run
+    for IconId in manifest.remove_missing(present_icons, base_dir, own_outputs):
+        kcd2_icons.pop(IconId, None)
+    for IconId, entry in manifest.entries.items():
+        if IconId in kcd2_icons and not (base_dir / kcd2_icons[IconId]).exists():
+            kcd2_icons[IconId] = entry["output"]
+    manifest.save()
+
     return (merge_success_count, merge_fail_count, 
             convert_success_count, convert_fail_count, 
-            convert_skipped_count, kcd2_icons)
\ No newline at end of file
+            convert_skipped_count, kcd2_icons, manifest.changes)
\ No newline at end of file
@@ -1,7 +1,9 @@
 import os
-import zipfile
 from pathlib import Path
 from constants.dir_constants import GAME_DIR
+from services.pak_index import load_pak_index
+from services.pak_extractor import PakExtractor, DEFAULT_WORKERS, DEFAULT_MEMORY_CAP
+from services.extract_manifest import ExtractManifest
 
 # Define paths
 tables_pak_file = GAME_DIR / 'Data' / 'Tables.pak'
@@ -10,6 +12,7 @@ english_localization_pak_file = GAME_DIR / 'Localization' / 'English_xml.pak'
 # Define base paths
 base_dir = Path(__file__).resolve().parent.parent.parent
 xml_output_dir = base_dir / 'src/data/xml'
+manifest_file = xml_output_dir / '.extract_manifest.json'
 
 # Ensure output directories exist
 xml_output_dir.mkdir(parents=True, exist_ok=True)
@@ -17,11 +20,15 @@ xml_output_dir.mkdir(parents=True, exist_ok=True)
 # Initialize the KCD2 files structure
 kcd2_xmls: dict[str, str] = {}
 
-def extract_files(logger, kcd2_xmls):
+def extract_files(logger, kcd2_xmls, workers=DEFAULT_WORKERS, memory_cap=DEFAULT_MEMORY_CAP):
     copied_files = 0
     skipped_files = 0
     failed_files = 0
 
+    # Pak CRCs of the extracted XMLs, so only changed members are extracted again
+    manifest = ExtractManifest.load(manifest_file)
+    seen_xml_ids = set()
+
     logger.info("Processing PAK files...")
 
     # Define the list of pak files to process
@@ -32,32 +39,44 @@ def extract_files(logger, kcd2_xmls):
 
     for pak_file, prefix, output_path in pak_files:
         logger.info(f"Processing PAK file: {os.path.basename(pak_file)}")
-        with zipfile.ZipFile(pak_file, 'r') as pak:
-            for file in pak.namelist():
-                if file.startswith(prefix) and file.endswith('.xml') and 'preset' not in file.lower():
-                    relative_path = file.replace(prefix, '')
-                    file_path = (output_path / relative_path).as_posix()
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    extracted_file_path = (output_path / relative_path).as_posix()
-                    
-                    # Replace double underscores with a single underscore in the filename
-                    XmlId = os.path.splitext(os.path.basename(file_path))[0].replace('__', '_')
-                    file_path = file_path.replace('__', '_')
-                    extracted_file_path = extracted_file_path.replace('__', '_')
-                    
-                    if XmlId in kcd2_xmls:
-                        skipped_files += 1
-                        logger.debug(f"Skipped extracting (already exists): {os.path.relpath(file_path, base_dir)}")
-                        continue
-
-                    try:
-                        with pak.open(file) as source, open(file_path, 'wb') as target:
-                            target.write(source.read())
-                        kcd2_xmls[XmlId] = os.path.relpath(file_path, base_dir).replace('\\', '/')
-                        copied_files += 1
-                        logger.debug(f"Extracted {file} from {pak_file} to {os.path.relpath(file_path, base_dir)}")
-                    except Exception as e:
-                        failed_files += 1
-                        logger.error(f"Failed to extract {file} from {pak_file} to {os.path.relpath(file_path, base_dir)}: {e}")
-
-    return copied_files, skipped_files, failed_files, kcd2_xmls
\ No newline at end of file
+        pak_index = load_pak_index(pak_file)
+
+        # Collect the members that need extracting, then copy them concurrently
+        jobs = []
+        for entry in pak_index.prefix(prefix):
+            file = entry.name
+            if file.endswith('.xml') and 'preset' not in file.lower():
+                relative_path = file.replace(prefix, '')
+                file_path = (output_path / relative_path).as_posix()
+
+                # Replace double underscores with a single underscore in the filename
+                XmlId = os.path.splitext(os.path.basename(file_path))[0].replace('__', '_')
+                file_path = file_path.replace('__', '_')
+
+                seen_xml_ids.add(XmlId)
+                members = {file: (entry.crc, entry.file_size)}
+                existed = XmlId in kcd2_xmls
+                if existed and manifest.is_current(XmlId, members):
+                    skipped_files += 1
+                    logger.debug(f"Skipped extracting (unchanged): {os.path.relpath(file_path, base_dir)}")
+                    continue
+
+                jobs.append((entry, file_path, XmlId, members, existed))
+
+        errors = PakExtractor(pak_index, workers, memory_cap).extract([(entry, file_path) for entry, file_path, *_ in jobs])
+        for (entry, file_path, XmlId, members, existed), error in zip(jobs, errors):
+            if error is not None:
+                failed_files += 1
+                logger.error(f"Failed to extract {entry.name} from {pak_file} to {os.path.relpath(file_path, base_dir)}: {error}")
+                continue
+            kcd2_xmls[XmlId] = os.path.relpath(file_path, base_dir).replace('\\', '/')
+            manifest.record(XmlId, kcd2_xmls[XmlId], members, replaced=existed)
+            copied_files += 1
+            logger.debug(f"Extracted {entry.name} from {pak_file} to {os.path.relpath(file_path, base_dir)}")
+
+    # Delete XMLs whose source is no longer in the paks
+    for XmlId in manifest.remove_missing(seen_xml_ids, base_dir):
+        kcd2_xmls.pop(XmlId, None)
+    manifest.save()
+
+    return copied_files, skipped_files, failed_files, kcd2_xmls, manifest.changes
\ No newline at end of file
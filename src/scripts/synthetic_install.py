@@ -0,0 +1,240 @@
+"""
+Generate a fake Kingdom Come: Deliverance 2 install for benchmarks and offline runs.
+
+    python -m scripts.synthetic_install /tmp/kcd2 --items 20000 --icons 2000
+
+Writes whdlversions.json, Data/Tables.pak with the item_* and equipment/weapon/dice tables,
+Localization/English_xml.pak with text_ui_items.xml, and Data/IPL_GameData.pak with DXT5 DDS icons,
+some of them split into .dds.N mip chunks like the game streams large textures.
+Point the build at it with KCD2_GAME_DIR.
+"""
+import io
+import json
+import random
+import struct
+import uuid
+import zipfile
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+from PIL import Image, ImageDraw
+from utils.logger import logger
+from services.dds_split import DDS_HEADER_SIZE
+
+ICONS_PREFIX = 'Libs/UI/Textures/Icons/Items/'
+TABLES_PREFIX = 'Libs/Tables/item/'
+_CAPS_OFFSET = 4 + 104  # dwCaps of the DDS_HEADER
+
+# Share of the items in each item table
+ITEM_TABLE_SHARES = {"item": 0.6, "item_dlc": 0.15, "item_horse": 0.1, "item_rewards": 0.1, "item_reward": 0.05}
+# Item tags and how often they occur; Food and Misc are not in the build's categories and get skipped
+ITEM_TAGS = {"MeleeWeapon": 4, "MissileWeapon": 1, "Armor": 6, "Hood": 1, "Helmet": 1, "Die": 1, "DiceBadge": 1, "Food": 2, "Misc": 2}
+ARMOR_WORDS = ["Coat", "Gloves", "Caparison", "Bridle", "Saddle", "Helmet", "Hood", "Cap", "Shirt", "Gambeson", "Hose", "Chausses", "Harness", "Chanfron"]
+
+EQUIPMENT_SLOTS = [
+    # Id, Name, UIBodyPartId, UISlot, ArmorTypes
+    (3, "head", "0", "Helmet", "Helmet Hood Cap"),
+    (4, "torso", "2", "Shirt", "Shirt Gambeson"),
+    (5, "legs", "3", "Legs", "Hose Chausses"),
+    (7, "body_coat", "2", "Coat", "Coat"),
+    (8, "gloves", "1", "Gloves", "Gloves"),
+    (13, "horse_torso", "6", "HorseTorso", ""),
+    (14, "horse_head", "6", "HorseHead", ""),
+    (15, "horse_saddle", "6", "HorseSaddle", ""),
+    (99, "none", "0", "", "Ring"),
+]
+
+def dxt5(image: Image.Image) -> bytes:
+    """A block-compressed (BC3) DDS of `image`, the kind of texture the game ships."""
+    out = io.BytesIO()
+    image.save(out, 'DDS', pixel_format='DXT5')
+    return out.getvalue()
+
+def with_mip_count(dds: bytes, mip_count: int) -> bytes:
+    """Set the mip count of a DDS header, along with the flags that announce mips."""
+    flags, = struct.unpack_from('<I', dds, 8)
+    caps, = struct.unpack_from('<I', dds, _CAPS_OFFSET)
+    header = bytearray(dds[:DDS_HEADER_SIZE])
+    struct.pack_into('<I', header, 8, flags | 0x20000)  # DDSD_MIPMAPCOUNT
+    struct.pack_into('<I', header, 28, mip_count)
+    struct.pack_into('<I', header, _CAPS_OFFSET, caps | 0x400000 | 0x8)  # DDSCAPS_MIPMAP | DDSCAPS_COMPLEX
+    return bytes(header)
+
+def icon_image(rng: random.Random, size: int) -> Image.Image:
+    """A few flat shapes on a transparent background, roughly how item icons compress."""
+    image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(2, 6)):
+        x0, y0 = rng.randrange(size), rng.randrange(size)
+        x1, y1 = rng.randint(x0, size), rng.randint(y0, size)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256), 255)
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)((x0, y0, x1, y1), fill=color)
+    return image
+
+def icon_members(name: str, image: Image.Image, split: bool) -> Dict[str, bytes]:
+    """Pak members of an icon: one DDS, or a split DDS with a full mip chain whose two largest mips are in .dds.1 and .dds.2."""
+    dds = dxt5(image)
+    if not split:
+        return {name: dds}
+    mips = []
+    size = image.width
+    while size >= 1:
+        # Mips below 4x4 still take one 4x4 block
+        mips.append(dxt5(image.resize((max(size, 4), max(size, 4))))[DDS_HEADER_SIZE:])
+        size //= 2
+    return {
+        name: with_mip_count(dds, len(mips)) + b''.join(mips[2:]),
+        f"{name}.1": mips[1],
+        f"{name}.2": mips[0],
+    }
+
+def item_element(rng: random.Random, tag: str, icon_ids: List[str], ui_names: List[str]) -> str:
+    name = f"{rng.choice(ARMOR_WORDS)}{rng.randint(0, 99):02d}_m{rng.randint(1, 4):02d}"
+    attributes = {
+        "Id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "Name": name,
+        "IconId": rng.choice(icon_ids) if icon_ids and rng.random() < 0.95 else "trafficcone",
+        "UIInfo": "ui_in_warning" if rng.random() < 0.02 else f"ui_in_{name}",
+        "UIName": f"ui_nm_{name}",
+        "Weight": rng.choice(["0.5", "1", "3", "7.25"]),
+        "Price": str(rng.randint(1, 2000)),
+        "MaxQuality": "4",
+        "MaxStatus": str(rng.randint(5, 50)),
+        "Charisma": str(rng.randint(0, 30)),
+        "Conspicuousness": rng.choice(["-0.2", "0.3", "1"]),
+        "Noise": "0.1",
+        "Visibility": "0.82",
+    }
+    if tag == "MeleeWeapon":
+        attributes.update(
+            Class=str(rng.randint(0, 9)), Skill="sword", EquipSlot="Main", Attack=str(rng.randint(10, 90)),
+            AttackModStab="0.5", AttackModSlash="1", AttackModSmash="0.25", Defense="100"
+        )
+    elif tag == "MissileWeapon":
+        attributes.update(Class=str(rng.randint(10, 13)), Skill="bow", EquipSlot="Bow", AmmoClass="0", Power="120")
+    elif tag in ("Armor", "Hood", "Helmet"):
+        attributes.update(Clothing=name[:-4], DefenseStab=str(rng.randint(0, 50)), DefenseSlash="3.5", DefenseSmash="5")
+    elif tag == "Die":
+        attributes.update(Material="wood", SideWeights="1 1 1 1 1 1", SideValues="0 1 2 3 4 5", Weight="0.1")
+    elif tag == "DiceBadge":
+        attributes.update(Type=str(rng.randint(0, 2)), SubType=str(rng.randint(0, 11)))
+    ui_names.append(attributes["UIName"])
+    return f"<{tag} " + " ".join(f'{key}="{value}"' for key, value in attributes.items()) + "/>\n"
+
+def reference_tables() -> Dict[str, str]:
+    """equipment_slot, weapon_class, ammo_class and the dice badge tables."""
+    slots = "".join(
+        f'<EquipmentSlot Id="{slot_id}" Name="{name}" UIBodyPartId="{body_part}" UISlot="{ui_slot}"'
+        + (f' ArmorTypes="{armor_types}"' if armor_types else '') + "/>\n"
+        for slot_id, name, body_part, ui_slot, armor_types in EQUIPMENT_SLOTS
+    )
+    weapons = "".join(f'<MeleeWeaponClass id="{i}" name="melee{i}" skill="sword" equip_slot="Main"/>\n' for i in range(10))
+    weapons += "".join(
+        f'<MissileWeaponClass id="{i}" name="missile{i}" skill="bow" equip_slot="Bow" ammo_class="{i % 2}"/>\n' for i in range(10, 14)
+    )
+    return {
+        "equipment_slot": f"<database><EquipmentSlots>\n{slots}</EquipmentSlots></database>\n",
+        "weapon_class": f"<database><weapon_classes>\n{weapons}</weapon_classes></database>\n",
+        "ammo_class": '<database><ammo_classes><ammo_class ammo_class_id="0" ammo_class_name="arrow"/>'
+                      '<ammo_class ammo_class_id="1" ammo_class_name="bolt"/></ammo_classes></database>\n',
+        "dice_badge_type": "<database><dice_badge_types>" + "".join(
+            f'<dice_badge_type dice_badge_type_id="{i}" dice_badge_type_name="type{i}"/>' for i in range(3)
+        ) + "</dice_badge_types></database>\n",
+        "dice_badge_subtype": "<database><dice_badge_subtypes>" + "".join(
+            f'<dice_badge_subtype dice_badge_subtype_id="{i}" dice_badge_subtype_name="subtype{i}"/>' for i in range(12)
+        ) + "</dice_badge_subtypes></database>\n",
+    }
+
+def generate_install(
+    game_dir: Path,
+    items: int = 2000,
+    icons: int = 500,
+    icon_size: int = 128,
+    split_fraction: float = 0.1,
+    duplicate_fraction: float = 0.05,
+    version: str = "1.2",
+    seed: int = 1
+) -> Dict[str, int]:
+    """
+    Write a fake install with `items` items across the item tables and `icons` item icons, of which
+    `split_fraction` are split DDS files and `duplicate_fraction` repeat another icon's pixels.
+    The same arguments always give byte-identical paks. Returns the counts and pak sizes.
+    """
+    rng = random.Random(seed)
+    game_dir = Path(game_dir)
+    (game_dir / "Data").mkdir(parents=True, exist_ok=True)
+    (game_dir / "Localization").mkdir(parents=True, exist_ok=True)
+
+    branch = f"release_{version.replace('.', '_')}"
+    with open(game_dir / "whdlversions.json", 'w') as f:
+        json.dump({"Assembly": {"Version": f"{version}.0"}, "Preset": {"Branch": {"Name": branch}}}, f, indent=4)
+
+    # Icons first, so the items can point at them
+    icon_ids = [f"synthetic{i:05d}" for i in range(icons)]
+    split_icons = 0
+    image: Optional[Image.Image] = None
+    with zipfile.ZipFile(game_dir / "Data/IPL_GameData.pak", 'w', zipfile.ZIP_DEFLATED) as pak:
+        for icon_id in icon_ids:
+            if image is None or rng.random() >= duplicate_fraction:
+                image = icon_image(rng, icon_size)
+            split = rng.random() < split_fraction
+            split_icons += split
+            for name, raw in icon_members(f"{ICONS_PREFIX}{icon_id}_icon.dds", image, split).items():
+                pak.writestr(zipfile.ZipInfo(name, date_time=(2025, 1, 1, 0, 0, 0)), raw, zipfile.ZIP_DEFLATED)
+        pak.writestr(zipfile.ZipInfo("Libs/UI/Textures/Other/background.dds", date_time=(2025, 1, 1, 0, 0, 0)), b"not an item icon")
+
+    # Item tables, then the localization rows of every UIName
+    tags = list(ITEM_TAGS)
+    weights = list(ITEM_TAGS.values())
+    ui_names: List[str] = []
+    tables = reference_tables()
+    for table, share in ITEM_TABLE_SHARES.items():
+        count = max(1, round(items * share))
+        rows = "".join(item_element(rng, rng.choices(tags, weights)[0], icon_ids, ui_names) for _ in range(count))
+        tables[table] = f"<database><ItemClasses>\n{rows}</ItemClasses></database>\n"
+    with zipfile.ZipFile(game_dir / "Data/Tables.pak", 'w', zipfile.ZIP_DEFLATED) as pak:
+        for table, xml in tables.items():
+            pak.writestr(zipfile.ZipInfo(f"{TABLES_PREFIX}{table}.xml", date_time=(2025, 1, 1, 0, 0, 0)), xml, zipfile.ZIP_DEFLATED)
+        pak.writestr(zipfile.ZipInfo(f"{TABLES_PREFIX}item_preset.xml", date_time=(2025, 1, 1, 0, 0, 0)), "<database/>")
+
+    rows = "".join(
+        f"<Row><Cell>{ui_name}</Cell><Cell>Alt {ui_name}</Cell><Cell>Name {ui_name}</Cell></Row>\n"
+        for ui_name in dict.fromkeys(ui_names)
+    )
+    with zipfile.ZipFile(game_dir / "Localization/English_xml.pak", 'w', zipfile.ZIP_DEFLATED) as pak:
+        pak.writestr(zipfile.ZipInfo("text_ui_items.xml", date_time=(2025, 1, 1, 0, 0, 0)), f"<Table>\n{rows}</Table>\n", zipfile.ZIP_DEFLATED)
+
+    summary = {
+        "items": sum(max(1, round(items * share)) for share in ITEM_TABLE_SHARES.values()),
+        "icons": icons,
+        "split_icons": split_icons,
+        "tables_pak_bytes": (game_dir / "Data/Tables.pak").stat().st_size,
+        "localization_pak_bytes": (game_dir / "Localization/English_xml.pak").stat().st_size,
+        "icons_pak_bytes": (game_dir / "Data/IPL_GameData.pak").stat().st_size,
+    }
+    logger.info(f"Generated a synthetic install in {game_dir}: {summary}")
+    return summary
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the generator command line options."""
+    parser = argparse.ArgumentParser(description="Generate a fake KCD2 install for benchmarks.")
+    parser.add_argument("game_dir", type=Path, help="directory to write the install to")
+    parser.add_argument("--items", type=int, default=2000, help="items across the item tables (default: 2000)")
+    parser.add_argument("--icons", type=int, default=500, help="item icons (default: 500)")
+    parser.add_argument("--icon-size", type=int, default=128, help="icon width and height in pixels (default: 128)")
+    parser.add_argument("--split-fraction", type=float, default=0.1, help="share of split DDS icons (default: 0.1)")
+    parser.add_argument("--duplicate-fraction", type=float, default=0.05,
+                        help="share of icons repeating another icon's pixels (default: 0.05)")
+    parser.add_argument("--version", default="1.2", help="game version written to whdlversions.json (default: 1.2)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    """Run from the src directory: python -m scripts.synthetic_install /tmp/kcd2 --items 20000"""
+    args = parse_args(argv)
+    generate_install(
+        args.game_dir, args.items, args.icons, args.icon_size, args.split_fraction, args.duplicate_fraction, args.version, args.seed
+    )
+
+if __name__ == "__main__":
+    main()
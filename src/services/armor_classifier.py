@@ -0,0 +1,63 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class ArmorTypeStats:
+    """Match statistics collected while classifying armors."""
+    counts: Counter = field(default_factory=Counter)  # armor_types Id -> matched armors
+    unmatched: List[str] = field(default_factory=list)  # armor names no filter matched
+
+    def merge(self, other: "ArmorTypeStats") -> None:
+        """Add the statistics of another (e.g. a worker's) classifier run."""
+        self.counts.update(other.counts)
+        self.unmatched.extend(other.unmatched)
+
+    def summary(self, armor_types: List[dict]) -> str:
+        """Describe per-slot counts in armor_types order, followed by the unmatched count."""
+        per_slot = ", ".join(
+            f"{armor_type['Name']}: {self.counts[armor_type['Id']]}"
+            for armor_type in armor_types if self.counts[armor_type['Id']]
+        )
+        return f"{sum(self.counts.values())} armors classified ({per_slot}), {len(self.unmatched)} unmatched"
+
+class ArmorTypeClassifier:
+    """
+    Assigns an armor_types Id to armor names, built once from the armor_types of xml_equipment_slot.
+    All filters are matched in one pass with a single compiled alternation, keeping the
+    first-match priority of the armor_types list.
+    """
+
+    def __init__(self, armor_types: List[dict]):
+        # Lowercased filter -> (priority, Id); the first armor_type listing a filter wins
+        self._filters: Dict[str, Tuple[int, int]] = {}
+        for priority, armor_type in enumerate(armor_types):
+            for filter_ in armor_type.get("filters", []):
+                self._filters.setdefault(filter_.lower(), (priority, armor_type["Id"]))
+
+        # A zero-width lookahead tries every start position, and at each one the alternation
+        # reports the highest-priority filter, so the minimum over all matches is the first match
+        ordered_filters = sorted(self._filters, key=lambda filter_: self._filters[filter_][0])
+        self._pattern: Optional[re.Pattern] = (
+            re.compile("(?=(" + "|".join(re.escape(filter_) for filter_ in ordered_filters) + "))")
+            if ordered_filters else None
+        )
+        self.stats = ArmorTypeStats()
+
+    def classify(self, name: str) -> Optional[int]:
+        """Return the armor_types Id for an armor name, or None when no filter matches."""
+        best: Optional[Tuple[int, int]] = None
+        if self._pattern is not None:
+            for match in self._pattern.finditer(name.lower()):
+                candidate = self._filters[match.group(1)]
+                if best is None or candidate < best:
+                    best = candidate
+                    if best[0] == 0:
+                        break
+
+        if best is None:
+            self.stats.unmatched.append(name)
+            return None
+        self.stats.counts[best[1]] += 1
+        return best[1]
@@ -0,0 +1,27 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+from utils.logger import logger
+from services.output_formats import write_outputs, DEFAULT_OUTPUT_FORMATS
+
+@dataclass
+class BuildContext:
+    """
+    The data.json document being built, passed through every build stage in memory.
+    Stages update `data` in place; the file is only written once, by `save`.
+    """
+    version: str
+    output_dir: Path
+    data: dict
+    formats: Sequence[str] = DEFAULT_OUTPUT_FORMATS
+
+    @property
+    def data_json_path(self) -> Path:
+        return self.output_dir / "data.json"
+
+    def save(self) -> Path:
+        """Atomically write the finished document in every requested format and return the first file."""
+        written = write_outputs(self.data, self.data_json_path, self.formats)
+        logger.info(f"Saved data.json as {', '.join(file.name for file in written)} in {os.path.relpath(self.output_dir)}")
+        return written[0]
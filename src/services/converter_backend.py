@@ -0,0 +1,112 @@
+import os
+import shlex
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+from utils.logger import logger
+from services.metrics import track
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_TOOL_WORKERS = os.cpu_count() or 1
+
+def tool_command(command: Union[str, Path, Sequence[str]]) -> List[str]:
+    """
+    Turn a tool setting into an argument list. Strings are split like a shell would, so a
+    stand-in such as "python fake_texconv.py" can replace the bundled executable; Paths are used as is.
+    On Windows backslashes are kept, so "C:\\tools\\texconv.exe" stays a path.
+    """
+    if isinstance(command, Path):
+        return [str(command)]
+    if isinstance(command, str):
+        if os.name != 'nt':
+            return shlex.split(command)
+        # Non-POSIX mode keeps backslashes, and also the quotes around a token
+        return [
+            part[1:-1] if len(part) > 1 and part[0] == part[-1] and part[0] in '"\'' else part
+            for part in shlex.split(command, posix=False)
+        ]
+    return [str(part) for part in command]
+
+def run_tool(command: List[str], tool_name: str) -> Tuple[int, List[str]]:
+    """
+    Run an external tool and return its exit code and output lines.
+    stderr is merged into stdout and read by communicate(), so a chatty tool cannot fill a pipe and block.
+    """
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+    lines = process.stdout.decode(errors='replace').splitlines()
+    for line in lines:
+        if line.strip():
+            logger.debug(f"{tool_name} - {line.strip()}")
+    return process.returncode, lines
+
+class BatchConverter(ABC):
+    """
+    Runs an external converter over many files per invocation, with several invocations at once.
+    Subclasses describe the tool: how to build the command for a batch, and where it writes each output.
+    """
+    tool_name = "converter"
+
+    def __init__(
+        self,
+        command: Union[str, Path, Sequence[str]],
+        workers: int = DEFAULT_TOOL_WORKERS,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ):
+        self.command = tool_command(command)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+    @abstractmethod
+    def build_command(self, list_file: str, output_dir: Path) -> List[str]:
+        """Return the command converting every file named in `list_file` into `output_dir`."""
+
+    def output_path(self, file_path: str, output_dir: Path) -> Path:
+        """Return where the tool writes the converted `file_path`."""
+        return Path(output_dir) / os.path.basename(file_path)
+
+    def convert(self, file_paths: List[str], output_dir: Path) -> List[Optional[str]]:
+        """Convert every file into `output_dir`; returns the error message for each file (None on success), in order."""
+        if not file_paths:
+            return []
+        batch_size = min(self.batch_size, -(-len(file_paths) // self.workers))  # Spread small jobs over every worker
+        batches = [file_paths[i:i + batch_size] for i in range(0, len(file_paths), batch_size)]
+        with track(self.tool_name, items=len(file_paths), bytes=sum(os.path.getsize(file_path) for file_path in file_paths)):
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as executor:
+                return [error for errors in executor.map(lambda batch: self._convert_batch(batch, output_dir), batches) for error in errors]
+
+    def _convert_batch(self, batch: List[str], output_dir: Path) -> List[Optional[str]]:
+        # Outputs left over from an earlier run would hide a failed conversion
+        for file_path in batch:
+            self.output_path(file_path, output_dir).unlink(missing_ok=True)
+
+        fd, list_file = tempfile.mkstemp(prefix=f"{self.tool_name}.", suffix=".txt")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write("\n".join(os.path.abspath(file_path) for file_path in batch) + "\n")
+            command = self.build_command(list_file, output_dir)
+            logger.debug(f"{self.tool_name} - Command: {' '.join(command)}")
+            returncode, _ = run_tool(command, self.tool_name)
+        except OSError as e:
+            return [f"Failed to run {self.tool_name}: {e}"] * len(batch)
+        finally:
+            os.remove(list_file)
+
+        return [
+            None if self.output_path(file_path, output_dir).exists()
+            else f"{self.tool_name} did not write {os.path.basename(file_path)} (exit code {returncode})"
+            for file_path in batch
+        ]
+
+class TexconvConverter(BatchConverter):
+    """Re-encodes DDS files to another DXGI format with texconv, feeding it a file list."""
+    tool_name = "texconv"
+
+    def __init__(self, command, dds_format: str = "BC7_UNORM", **kwargs):
+        super().__init__(command, **kwargs)
+        self.dds_format = dds_format
+
+    def build_command(self, list_file, output_dir):
+        return [*self.command, '-f', self.dds_format, '-y', '-o', str(output_dir), '-flist', list_file]
@@ -1,21 +1,67 @@
 import os
 import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, Optional, Tuple
 from utils.logger import logger
 from pathlib import Path
 from constants.dir_constants import GAME_DIR
 from scripts.extract_xml import extract_files
-from scripts.extract_icon import process_icons
+from scripts.extract_icon import process_icons, ExtractionCancelled, DEFAULT_CONVERT_WORKERS
+from services.pak_extractor import DEFAULT_WORKERS, DEFAULT_MEMORY_CAP
+from services.metrics import track
 import shutil
 
-def data_extract():
-    # Define base paths
-    base_dir = Path(__file__).resolve().parent.parent.parent
-    log_dir = base_dir / 'src/logs'
-    data_dir = base_dir / 'src/data'
-    xml_dir = data_dir / 'xml'
-    icons_dir = data_dir / 'icons'
+# Define base paths
+base_dir = Path(__file__).resolve().parent.parent.parent
+log_dir = base_dir / 'src/logs'
+data_dir = base_dir / 'src/data'
+xml_dir = data_dir / 'xml'
+icons_dir = data_dir / 'icons'
 
+def run_xml_extraction(kcd2_xmls, extract_workers, memory_cap, extract_logger=logger):
+    """Extract the XMLs from their paks; returns kcd2_xmls and the XML counters."""
+    counters = {"copied": 0, "skipped": 0, "failed": 0, "changes": {"added": 0, "changed": 0, "removed": 0}}
+    try:
+        extract_logger.info("Starting XML extraction process.")
+        start = time.perf_counter()
+        with track("xml_extraction") as record:
+            copied_files, skipped_files, failed_files, kcd2_xmls, xml_changes = extract_files(extract_logger, kcd2_xmls, extract_workers, memory_cap)
+            record["items"] = copied_files
+        counters.update(copied=copied_files, skipped=skipped_files, failed=failed_files, changes=xml_changes)
+        extract_logger.info(f"Summary of processed XML files: Success: {copied_files}, Skipped: {skipped_files}, Fail: {failed_files} ({time.perf_counter() - start:.2f}s)")
+    except Exception as e:
+        extract_logger.error(f"Error during XML extraction: {e}")
+    return kcd2_xmls, counters
+
+def run_icon_extraction(kcd2_icons, extract_workers, memory_cap, convert_workers, texconv_command=None, extract_logger=logger, cancel=None):
+    """Extract and convert the item icons; returns kcd2_icons and the icon counters. Setting `cancel` stops the conversions early."""
+    counters = {
+        "merge_success": 0, "merge_fail": 0, "convert_success": 0, "convert_fail": 0, "convert_skipped": 0,
+        "changes": {"added": 0, "changed": 0, "removed": 0}
+    }
+    try:
+        extract_logger.info("Starting icon extraction process.")
+        start = time.perf_counter()
+        with track("icon_extraction") as record:
+            merge_success_count, merge_fail_count, convert_success_count, convert_fail_count, convert_skipped_count, kcd2_icons, icon_changes = process_icons(extract_logger, kcd2_icons, extract_workers, memory_cap, convert_workers, texconv_command, cancel)
+            record["items"] = convert_success_count
+        counters.update(
+            merge_success=merge_success_count, merge_fail=merge_fail_count, convert_success=convert_success_count,
+            convert_fail=convert_fail_count, convert_skipped=convert_skipped_count, changes=icon_changes
+        )
+        extract_logger.info(f"Summary of merged DDS files: Success: {merge_success_count}, Skipped: 0, Fail: {merge_fail_count}")
+        extract_logger.info(f"Summary of converted DDS files: Success: {convert_success_count}, Skipped: {convert_skipped_count}, Fail: {convert_fail_count} ({time.perf_counter() - start:.2f}s)")
+    except ExtractionCancelled:
+        extract_logger.warning("Icon extraction stopped early; unconverted icons are picked up by the next run")
+    except Exception as e:
+        extract_logger.error(f"Error during icon extraction: {e}")
+    return kcd2_icons, counters
+
+def prepare_extraction() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Sync version.json with the game and index the XMLs and icons extracted by earlier runs."""
     # Ensure output directories exist
     log_dir.mkdir(parents=True, exist_ok=True)
     data_dir.mkdir(parents=True, exist_ok=True)
@@ -74,27 +120,17 @@ def data_extract():
     with open(log_dir / 'kcd2_icons_init.json', 'w') as f:
         json.dump(kcd2_icons, f, indent=4)
 
-    # Run XML extraction
-    try:
-        logger.info("Starting XML extraction process.")
-        copied_files, skipped_files, failed_files, kcd2_xmls = extract_files(logger, kcd2_xmls)
-        summary_processed_xml = f"Summary of processed XML files: Success: {copied_files}, Skipped: {skipped_files}, Fail: {failed_files}"
-        logger.info(summary_processed_xml)
-    except Exception as e:
-        logger.error(f"Error during XML extraction: {e}")
+    return kcd2_xmls, kcd2_icons
 
-    # Run icon extraction
-    try:
-        logger.info("Starting icon extraction process.")
-        merge_success_count, merge_fail_count, convert_success_count, convert_fail_count, convert_skipped_count, kcd2_icons = process_icons(logger, kcd2_icons)
-        summary_merge_dds = f"Summary of merged DDS files: Success: {merge_success_count}, Skipped: 0, Fail: {merge_fail_count}"
-        summary_convert_dds = f"Summary of converted DDS files: Success: {convert_success_count}, Skipped: {convert_skipped_count}, Fail: {convert_fail_count}"
-        final_success_count = convert_success_count + merge_success_count
-        final_fail_count = convert_fail_count + merge_fail_count - merge_success_count
-        logger.info(summary_merge_dds)
-        logger.info(summary_convert_dds)
-    except Exception as e:
-        logger.error(f"Error during icon extraction: {e}")
+def finish_extraction(kcd2_xmls, kcd2_icons, xml_counters, icon_counters) -> None:
+    """Write the final dictionaries to the logs folder and log the summary table."""
+    copied_files, skipped_files, failed_files = xml_counters["copied"], xml_counters["skipped"], xml_counters["failed"]
+    xml_changes, icon_changes = xml_counters["changes"], icon_counters["changes"]
+    merge_success_count, merge_fail_count = icon_counters["merge_success"], icon_counters["merge_fail"]
+    convert_success_count, convert_fail_count = icon_counters["convert_success"], icon_counters["convert_fail"]
+    convert_skipped_count = icon_counters["convert_skipped"]
+    final_success_count = convert_success_count + merge_success_count
+    final_fail_count = convert_fail_count + merge_fail_count - merge_success_count
 
     # Write the dictionaries to log files in the logs folder
     with open(log_dir / 'kcd2_xmls.json', 'w') as f:
@@ -106,21 +142,77 @@ def data_extract():
     # Create a summary table
     summary_table = (
         f"{'End of Extraction Log'}\n"
-        f"{'='*50}\n"
-        f"{'Summary':^50}\n"
-        f"{'='*50}\n"
-        f"{'Operation':<20}{'Success':<10}{'Skipped':<10}{'Fail':<10}\n"
-        f"{'-'*50}\n"
-        f"{'Processed XML':<20}{copied_files:<10}{skipped_files:<10}{failed_files:<10}\n"
+        f"{'='*80}\n"
+        f"{'Summary':^80}\n"
+        f"{'='*80}\n"
+        f"{'Operation':<20}{'Success':<10}{'Skipped':<10}{'Fail':<10}{'Added':<10}{'Changed':<10}{'Removed':<10}\n"
+        f"{'-'*80}\n"
+        f"{'Processed XML':<20}{copied_files:<10}{skipped_files:<10}{failed_files:<10}"
+        f"{xml_changes['added']:<10}{xml_changes['changed']:<10}{xml_changes['removed']:<10}\n"
         f"{'Converted DDS':<20}{convert_success_count:<10}{convert_skipped_count:<10}{convert_fail_count:<10}\n"
         f"{'Fixed DDS':<20}{merge_success_count:<10}{0:<10}{merge_fail_count:<10}\n"
         f"{'Final DDS':<20}{final_success_count:<10}{convert_skipped_count:<10}{final_fail_count:<10}\n"
-        f"{'='*50}\n"
+        f"{'WEBP icons':<20}{'':<10}{'':<10}{'':<10}"
+        f"{icon_changes['added']:<10}{icon_changes['changed']:<10}{icon_changes['removed']:<10}\n"
+        f"{'='*80}\n"
     )
 
     logger.info(summary_table)
 
-    return kcd2_xmls, kcd2_icons
+class DataExtraction:
+    """
+    XML and icon extraction started by `start_data_extract`. In concurrent mode the two pipelines run
+    side by side; `xmls()` returns as soon as the XML side is done, while icons may still be converting.
+    """
+
+    def __init__(self, extract_workers=DEFAULT_WORKERS, memory_cap=DEFAULT_MEMORY_CAP, convert_workers=DEFAULT_CONVERT_WORKERS, texconv_command=None, concurrent=False):
+        self.start = time.perf_counter()
+        kcd2_xmls, kcd2_icons = prepare_extraction()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cancel = threading.Event()
+        if concurrent:
+            # Both pipelines read paks at once, so they split the extraction workers and the memory cap;
+            # only the icon side converts, so it keeps every conversion worker
+            memory_cap //= 2
+            xml_workers = max(1, extract_workers // 2)
+            icon_workers = max(1, extract_workers - xml_workers)
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="data-extract")
+            self._xml_future = self._executor.submit(run_xml_extraction, kcd2_xmls, xml_workers, memory_cap, logger.getChild("xml"))
+            self._icon_future = self._executor.submit(
+                run_icon_extraction, kcd2_icons, icon_workers, memory_cap, convert_workers, texconv_command, logger.getChild("icons"), self._cancel
+            )
+        else:
+            self._xml_result = run_xml_extraction(kcd2_xmls, extract_workers, memory_cap)
+            self._icon_result = run_icon_extraction(kcd2_icons, extract_workers, memory_cap, convert_workers, texconv_command)
+
+    def xmls(self) -> Dict[str, str]:
+        """kcd2_xmls, waiting for the XML side only."""
+        return (self._xml_future.result() if self._executor else self._xml_result)[0]
+
+    def close(self) -> None:
+        """Stop the icon conversions still running and wait for both sides, discarding the results; for a build that failed."""
+        if self._executor:
+            self._cancel.set()
+            self._executor.shutdown()
+            self._executor = None
+
+    def finish(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Wait for both pipelines, log the summary, and return kcd2_xmls and kcd2_icons."""
+        if self._executor:
+            self._xml_result, self._icon_result = self._xml_future.result(), self._icon_future.result()
+            self._executor.shutdown()
+            self._executor = None
+        (kcd2_xmls, xml_counters), (kcd2_icons, icon_counters) = self._xml_result, self._icon_result
+        finish_extraction(kcd2_xmls, kcd2_icons, xml_counters, icon_counters)
+        logger.info(f"Data extraction took {time.perf_counter() - self.start:.2f}s")
+        return kcd2_xmls, kcd2_icons
+
+def start_data_extract(extract_workers=DEFAULT_WORKERS, memory_cap=DEFAULT_MEMORY_CAP, convert_workers=DEFAULT_CONVERT_WORKERS, texconv_command=None, concurrent=False) -> DataExtraction:
+    """Start extracting the XMLs and icons; call `finish()` on the result to wait for both."""
+    return DataExtraction(extract_workers, memory_cap, convert_workers, texconv_command, concurrent)
+
+def data_extract(extract_workers=DEFAULT_WORKERS, memory_cap=DEFAULT_MEMORY_CAP, convert_workers=DEFAULT_CONVERT_WORKERS, texconv_command=None, concurrent=False):
+    return start_data_extract(extract_workers, memory_cap, convert_workers, texconv_command, concurrent).finish()
 
 if __name__ == "__main__":
     data_extract()
\ No newline at end of file
@@ -0,0 +1,69 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+from services.helper import atomic_write
+
+# Top-level data.json keys written as their own shard; everything else except "version" goes to core
+REFERENCE_TABLES = ["weapon_types", "armor_types", "dice_badges"]
+SHARD_MANIFEST = "manifest.json"
+
+def id_range(records) -> Optional[List]:
+    """Smallest and largest Id (or id) of a list of records, or None when there is nothing to compare."""
+    if not isinstance(records, list):
+        return None
+    ids: List[Any] = [record.get("Id", record.get("id")) for record in records if isinstance(record, dict)]
+    ids = [record_id for record_id in ids if record_id is not None]
+    if not ids or len({type(record_id) for record_id in ids}) > 1:
+        return None
+    return [min(ids), max(ids)]
+
+def split_shards(data: dict) -> Dict[str, Any]:
+    """Split a data.json document into shards: one per items subcategory, one per reference table, and core."""
+    shards: Dict[str, Any] = {
+        f"items.{subcategory}": items for subcategory, items in data.get("items", {}).items()
+    }
+    for table in REFERENCE_TABLES:
+        if table in data:
+            shards[table] = data[table]
+    # The version is kept out of the shards, so unchanged shards keep their hash across game versions
+    shards["core"] = {key: value for key, value in data.items() if key not in ("version", "items", *REFERENCE_TABLES)}
+    return shards
+
+def write_data_shards(data: dict, output_dir: Path) -> Path:
+    """
+    Write data.json as minified JSON shards under output_dir/shards and a manifest listing
+    each shard's file, hash, size, record count and Id range. Returns the manifest path.
+    """
+    shard_dir = output_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    shard_entries: Dict[str, dict] = {}
+    manifest = {"version": data.get("version"), "shards": shard_entries}
+
+    for name, shard in split_shards(data).items():
+        raw = json.dumps(shard, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        shard_file = shard_dir / f"{name}.json"
+        digest = hashlib.sha256(raw).hexdigest()
+        if not shard_file.exists() or hashlib.sha256(shard_file.read_bytes()).hexdigest() != digest:
+            with atomic_write(shard_file, 'wb') as f:
+                f.write(raw)
+        shard_entries[name] = {
+            "file": shard_file.name,
+            "sha256": digest,
+            "size": len(raw),
+            "count": len(shard),
+            "id_range": id_range(shard)
+        }
+
+    # Shards of subcategories or tables that are gone
+    for stale_file in shard_dir.glob("*.json"):
+        if stale_file.name != SHARD_MANIFEST and stale_file.stem not in shard_entries:
+            os.remove(stale_file)
+
+    manifest_file = shard_dir / SHARD_MANIFEST
+    with atomic_write(manifest_file) as f:
+        json.dump(manifest, f, indent=4)
+    logger.info(f"Saved {len(shard_entries)} data.json shards, manifest at {os.path.relpath(manifest_file)}")
+    return manifest_file
@@ -0,0 +1,37 @@
+import re
+import struct
+from typing import Dict, Optional
+
+# CryEngine streams large textures as split DDS files: `name.dds` keeps the header and the
+# smallest mips, `name.dds.1` .. `name.dds.N` hold the bigger mips, with `.dds.N` the largest.
+# Re-joining them in the order header, .dds.N .. .dds.1, rest of .dds gives a regular DDS.
+
+DDS_MAGIC = b'DDS '
+DDS_HEADER_SIZE = 4 + 124  # Magic plus DDS_HEADER
+DX10_HEADER_SIZE = 20
+_FOURCC_OFFSET = 4 + 80  # ddspf.dwFourCC
+
+_PART_SUFFIX = re.compile(r'\.dds\.(\d+)$', re.IGNORECASE)
+
+def split_part_number(name: str) -> Optional[int]:
+    """Return N for a `.dds.N` mip chunk, or None for any other file (including `.dds.Na` alpha chunks)."""
+    match = _PART_SUFFIX.search(name)
+    return int(match.group(1)) if match else None
+
+def dds_header_size(dds: bytes) -> int:
+    """Return the size of the DDS header in `dds`, including the DX10 extension when present."""
+    if len(dds) < DDS_HEADER_SIZE or dds[:4] != DDS_MAGIC:
+        raise ValueError("Not a DDS file")
+    (four_cc,) = struct.unpack_from('4s', dds, _FOURCC_OFFSET)
+    size = DDS_HEADER_SIZE + (DX10_HEADER_SIZE if four_cc == b'DX10' else 0)
+    if len(dds) < size:
+        raise ValueError("Truncated DX10 header")
+    return size
+
+def merge_split_dds(dds: bytes, parts: Dict[int, bytes]) -> bytes:
+    """Re-join a split DDS from its `.dds` file and its `.dds.N` chunks keyed by N."""
+    missing = set(range(1, max(parts, default=0) + 1)) - parts.keys()
+    if missing:
+        raise ValueError(f"Missing split DDS chunks: {', '.join(f'.dds.{n}' for n in sorted(missing))}")
+    header_size = dds_header_size(dds)
+    return b''.join([dds[:header_size], *(parts[n] for n in sorted(parts, reverse=True)), dds[header_size:]])
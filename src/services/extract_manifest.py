@@ -0,0 +1,87 @@
+import os
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+from services.helper import atomic_write
+
+# Bump when the manifest layout changes so outputs are re-extracted once
+MANIFEST_FORMAT_VERSION = 1
+
+# Pak member name -> (CRC, uncompressed size)
+MemberSignature = Dict[str, Tuple[int, int]]
+
+class ExtractManifest:
+    """
+    Pak CRC and size of the members behind every extracted output, keyed by XmlId or IconId.
+    Lets extraction skip outputs whose source members are unchanged and notice removed members.
+    """
+
+    def __init__(self, manifest_file: Path, entries: Dict[str, dict]):
+        self.manifest_file = manifest_file
+        self.entries = entries
+        self.changes = {"added": 0, "changed": 0, "removed": 0}
+
+    @classmethod
+    def load(cls, manifest_file: Path) -> "ExtractManifest":
+        """Load a manifest, starting empty when it is missing or from an older format."""
+        entries: Dict[str, dict] = {}
+        if manifest_file.exists():
+            try:
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                if payload.get("format") == MANIFEST_FORMAT_VERSION:
+                    entries = payload["entries"]
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable extraction manifest {os.path.relpath(manifest_file)}: {e}")
+        return cls(manifest_file, entries)
+
+    def is_current(self, key: str, members: MemberSignature) -> bool:
+        """Whether the output for `key` was extracted from exactly these members."""
+        entry = self.entries.get(key)
+        return entry is not None and entry["members"] == {name: list(signature) for name, signature in members.items()}
+
+    def record(self, key: str, output: str, members: MemberSignature, replaced: bool = False, **fields) -> None:
+        """
+        Record a (re-)extracted output and count it as added, or changed when it replaced an existing output.
+        Extra `fields` are stored with the entry.
+        """
+        self.changes["changed" if replaced or key in self.entries else "added"] += 1
+        self.entries[key] = {"output": output, "members": {name: list(signature) for name, signature in members.items()}, **fields}
+
+    def remove_missing(self, present_keys, base_dir: Path, own_outputs: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Delete the outputs whose source members vanished from the pak and return their keys.
+        An output that remaining entries still point at (shared icons) is kept: it is moved to the path
+        `own_outputs` gives for the first of them, and they are all pointed at it, so the removed key's
+        file name does not bring it back on the next run.
+        """
+        removed = [key for key in self.entries if key not in present_keys]
+        removed_outputs = {self.entries.pop(key)["output"] for key in removed}
+        for output in sorted(removed_outputs):
+            sharing = sorted(key for key, entry in self.entries.items() if entry["output"] == output)
+            if sharing and own_outputs and sharing[0] in own_outputs:
+                self._move_output(output, own_outputs[sharing[0]], sharing, base_dir)
+        kept_outputs = {entry["output"] for entry in self.entries.values()}
+        for output in sorted(removed_outputs - kept_outputs):
+            output_path = base_dir / output
+            if output_path.exists():
+                os.remove(output_path)
+            logger.info(f"Removed {os.path.relpath(output_path, base_dir)} (source no longer in pak)")
+        self.changes["removed"] += len(removed)
+        return removed
+
+    def _move_output(self, output: str, new_output: str, keys: List[str], base_dir: Path) -> None:
+        output_path, new_path = base_dir / output, base_dir / new_output
+        if output_path.exists():
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(output_path, new_path)
+        for key in keys:
+            self.entries[key]["output"] = new_output
+        self.changes["changed"] += len(keys)
+        logger.info(f"Moved {output} to {new_output}, which {len(keys)} remaining entries share")
+
+    def save(self) -> None:
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.manifest_file, encoding='utf-8') as f:
+            json.dump({"format": MANIFEST_FORMAT_VERSION, "entries": self.entries}, f, indent=1, sort_keys=True)
@@ -0,0 +1,100 @@
+import string
+from typing import Any, Callable, Dict, List, Tuple, Union
+import xml.etree.ElementTree as ET
+from utils.logger import logger
+from templates.data_json_mappings import item_attr_mapping, item_stats_mapping, attr_transform, stat_transform
+
+Value = Union[str, int, float]
+Transformation = Tuple[List[str], Callable[[Dict[str, Value], dict], Any]]
+
+# float() only accepts text starting with a digit, sign, dot, whitespace or inf/nan,
+# so values starting with any other ASCII letter can skip the conversion attempt
+_NON_NUMERIC_START = frozenset(string.ascii_letters) - frozenset("iInN")
+
+def coerce_value(value: str) -> Value:
+    """Convert an attribute to int or float the same way extract_data does, keeping text as str."""
+    if value[:1] in _NON_NUMERIC_START:
+        return value
+    try:
+        numeric_value = float(value)
+    except ValueError:
+        return value
+    return int(numeric_value) if numeric_value.is_integer() else numeric_value
+
+class ExtractionPlan:
+    """
+    Extractor for one item_type, compiled from a mapping and its transformations.
+    Produces the same result as extract_data without rebuilding the key list or
+    testing transformations that can never apply to this item_type.
+    """
+    __slots__ = ("item_type", "keys", "transforms", "consumed_keys")
+
+    def __init__(self, item_type: str, mapping: Dict[str, List[str]], transformations: Dict[str, Transformation]):
+        self.item_type = item_type
+        self.keys = tuple(dict.fromkeys(mapping.get("default", []) + mapping.get(item_type, [])))
+
+        # A transformation only runs when one of its required keys was extracted
+        self.transforms = tuple(
+            (key, tuple(required_keys), formula)
+            for key, (required_keys, formula) in transformations.items()
+            if any(required_key in self.keys for required_key in required_keys)
+        )
+
+        # Every key required by any transformation is removed from the raw data
+        self.consumed_keys = tuple(
+            key for key in self.keys
+            if any(key in required_keys for required_keys, _ in transformations.values())
+        )
+
+    def extract(self, item: ET.Element, data: dict) -> Dict[str, Value]:
+        """Extract and transform the planned keys from an item element."""
+        get = item.get
+        raw_data: Dict[str, Value] = {}
+        for key in self.keys:
+            value = get(key)
+            if value is not None:
+                raw_data[key] = coerce_value(value)
+
+        transformed_data: Dict[str, Value] = {}
+        for key, required_keys, formula in self.transforms:
+            for required_key in required_keys:
+                if required_key in raw_data:
+                    break
+            else:
+                continue
+            try:
+                result = formula(raw_data, data)
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Failed to apply transformation for '{key}': {e}")
+                continue
+            if isinstance(result, dict):
+                transformed_data.update(result)
+            else:
+                transformed_data[key] = result
+
+        for key in self.consumed_keys:
+            raw_data.pop(key, None)
+
+        # Same key order as {**raw_data, **transformed_data}
+        raw_data.update(transformed_data)
+        return raw_data
+
+def compile_item_plans(
+    attr_mapping: Dict[str, List[str]] = item_attr_mapping,
+    stats_mapping: Dict[str, List[str]] = item_stats_mapping,
+    attr_transformations: Dict[str, Transformation] = attr_transform,
+    stat_transformations: Dict[str, Transformation] = stat_transform
+) -> Dict[str, Tuple[ExtractionPlan, ExtractionPlan]]:
+    """Compile (attributes, stats) extraction plans for every item_type named in the mappings."""
+    item_types = dict.fromkeys(key for key in [*attr_mapping, *stats_mapping] if key != "default")
+    plans = {}
+    for item_type in item_types:
+        plans[item_type] = (
+            ExtractionPlan(item_type, attr_mapping, attr_transformations),
+            ExtractionPlan(item_type, stats_mapping, stat_transformations)
+        )
+        logger.debug(
+            f"Compiled extraction plan for {item_type}: "
+            f"attributes {list(plans[item_type][0].keys)}, stats {list(plans[item_type][1].keys)}"
+        )
+    return plans
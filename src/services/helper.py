@@ -1,9 +1,12 @@
 import os
 import json
+import tempfile
+import multiprocessing
+from multiprocessing.context import BaseContext
 from pathlib import Path
+from contextlib import contextmanager
 from utils.logger import logger
-from functools import lru_cache
-from typing import Dict, List, Union, Tuple, Callable
+from typing import Dict, Iterator, List, Optional, Union, Tuple, Callable
 import xml.etree.ElementTree as ET
 
 def ensure_file_exists(file_dir, description="File"):
@@ -24,6 +27,36 @@ def save_json(data, file_dir):
         json.dump(data, f, indent=4)
     logger.info(f"Saved JSON data to {os.path.relpath(file_dir)}")
 
+# Permissions for newly written files; mkstemp would otherwise leave them private to the owner
+_umask = os.umask(0)
+os.umask(_umask)
+NEW_FILE_MODE = 0o666 & ~_umask
+
+@contextmanager
+def atomic_write(file_path, mode='w', **kwargs):
+    """
+    Open a temp file next to `file_path` and move it over `file_path` once the block succeeds.
+    On failure the temp file is removed and the original file is left untouched.
+    """
+    file_path = Path(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".tmp", dir=file_path.parent)
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.chmod(temp_path, file_path.stat().st_mode & 0o777 if file_path.exists() else NEW_FILE_MODE)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def process_pool_context() -> BaseContext:
+    """
+    Start method for worker process pools. Pools start while other threads run and log, and a forked
+    child can inherit a lock one of them holds, so workers come from a forkserver (spawn where there is none).
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
 def load_data_json(output_dir):
     """Load the data.json file."""
     data_json_file = output_dir / "data.json"
@@ -32,17 +65,51 @@ def load_data_json(output_dir):
         return json.load(f), data_json_file
 
 def save_data_json(data, data_json_file):
-    """Save the updated data.json file."""
-    with open(data_json_file, 'w') as f:
+    """Save the updated data.json file, replacing it atomically so a failed write never leaves it half-written."""
+    with atomic_write(data_json_file) as f:
         json.dump(data, f, indent=4)
     logger.info(f"Updated data.json saved at {os.path.relpath(data_json_file)}")
 
-@lru_cache(maxsize=None)
 def parse_xml(file_path):
     """Parse an XML file and return the root element."""
     ensure_file_exists(file_path, "XML file")
     return ET.parse(file_path).getroot()
 
+def iter_streamed_elements(
+    file_path,
+    is_match: Callable[[ET.Element, List[ET.Element]], bool]
+) -> Iterator[ET.Element]:
+    """
+    Stream the elements for which `is_match(element, ancestors)` is true, each with its full subtree.
+    Finished elements are detached from the tree, so memory is bounded by the largest match.
+    """
+    ensure_file_exists(file_path, "XML file")
+    ancestors: List[ET.Element] = []
+    match_depth: Optional[int] = None
+    for event, elem in ET.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            if match_depth is None and is_match(elem, ancestors):
+                match_depth = len(ancestors)
+            ancestors.append(elem)
+            continue
+
+        ancestors.pop()
+        if match_depth is not None:
+            if len(ancestors) > match_depth:
+                continue  # Keep the subtree of the match until the match itself is finished
+            match_depth = None
+            yield elem
+
+        # Earlier siblings are already gone, so this is always the first child
+        if ancestors:
+            ancestors[-1].remove(elem)
+
+def iter_item_classes(file_path) -> Iterator[ET.Element]:
+    """Stream the children of every <ItemClasses> element (the same elements as `.//ItemClasses/*`)."""
+    return iter_streamed_elements(
+        file_path, lambda elem, ancestors: len(ancestors) > 1 and ancestors[-1].tag == "ItemClasses"
+    )
+
 def extract_data(
     item: ET.Element,
     item_type: str,
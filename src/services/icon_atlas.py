@@ -0,0 +1,205 @@
+import io
+import os
+import json
+import math
+import zlib
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+from utils.logger import logger
+from services.helper import atomic_write
+
+DEFAULT_ATLAS_SHEETS = 1  # Sheets per subcategory
+ATLAS_PADDING = 1  # Transparent pixels between icons, so scaled sprites do not bleed into each other
+WEBP_MAX_SIZE = 16383  # Largest width or height a WEBP can have
+
+base_dir = Path(__file__).resolve().parent.parent.parent
+
+def icons_by_subcategory(items: Dict[str, List[dict]], kcd2_icons: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """
+    Map the IconIds used by each subcategory to their WEBP, sorted by IconId.
+    An IconId is placed in the first subcategory using it; IconIds only differing in case still match.
+    """
+    icons_lower = {IconId.lower(): path for IconId, path in kcd2_icons.items()}
+    grouped: Dict[str, Dict[str, str]] = {}
+    placed = set()
+    missing = set()
+    for subcategory, subcategory_items in items.items():
+        group = grouped.setdefault(subcategory, {})
+        for item in subcategory_items:
+            IconId = item.get("IconId")
+            if not IconId or IconId in placed:
+                continue
+            path = kcd2_icons.get(IconId) or icons_lower.get(IconId.lower())
+            if path is None:
+                missing.add(IconId)
+                continue
+            group[IconId] = path
+            placed.add(IconId)
+        grouped[subcategory] = dict(sorted(group.items()))
+
+    if missing:
+        logger.warning(f"{len(missing)} IconIds have no icon and are left out of the atlases.")
+        logger.debug(f"IconIds without an icon: {', '.join(sorted(missing))}")
+    return grouped
+
+def assign_sheets(icons: Dict[str, str], sheets: int) -> List[Dict[str, str]]:
+    """
+    Split icons over `sheets` sheets by a stable hash of their WEBP path, so an icon stays on
+    the same sheet across builds and icons sharing a WEBP share a sheet.
+    """
+    assigned: List[Dict[str, str]] = [{} for _ in range(sheets)]
+    for IconId, path in icons.items():
+        assigned[zlib.crc32(path.encode('utf-8')) % sheets][IconId] = path
+    return assigned
+
+def pack_shelves(sizes: Dict[str, Tuple[int, int]], padding: int = ATLAS_PADDING) -> Tuple[int, int, Dict[str, Tuple[int, int]]]:
+    """
+    Place images on shelves, tallest first (ties by key), in a sheet about as wide as it is tall.
+    Returns the sheet width, height and the top-left corner of every key.
+    """
+    if not sizes:
+        return 0, 0, {}
+    area = sum((w + padding) * (h + padding) for w, h in sizes.values())
+    sheet_width = max(max(w for w, _ in sizes.values()), math.ceil(math.sqrt(area)))
+
+    positions: Dict[str, Tuple[int, int]] = {}
+    x = y = shelf_height = 0
+    for key, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x and x + w > sheet_width:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        positions[key] = (x, y)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+    sheet_width = max(px + sizes[key][0] for key, (px, _) in positions.items())
+    return sheet_width, y + shelf_height, positions
+
+# (icons, width, height, top-left corner of every WEBP) of one atlas sheet
+SheetLayout = Tuple[Dict[str, str], int, int, Dict[str, Tuple[int, int]]]
+
+def layout_sheets(icons: Dict[str, str], sizes: Dict[str, Tuple[int, int]], sheets: int) -> Optional[List[SheetLayout]]:
+    """
+    Assign icons to at least `sheets` sheets and pack each one, adding sheets until every sheet fits
+    within WEBP_MAX_SIZE. Returns None when no number of sheets fits, i.e. an icon alone is too large.
+    """
+    paths = set(icons.values())
+    area = sum((sizes[path][0] + ATLAS_PADDING) * (sizes[path][1] + ATLAS_PADDING) for path in paths)
+    count = max(sheets, math.ceil(area / WEBP_MAX_SIZE ** 2))
+    while True:
+        layouts: List[SheetLayout] = []
+        for sheet_icons in assign_sheets(icons, count):
+            width, height, positions = pack_shelves({path: sizes[path] for path in set(sheet_icons.values())})
+            if max(width, height) > WEBP_MAX_SIZE:
+                break
+            layouts.append((sheet_icons, width, height, positions))
+        else:
+            return layouts
+        if count >= len(paths):
+            return None
+        count += 1
+
+def sheet_key(width: int, height: int, positions: Dict[str, Tuple[int, int]], crcs: Dict[str, int]) -> str:
+    """Hash of what a sheet's pixels depend on: its size, and each WEBP's position and CRC."""
+    placed = [[path, x, y, crcs[path]] for path, (x, y) in sorted(positions.items())]
+    payload = json.dumps({"padding": ATLAS_PADDING, "width": width, "height": height, "icons": placed}, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def file_hash(file_path: Path) -> str:
+    """The short sha256 icon_atlas.json gives for a sheet file."""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def load_atlas_index(index_file: Path) -> dict:
+    """The icon_atlas.json of an earlier build, or an empty index."""
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def build_icon_atlases(
+    items: Dict[str, List[dict]],
+    kcd2_icons: Dict[str, str],
+    output_dir: Path,
+    sheets: int = DEFAULT_ATLAS_SHEETS
+) -> Path:
+    """
+    Pack the icons of each subcategory into `sheets` lossless WEBP atlases under output_dir/atlases
+    and write icon_atlas.json, which gives the sheet and rectangle of every IconId. A subcategory too
+    large for `sheets` WEBPs gets as many more sheets as it needs.
+    The layout only depends on the icons, so unchanged sheets come out byte-identical; a sheet whose
+    key and file still match the previous index is kept without decoding its icons again.
+    """
+    atlas_dir = output_dir / "atlases"
+    atlas_dir.mkdir(parents=True, exist_ok=True)
+    index_file = output_dir / "icon_atlas.json"
+    previous_sheets = load_atlas_index(index_file).get("sheets", {})
+    index: Dict[str, dict] = {"sheets": {}, "icons": {}}
+    reused = 0
+
+    for subcategory, icons in icons_by_subcategory(items, kcd2_icons).items():
+        if not icons:
+            continue
+        # Icons sharing a WEBP are drawn once and share a rectangle; only the headers are read for the layout
+        sources: Dict[str, bytes] = {}
+        sizes: Dict[str, Tuple[int, int]] = {}
+        for path in sorted(set(icons.values())):
+            with open(base_dir / path, 'rb') as f:
+                sources[path] = f.read()
+            with Image.open(io.BytesIO(sources[path])) as img:
+                sizes[path] = img.size
+        crcs = {path: zlib.crc32(source) for path, source in sources.items()}
+        layouts = layout_sheets(icons, sizes, sheets)
+        if layouts is None:
+            logger.warning(f"Icons of {subcategory} do not fit in a {WEBP_MAX_SIZE}px WEBP, leaving them out of the atlases")
+            continue
+        if len(layouts) > sheets:
+            logger.info(f"Packing {subcategory} into {len(layouts)} atlas sheets to stay within the WEBP size limit")
+
+        for sheet_number, (sheet_icons, width, height, positions) in enumerate(layouts):
+            if not sheet_icons:
+                continue
+            sheet_name = f"{subcategory}_{sheet_number}"
+            sheet_file = atlas_dir / f"{sheet_name}.webp"
+            key = sheet_key(width, height, positions, crcs)
+
+            previous = previous_sheets.get(sheet_name, {})
+            if previous.get("key") == key and sheet_file.exists() and file_hash(sheet_file) == previous.get("hash"):
+                sheet_hash = previous["hash"]
+                reused += 1
+            else:
+                sheet = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+                for path, (x, y) in positions.items():
+                    with Image.open(io.BytesIO(sources[path])) as img:
+                        sheet.paste(img.convert('RGBA'), (x, y))
+                with atomic_write(sheet_file, 'wb') as f:
+                    sheet.save(f, 'WEBP', lossless=True)
+                sheet_hash = file_hash(sheet_file)
+
+            index["sheets"][sheet_name] = {
+                "file": os.path.relpath(sheet_file, base_dir).replace('\\', '/'),
+                "hash": sheet_hash,
+                "key": key,
+                "width": width,
+                "height": height
+            }
+            for IconId, path in sheet_icons.items():
+                x, y = positions[path]
+                w, h = sizes[path]
+                index["icons"][IconId] = {"sheet": sheet_name, "x": x, "y": y, "w": w, "h": h}
+            logger.debug(f"Packed {len(sheet_icons)} icons into {sheet_name} ({width}x{height})")
+
+    # Sheets from an earlier build with more sheets or other subcategories
+    for stale_file in atlas_dir.glob("*.webp"):
+        if stale_file.stem not in index["sheets"]:
+            os.remove(stale_file)
+
+    index["icons"] = dict(sorted(index["icons"].items()))
+    with atomic_write(index_file) as f:
+        json.dump(index, f, indent=4)
+    logger.info(
+        f"Packed {len(index['icons'])} icons into {len(index['sheets'])} atlas sheets ({reused} unchanged), "
+        f"index saved at {os.path.relpath(index_file)}"
+    )
+    return index_file
@@ -0,0 +1,226 @@
+import os
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from utils.logger import logger
+from services.helper import iter_item_classes, should_filter_item, get_subcategory, process_pool_context
+from services.extraction_plan import compile_item_plans
+from services.armor_classifier import ArmorTypeClassifier, ArmorTypeStats
+from templates.data_json_mappings import construct_item_data
+
+# Read-only build state shared by every chunk parsed in this process.
+# Pool workers receive it once through the initializer instead of once per task.
+_item_context: dict = {}
+
+def init_item_context(data: dict, text_ui_mapping: Dict[str, Dict[str, Optional[str]]]) -> None:
+    """Set the build state used by parse_item_chunk in the current process."""
+    _item_context.clear()
+    _item_context.update(
+        data=data,
+        valid_categories=set(data["categories"]),
+        armor_classifier=ArmorTypeClassifier(data.get("armor_types", [])),
+        text_ui_mapping=text_ui_mapping,
+        plans=compile_item_plans()
+    )
+
+# (start, end) byte offsets of a run of items inside one <ItemClasses> element
+ByteRange = Tuple[int, int]
+
+def scan_item_ranges(file_path: Path) -> Tuple[List[List[ByteRange]], Optional[str]]:
+    """
+    Byte range of every item (child of an <ItemClasses> element) of an item XML file, grouped by <ItemClasses>
+    element, along with the encoding the file declares. A single expat pass that builds no elements,
+    so the file can be split into chunks that are each parsed once. Raises ET.ParseError for malformed files.
+    """
+    groups: List[List[ByteRange]] = []
+    ancestors: List[str] = []
+    item_depth: List[Optional[int]] = [None]  # Depth of the item being scanned; its subtree is skipped
+    encoding: List[Optional[str]] = [None]
+    parser = expat.ParserCreate()
+
+    def close_item() -> None:
+        group = groups[-1]
+        if group and group[-1][1] < 0:
+            group[-1] = (group[-1][0], parser.CurrentByteIndex)
+
+    def start_element(name: str, _attrs) -> None:
+        if item_depth[0] is None:
+            if len(ancestors) > 1 and ancestors[-1] == "ItemClasses":
+                close_item()
+                groups[-1].append((parser.CurrentByteIndex, -1))
+                item_depth[0] = len(ancestors)
+            elif name == "ItemClasses":
+                groups.append([])
+        ancestors.append(name)
+
+    def end_element(name: str) -> None:
+        ancestors.pop()
+        if item_depth[0] == len(ancestors):
+            item_depth[0] = None
+        elif item_depth[0] is None and name == "ItemClasses" and groups:
+            close_item()
+
+    def xml_decl(_version, declared_encoding, _standalone) -> None:
+        encoding[0] = declared_encoding
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.XmlDeclHandler = xml_decl
+    try:
+        with open(file_path, 'rb') as f:
+            parser.ParseFile(f)
+    except expat.ExpatError as e:
+        raise ET.ParseError(str(e)) from e
+    return [group for group in groups if group], encoding[0]
+
+def _iter_chunk_items(file_path: Path, byte_range: Optional[ByteRange], encoding: Optional[str]) -> Iterator[ET.Element]:
+    if byte_range is None:
+        yield from iter_item_classes(file_path)
+        return
+    start, end = byte_range
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    declaration = f'<?xml version="1.0" encoding="{encoding}"?>'.encode('ascii') if encoding else b''
+    yield from ET.fromstring(declaration + b"<ItemClasses>" + raw + b"</ItemClasses>")
+
+def parse_item_chunk(
+    file_path: Path,
+    byte_range: Optional[ByteRange] = None,
+    first_position: int = 0,
+    encoding: Optional[str] = None
+) -> Tuple[List[Tuple[int, str, dict]], ArmorTypeStats]:
+    """
+    Parse and transform the items of an item XML file in `byte_range` (a run found by scan_item_ranges),
+    or every item of the file when it is None. `first_position` is the document position of the first one.
+    Returns (position, subcategory, item_data) tuples so chunks can be merged back in document order,
+    along with the armor classification statistics of the chunk.
+    """
+    data = _item_context["data"]
+    valid_categories = _item_context["valid_categories"]
+    armor_classifier = _item_context["armor_classifier"]
+    armor_classifier.stats = ArmorTypeStats()
+    text_ui_mapping = _item_context["text_ui_mapping"]
+    plans = _item_context["plans"]
+
+    items: List[Tuple[int, str, dict]] = []
+    for position, item in enumerate(_iter_chunk_items(file_path, byte_range, encoding), first_position):
+        # Handle regular items
+        if item.tag in valid_categories:
+            if should_filter_item(item):
+                continue
+
+            # Determine the item type and subcategory
+            item_type = "Armor" if item.tag in ["Hood", "Helmet"] else item.tag
+            subcategory = get_subcategory(item_type)
+
+            if subcategory is None:
+                logger.warning(f"Unknown item type: {item_type}. Skipping...")
+                continue
+
+            # Extract attributes and stats with the item_type's compiled plans
+            attr_plan, stats_plan = plans[item_type]
+            attributes = attr_plan.extract(item, data)
+            stats = stats_plan.extract(item, data)
+
+            # Assign Type for Armor items based on filters
+            if item_type == "Armor":
+                armor_type_id = armor_classifier.classify(attributes.get("Name", ""))
+                if armor_type_id is not None:
+                    attributes["Type"] = armor_type_id
+
+            # Use the centralized function to construct item_data
+            item_data = construct_item_data(item, attributes, stats, text_ui_mapping)
+            items.append((position, subcategory, item_data))
+
+    return items, armor_classifier.stats
+
+# (file_key, file_path, byte_range, first_position, encoding); a None range is the whole file
+ItemChunk = Tuple[str, Path, Optional[ByteRange], int, Optional[str]]
+
+def plan_item_chunks(item_paths: List[Tuple[str, Path]], workers: int) -> Tuple[List[ItemChunk], Dict[str, ET.ParseError]]:
+    """
+    Split the item files into chunks of consecutive items, so each byte of a file is parsed by one task.
+    Files get chunks in proportion to their size so one large table does not bound the stage.
+    Returns the tasks along with the files that failed to scan.
+    """
+    if workers <= 1:
+        return [(file_key, file_path, None, 0, None) for file_key, file_path in item_paths], {}
+
+    sizes = {file_key: os.path.getsize(file_path) for file_key, file_path in item_paths}
+    total_size = sum(sizes.values()) or 1
+    tasks: List[ItemChunk] = []
+    failed: Dict[str, ET.ParseError] = {}
+    for file_key, file_path in item_paths:
+        chunk_count = max(1, round(sizes[file_key] / total_size * workers * 2))
+        if chunk_count == 1:
+            tasks.append((file_key, file_path, None, 0, None))
+            continue
+        try:
+            groups, encoding = scan_item_ranges(file_path)
+        except ET.ParseError as e:
+            failed[file_key] = e
+            continue
+
+        chunk_size = -(-sum(len(group) for group in groups) // chunk_count)
+        position = 0
+        for group in groups:
+            # Chunks never span two <ItemClasses> elements, so each range wraps into a well-formed document
+            for first in range(0, len(group), chunk_size):
+                run = group[first:first + chunk_size]
+                tasks.append((file_key, file_path, (run[0][0], run[-1][1]), position, encoding))
+                position += len(run)
+    return tasks, failed
+
+def parse_item_files(
+    item_paths: List[Tuple[str, Path]],
+    data: dict,
+    text_ui_mapping: Dict[str, Dict[str, Optional[str]]],
+    workers: int = 1
+) -> Tuple[Dict[str, Optional[List[Tuple[str, dict]]]], ArmorTypeStats]:
+    """
+    Parse the given item files, in a process pool when `workers` > 1.
+    Returns (subcategory, item_data) lists per file_key in document order, or None for files that failed
+    to parse, along with the armor classification statistics of the files that parsed.
+    """
+    tasks, failed = plan_item_chunks(item_paths, workers)
+    chunks: Dict[str, List[Tuple[List[Tuple[int, str, dict]], ArmorTypeStats]]] = {file_key: [] for file_key, _ in item_paths}
+
+    if workers <= 1:
+        init_item_context(data, text_ui_mapping)
+        for file_key, file_path, byte_range, first_position, encoding in tasks:
+            try:
+                chunks[file_key].append(parse_item_chunk(file_path, byte_range, first_position, encoding))
+            except ET.ParseError as e:
+                failed[file_key] = e
+    else:
+        logger.info(f"Parsing {len(item_paths)} item files as {len(tasks)} chunks on {workers} workers...")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=process_pool_context(), initializer=init_item_context, initargs=(data, text_ui_mapping)
+        ) as executor:
+            futures = [
+                (file_key, executor.submit(parse_item_chunk, file_path, byte_range, first_position, encoding))
+                for file_key, file_path, byte_range, first_position, encoding in tasks
+            ]
+            for file_key, future in futures:
+                try:
+                    chunks[file_key].append(future.result())
+                except ET.ParseError as e:
+                    failed[file_key] = e
+
+    results: Dict[str, Optional[List[Tuple[str, dict]]]] = {}
+    armor_stats = ArmorTypeStats()
+    for file_key, file_path in item_paths:
+        if file_key in failed:
+            logger.warning(f"Failed to parse {file_key} ({os.path.relpath(file_path)}): {failed[file_key]}")
+            results[file_key] = None
+            continue
+        # Chunks are each sorted by position, so a k-way merge restores document order
+        item_chunks = [items for items, _ in chunks[file_key]]
+        results[file_key] = [(subcategory, item_data) for _, subcategory, item_data in heapq.merge(*item_chunks, key=lambda entry: entry[0])]
+        for _, chunk_stats in chunks[file_key]:
+            armor_stats.merge(chunk_stats)
+    return results, armor_stats
@@ -0,0 +1,318 @@
+"""Column-oriented, read-only view of a built data.json for tooling that queries items."""
+import os
+import sys
+import json
+import mmap
+import math
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from utils.logger import logger
+from constants.dir_constants import CACHE_DIR
+from services.helper import atomic_write
+
+# Bump when the cache layout changes
+STORE_FORMAT_VERSION = 2
+
+MISSING_INT = -2 ** 63  # int64 stat not set on an item; double stats use NaN
+_HEADER = struct.Struct('<Q')
+
+def _typecode(column) -> Optional[str]:
+    """'q' or 'd' for an array, or for a memoryview cast from the cache; None for a list column."""
+    if isinstance(column, list):
+        return None
+    return column.typecode if isinstance(column, array) else column.format
+
+def _column_type(values: List) -> Optional[str]:
+    """Typecode for a stat's values: 'q' when they are all int64, 'd' when some have fractions, None for anything else."""
+    present = [value for value in values if value is not None]
+    if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in present):
+        return None
+    if all(isinstance(value, int) for value in present):
+        return 'q' if all(MISSING_INT < value < 2 ** 63 for value in present) else None
+    return 'd'
+
+class ItemTable:
+    """
+    The items of one subcategory, as attribute columns and stat columns. Stats are typed `array` columns
+    (int64, or double when a stat has fractions), so a table holds a few flat buffers instead of one dict
+    per item; stats with other values, such as text, are kept as plain lists.
+    """
+
+    def __init__(
+        self,
+        length: int,
+        attributes: Dict[str, List],
+        missing: Dict[str, List[int]],
+        stats: Dict[str, Sequence]
+    ):
+        self.length = length
+        self.attributes = attributes  # Attribute -> value per row
+        self.missing = {name: set(rows) for name, rows in missing.items()}  # Attribute -> rows without it
+        self.stats = stats  # Stat -> array('q') or array('d'), a memoryview cast like one, or a list
+        self._sorted: Dict[str, Tuple[List, array]] = {}
+
+    @classmethod
+    def from_items(cls, items: List[dict]) -> "ItemTable":
+        attribute_names: Dict[str, None] = {}
+        stat_names: Dict[str, None] = {}
+        for item in items:
+            attribute_names.update(dict.fromkeys(key for key in item if key != "stats"))
+            stat_names.update(dict.fromkeys(item.get("stats", {})))
+
+        attributes = {name: [item.get(name) for item in items] for name in attribute_names}
+        missing = {
+            name: [row for row, item in enumerate(items) if name not in item] for name in attribute_names
+        }
+        stats: Dict[str, Sequence] = {}
+        for name in stat_names:
+            values = [item.get("stats", {}).get(name) for item in items]
+            typecode = _column_type(values)
+            if typecode == 'q':
+                stats[name] = array('q', (MISSING_INT if value is None else value for value in values))
+            elif typecode == 'd':
+                stats[name] = array('d', (math.nan if value is None else value for value in values))
+            else:
+                stats[name] = values  # Not a number, e.g. text; None where an item does not have it
+        return cls(len(items), attributes, {name: rows for name, rows in missing.items() if rows}, stats)
+
+    def stat(self, row: int, name: str):
+        """A stat of the item in `row`, or None when the item does not have it."""
+        column = self.stats[name]
+        value = column[row]
+        typecode = _typecode(column)
+        if typecode is None:
+            return value
+        if typecode == 'q':
+            return None if value == MISSING_INT else value
+        return None if math.isnan(value) else value
+
+    def item(self, row: int) -> dict:
+        """Rebuild the data.json form of the item in `row`."""
+        item = {
+            name: values[row] for name, values in self.attributes.items()
+            if row not in self.missing.get(name, ())
+        }
+        stats = {}
+        for name in self.stats:
+            value = self.stat(row, name)
+            if value is not None:
+                stats[name] = value
+        item["stats"] = stats
+        return item
+
+    def sorted_index(self, name: str) -> Tuple[List, array]:
+        """(sorted values, rows in that order) for a stat, without the items missing it; built on first use."""
+        if name not in self._sorted:
+            rows = [row for row in range(self.length) if self.stat(row, name) is not None]
+            column = self.stats[name]
+            rows.sort(key=column.__getitem__)
+            self._sorted[name] = ([column[row] for row in rows], array('l', rows))
+        return self._sorted[name]
+
+def _mapped_tables(header_tables: dict, mapped: mmap.mmap, data_start: int) -> Dict[str, ItemTable]:
+    """Tables whose typed stat columns are views into the mapped cache file, so they are paged in only when read."""
+    view = memoryview(mapped)
+    tables = {}
+    for name, table in header_tables.items():
+        stats: Dict[str, Sequence] = {}
+        for stat, column in table["stats"].items():
+            if "values" in column:
+                stats[stat] = column["values"]
+                continue
+            start = data_start + column["offset"]
+            if start + column["length"] * 8 > len(mapped):
+                raise ValueError(f"column {name}.{stat} runs past the end of the file")
+            stats[stat] = view[start:start + column["length"] * 8].cast(column["type"])
+        tables[name] = ItemTable(table["length"], table["attributes"], table["missing"], stats)
+    return tables
+
+class ItemStore:
+    """
+    Items of a built data.json by subcategory, with hash indexes on Id, IconId and Name.
+
+        store = ItemStore.open(Path("src/data/1.2/data.json"))
+        store.get("0027df44-5f9c-4c92-9f81-a83ca124c4a8")         # O(1) by Id
+        store.by_icon("Hood07_m04_C"), store.by_name("Hood07_m04_C")
+        store.range("armors", "DefenseSlash", low=20)             # O(log n), sorted by DefenseSlash
+
+    data.json is only read on first use; the columns are then cached in a binary file that later loads memory-map.
+    """
+
+    def __init__(self, data_json_path: Path, cache_dir: Optional[Path] = CACHE_DIR):
+        self.data_json_path = Path(data_json_path)
+        self.cache_dir = cache_dir
+        self._tables: Optional[Dict[str, ItemTable]] = None
+        self._other: dict = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._index: Dict[str, Dict] = {}
+
+    @classmethod
+    def open(cls, data_json_path: Path, cache_dir: Optional[Path] = CACHE_DIR) -> "ItemStore":
+        """Open a store; nothing is read until the first query. `cache_dir=None` disables the column cache."""
+        return cls(data_json_path, cache_dir)
+
+    # Loading
+
+    def _cache_file(self, cache_dir: Path) -> Path:
+        path_hash = hashlib.sha1(str(self.data_json_path.resolve()).encode('utf-8')).hexdigest()[:12]
+        return cache_dir / "item_store" / f"{self.data_json_path.parent.name}.{path_hash}.columns"
+
+    def _source(self) -> dict:
+        stat = self.data_json_path.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "byteorder": sys.byteorder}
+
+    def _ensure_loaded(self) -> Dict[str, ItemTable]:
+        if self._tables is None:
+            tables = self._load_cache(self.cache_dir) if self.cache_dir is not None else None
+            self._tables = tables if tables is not None else self._load_json()
+        return self._tables
+
+    @property
+    def tables(self) -> Dict[str, ItemTable]:
+        """Subcategory -> ItemTable, loaded from the cache or data.json on first use."""
+        return self._ensure_loaded()
+
+    @property
+    def other(self) -> dict:
+        """The top-level data.json keys other than items, such as version and weapon_types."""
+        self._ensure_loaded()
+        return self._other
+
+    def _load_json(self) -> Dict[str, ItemTable]:
+        with open(self.data_json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        tables = {name: ItemTable.from_items(items) for name, items in data.get("items", {}).items()}
+        self._other = {key: value for key, value in data.items() if key != "items"}
+        if self.cache_dir is not None:
+            self._save_cache(tables, self.cache_dir)
+        return tables
+
+    def _save_cache(self, item_tables: Dict[str, ItemTable], cache_dir: Path) -> None:
+        """Write the columns as one file: a JSON header, then every typed stat column 8-byte aligned."""
+        tables = {}
+        blobs = []
+        offset = 0
+        for name, table in item_tables.items():
+            columns: Dict[str, dict] = {}
+            for stat, column in table.stats.items():
+                if not isinstance(column, array):
+                    columns[stat] = {"values": column}  # A list column goes in the header
+                    continue
+                raw = column.tobytes()
+                columns[stat] = {"type": column.typecode, "offset": offset, "length": len(column)}
+                blobs.append(raw)
+                offset += len(raw)  # Item sizes are 8 bytes, so every column stays aligned
+            tables[name] = {
+                "length": table.length,
+                "attributes": table.attributes,
+                "missing": {attr: sorted(rows) for attr, rows in table.missing.items()},
+                "stats": columns
+            }
+        header = json.dumps({
+            "format": STORE_FORMAT_VERSION, "source": self._source(), "other": self._other, "tables": tables
+        }, separators=(',', ':')).encode('utf-8')
+        header += b' ' * (-len(header) % 8)
+
+        cache_file = self._cache_file(cache_dir)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(cache_file, 'wb') as f:
+            f.write(_HEADER.pack(len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+
+    def _load_cache(self, cache_dir: Path) -> Optional[Dict[str, ItemTable]]:
+        """The tables from the column cache, or None when it is missing, unreadable or out of date."""
+        cache_file = self._cache_file(cache_dir)
+        if not cache_file.exists():
+            return None
+        mapped: Optional[mmap.mmap] = None
+        try:
+            with open(cache_file, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            (header_size,) = _HEADER.unpack_from(mapped, 0)
+            header = json.loads(mapped[_HEADER.size:_HEADER.size + header_size])
+            if header.get("format") == STORE_FORMAT_VERSION and header.get("source") == self._source():
+                tables = _mapped_tables(header["tables"], mapped, _HEADER.size + header_size)
+                self._other = header["other"]
+                self._mmap = mapped
+                logger.debug(f"Loaded item store columns for {self.data_json_path} from {os.path.relpath(cache_file)}")
+                return tables
+        except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable item store cache {os.path.relpath(cache_file)}: {e}")
+        # Out of date or unreadable; the views a failed load made were released along with its exception
+        if mapped is not None:
+            mapped.close()
+        return None
+
+    # Queries
+
+    @property
+    def subcategories(self) -> List[str]:
+        return list(self.tables)
+
+    @property
+    def version(self) -> Optional[dict]:
+        return self.other.get("version")
+
+    def items(self, subcategory: str) -> Iterator[dict]:
+        table = self.tables[subcategory]
+        return (table.item(row) for row in range(table.length))
+
+    def column(self, subcategory: str, stat: str) -> Sequence:
+        """The typed column of a stat, MISSING_INT or NaN where an item does not have it; a list (None) for non-numeric stats."""
+        return self.tables[subcategory].stats[stat]
+
+    def _attribute_index(self, attribute: str) -> Dict:
+        """Attribute value -> [(subcategory, row)...] over every subcategory; built on first use."""
+        if attribute not in self._index:
+            index: Dict = {}
+            for name, table in self.tables.items():
+                values = table.attributes.get(attribute)
+                if values is None:
+                    continue
+                missing = table.missing.get(attribute, ())
+                for row, value in enumerate(values):
+                    if row not in missing:
+                        index.setdefault(value, []).append((name, row))
+            self._index[attribute] = index
+        return self._index[attribute]
+
+    def _lookup(self, attribute: str, value) -> List[dict]:
+        return [self.tables[name].item(row) for name, row in self._attribute_index(attribute).get(value, [])]
+
+    def get(self, item_id: str) -> Optional[dict]:
+        """The item with this Id, or None."""
+        found = self._lookup("Id", item_id)
+        return found[0] if found else None
+
+    def by_icon(self, icon_id: str) -> List[dict]:
+        return self._lookup("IconId", icon_id)
+
+    def by_name(self, name: str) -> List[dict]:
+        return self._lookup("Name", name)
+
+    def range(self, subcategory: str, stat: str, low=None, high=None) -> List[dict]:
+        """Items whose `stat` lies in [low, high] (either bound optional), in ascending order of the stat."""
+        table = self.tables[subcategory]
+        if stat not in table.stats:
+            return []
+        values, rows = table.sorted_index(stat)
+        start = 0 if low is None else bisect_left(values, low)
+        stop = len(values) if high is None else bisect_right(values, high)
+        return [table.item(row) for row in rows[start:stop]]
+
+    def close(self) -> None:
+        """Release the memory-mapped cache; the store reloads on the next query."""
+        self._tables = None
+        self._index = {}
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Columns handed out are still in use; the mapping closes when they are released
+            self._mmap = None
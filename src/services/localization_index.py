@@ -0,0 +1,104 @@
+import os
+import json
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from utils.logger import logger
+from constants.dir_constants import CACHE_DIR
+from services.helper import atomic_write, iter_streamed_elements
+
+# Bump when the index layout changes so stale caches are rebuilt
+INDEX_FORMAT_VERSION = 1
+
+@dataclass
+class LocalizationIndex:
+    """UIName -> ItemName/AltName lookup built from text_ui_items.xml."""
+    mapping: Dict[str, Dict[str, Optional[str]]] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)  # UINames with a missing or empty ItemName or AltName
+
+def file_fingerprint(file_path: Path, with_hash: bool = True) -> dict:
+    """Size, mtime and (optionally) SHA-256 of a file, used to tell whether a cache is still valid."""
+    stat = file_path.stat()
+    fingerprint: Dict[str, Union[int, str]] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+def parse_text_ui_items(file_path: Path) -> LocalizationIndex:
+    """Build the localization index from text_ui_items.xml in a single streaming pass."""
+    index = LocalizationIndex()
+    for row in iter_streamed_elements(file_path, lambda elem, ancestors: elem.tag == "Row" and len(ancestors) > 0):
+        # Cell[1] is the UIName, Cell[2] the AltName and Cell[3] the ItemName
+        cells = row.findall("Cell")
+        if len(cells) < 3:
+            continue
+        ui_name, alt_name, item_name = cells[0].text, cells[1].text, cells[2].text
+        if ui_name is None:
+            continue  # Nothing can look the row up
+        if not item_name or not alt_name:
+            index.missing.append(ui_name)
+        index.mapping[ui_name] = {
+            "ItemName": item_name,
+            "AltName": alt_name
+        }
+    return index
+
+def _write_index(index: LocalizationIndex, fingerprint: dict, index_file: Path) -> None:
+    """Atomically write the compact on-disk index."""
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "format": INDEX_FORMAT_VERSION,
+        "source": fingerprint,
+        "rows": [[ui_name, names["ItemName"], names["AltName"]] for ui_name, names in index.mapping.items()],
+        "missing": index.missing
+    }
+    with atomic_write(index_file, encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+
+def _read_index(payload: dict) -> LocalizationIndex:
+    return LocalizationIndex(
+        mapping={ui_name: {"ItemName": item_name, "AltName": alt_name} for ui_name, item_name, alt_name in payload["rows"]},
+        missing=payload["missing"]
+    )
+
+def load_localization_index(text_ui_items_path: Path, cache_dir: Path = CACHE_DIR) -> LocalizationIndex:
+    """
+    Load the localization index for text_ui_items.xml, reusing the cached index while the file is unchanged.
+    A size/mtime match is trusted as is; otherwise the content hash decides whether to reparse.
+    """
+    index_file = cache_dir / "text_ui_items.index.json"
+    payload = None
+    if index_file.exists():
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get("format") != INDEX_FORMAT_VERSION:
+                payload = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable localization index {os.path.relpath(index_file)}: {e}")
+            payload = None
+
+    if payload is not None:
+        cached = payload["source"]
+        current = file_fingerprint(text_ui_items_path, with_hash=False)
+        if current["size"] == cached["size"] and current["mtime_ns"] == cached["mtime_ns"]:
+            logger.info(f"Loaded localization index from {os.path.relpath(index_file)}")
+            return _read_index(payload)
+
+        current = file_fingerprint(text_ui_items_path)
+        if current["sha256"] == cached["sha256"]:
+            # Touched but unchanged; refresh the fingerprint so the next run takes the fast path
+            index = _read_index(payload)
+            _write_index(index, current, index_file)
+            logger.info(f"Loaded localization index from {os.path.relpath(index_file)} (content unchanged)")
+            return index
+
+    logger.info(f"Building localization index from {os.path.relpath(text_ui_items_path)}...")
+    index = parse_text_ui_items(text_ui_items_path)
+    _write_index(index, file_fingerprint(text_ui_items_path), index_file)
+    return index
@@ -0,0 +1,241 @@
+"""Per-stage metrics for the build: wall and CPU time, items and bytes processed, and peak RSS."""
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from utils.logger import logger
+from services.helper import atomic_write
+
+try:
+    import resource
+except ImportError:  # Unix only; peak RSS and worker process CPU time are not reported without it
+    resource = None  # type: ignore[assignment]
+
+PROFILERS = ["cprofile", "sample"]
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples of the sampling profiler
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS of this process (Linux only); False when it cannot be reset."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak RSS of this process since the last reset (or since it started when resetting is not supported); None when unknown."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return max_rss_mb()
+
+def max_rss_mb() -> Optional[float]:
+    """Peak RSS of this process since it started, or None without the resource module."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def children_cpu_seconds() -> float:
+    """CPU time of the worker processes that have exited so far; 0 without the resource module."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval and writes collapsed stacks, as flame graph tools read them."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, file_path: Path) -> None:
+        with atomic_write(file_path, encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class Metrics:
+    """
+    Records one entry per tracked stage run, in start order. With `profile_stage`, every run of
+    that stage is also profiled and the profile saved under `profile_dir`; only one run is profiled
+    at a time, so a run that starts while another is being profiled (e.g. pak_scan under
+    --concurrent-extract) is skipped. Profiles only cover the thread that enters the stage, not the pool
+    workers of stages such as pak_extract, dds_convert or build:items; profile those with one worker.
+    CPU time is that of the whole process, every thread included, plus worker processes that exit
+    while the stage runs, so stages running side by side count each other's CPU time. The peak RSS
+    is reset when a stage starts while no other stage runs, so nested and concurrent stages report
+    the peak since the outermost one started.
+    """
+
+    def __init__(self, profile_stage: Optional[str] = None, profiler: str = "cprofile", profile_dir: Optional[Path] = None):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profiler} (choose from {', '.join(PROFILERS)})")
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.records: List[dict] = []
+        self.profiles: List[str] = []
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._profiling = False
+
+    @contextmanager
+    def track(self, name: str, **counts) -> Iterator[dict]:
+        """Measure the block as stage `name`; counts such as items and bytes can be passed or set on the yielded record."""
+        record = {"name": name, **counts}
+        with self._lock:
+            if self._active == 0:
+                reset_peak_rss()
+            self._active += 1
+            self.records.append(record)
+        wall, cpu, children_cpu = time.perf_counter(), time.process_time(), children_cpu_seconds()
+        profiler = self._start_profiler(name) if name == self.profile_stage else None
+        try:
+            yield record
+        except BaseException:
+            record["failed"] = True
+            raise
+        finally:
+            if profiler is not None:
+                self._save_profile(name, profiler)
+            record["seconds"] = round(time.perf_counter() - wall, 4)
+            record["cpu_seconds"] = round(time.process_time() - cpu + children_cpu_seconds() - children_cpu, 4)
+            peak = peak_rss_mb()
+            record["peak_rss_mb"] = None if peak is None else round(peak, 1)
+            with self._lock:
+                self._active -= 1
+
+    def _start_profiler(self, name: str):
+        """Start profiling the calling thread, or return None when another run is already being profiled."""
+        with self._lock:
+            if self._profiling:
+                logger.info(f"Not profiling an overlapping run of {name}; another one is being profiled")
+                return None
+            self._profiling = True
+        if self.profiler == "sample":
+            sampler = SamplingProfiler(threading.get_ident())
+            sampler.start()
+            return sampler
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _save_profile(self, name: str, profiler) -> None:
+        profile_dir = self.profile_dir or Path.cwd()
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        suffix = ".folded" if self.profiler == "sample" else ".prof"
+        stem = name.replace(':', '_').replace('/', '_')
+        runs = sum(1 for profile in self.profiles if Path(profile).stem.split('.')[0] == stem)
+        profile_file = profile_dir / f"{stem}{f'.{runs + 1}' if runs else ''}{suffix}"
+        try:
+            if self.profiler == "sample":
+                profiler.stop()
+                profiler.save(profile_file)
+            else:
+                profiler.disable()
+                profiler.dump_stats(profile_file)
+        finally:
+            with self._lock:
+                self._profiling = False
+        self.profiles.append(str(profile_file))
+        logger.info(f"Saved the {self.profiler} profile of {name} at {os.path.relpath(profile_file)}")
+
+    def summary(self) -> Dict[str, dict]:
+        """Totals per stage name: runs, wall and CPU time, items and bytes, the highest peak RSS, and rates."""
+        totals: Dict[str, dict] = {}
+        for record in self.records:
+            if "seconds" not in record:
+                continue  # Still running
+            total = totals.setdefault(record["name"], {"runs": 0, "seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_mb": None})
+            total["runs"] += 1
+            total["seconds"] = round(total["seconds"] + record["seconds"], 4)
+            total["cpu_seconds"] = round(total["cpu_seconds"] + record["cpu_seconds"], 4)
+            if record["peak_rss_mb"] is not None:
+                total["peak_rss_mb"] = max(total["peak_rss_mb"] or 0.0, record["peak_rss_mb"])
+            for key in ("items", "bytes"):
+                if isinstance(record.get(key), int):
+                    total[key] = total.get(key, 0) + record[key]
+        for total in totals.values():
+            seconds = max(total["seconds"], 1e-9)
+            if "items" in total:
+                total["items_per_s"] = round(total["items"] / seconds, 1)
+            if "bytes" in total:
+                total["mb_per_s"] = round(total["bytes"] / (1024 * 1024) / seconds, 2)
+        return totals
+
+    def to_dict(self, **fields) -> dict:
+        max_rss = max_rss_mb()
+        return {
+            **fields,
+            "started": self.started,
+            "total_seconds": round(time.perf_counter() - self._start, 4),
+            "peak_rss_mb": None if max_rss is None else round(max_rss, 1),
+            "summary": self.summary(),
+            "stages": [record for record in self.records if "seconds" in record],
+            "profiles": self.profiles,
+        }
+
+    def save(self, file_path: Path, **fields) -> Path:
+        """Write the metrics as JSON; extra `fields` (e.g. the version) go at the top."""
+        with atomic_write(file_path, encoding='utf-8') as f:
+            json.dump(self.to_dict(**fields), f, indent=4)
+        logger.info(f"Saved build metrics at {os.path.relpath(file_path)}")
+        return file_path
+
+# The recorder stages report to; main replaces it with one set up from the command line
+# and writes it to metrics.json next to the versioned output
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+def set_metrics(metrics: Metrics) -> Metrics:
+    """Make `metrics` the active recorder and return it."""
+    global _metrics
+    _metrics = metrics
+    return metrics
+
+def track(name: str, **counts):
+    """
+    Track a stage on the active recorder; see Metrics.track.
+
+        with track("pak_scan", bytes=pak_size) as record:
+            ...
+            record["items"] = len(entries)
+    """
+    return _metrics.track(name, **counts)
@@ -0,0 +1,187 @@
+import os
+import gzip
+import json
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+from utils.logger import logger
+from services.helper import atomic_write
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # Optional; the .br output is skipped without it
+    brotli = None
+
+DEFAULT_OUTPUT_FORMATS = ("json",)
+
+def pack(obj) -> bytes:
+    """Encode a JSON-like document as MessagePack."""
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+def _pack(obj, out: bytearray) -> None:
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True or obj is False:
+        out.append(0xc3 if obj else 0xc2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -0x20 <= obj < 0:
+            out.append(obj & 0xff)
+        elif obj >= 0:
+            for limit, code, fmt in ((0xff, 0xcc, '>B'), (0xffff, 0xcd, '>H'), (0xffffffff, 0xce, '>I'), (0xffffffffffffffff, 0xcf, '>Q')):
+                if obj <= limit:
+                    out.append(code)
+                    out += struct.pack(fmt, obj)
+                    return
+            raise OverflowError(f"Integer too large for MessagePack: {obj}")
+        else:
+            for limit, code, fmt in ((-0x80, 0xd0, '>b'), (-0x8000, 0xd1, '>h'), (-0x80000000, 0xd2, '>i'), (-0x8000000000000000, 0xd3, '>q')):
+                if obj >= limit:
+                    out.append(code)
+                    out += struct.pack(fmt, obj)
+                    return
+            raise OverflowError(f"Integer too small for MessagePack: {obj}")
+    elif isinstance(obj, float):
+        out.append(0xcb)
+        out += struct.pack('>d', obj)
+    elif isinstance(obj, str):
+        encoded = obj.encode('utf-8')
+        _pack_length(len(encoded), out, 0xa0, 32, (0xd9, '>B'), (0xda, '>H'), (0xdb, '>I'))
+        out += encoded
+    elif isinstance(obj, (list, tuple)):
+        _pack_length(len(obj), out, 0x90, 16, None, (0xdc, '>H'), (0xdd, '>I'))
+        for value in obj:
+            _pack(value, out)
+    elif isinstance(obj, dict):
+        _pack_length(len(obj), out, 0x80, 16, None, (0xde, '>H'), (0xdf, '>I'))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Cannot encode {type(obj).__name__} as MessagePack")
+
+def _pack_length(length: int, out: bytearray, fix_code: int, fix_limit: int, *sized) -> None:
+    if length < fix_limit:
+        out.append(fix_code | length)
+        return
+    for size, limit in zip(sized, (0xff, 0xffff, 0xffffffff)):
+        if size is not None and length <= limit:
+            out.append(size[0])
+            out += struct.pack(size[1], length)
+            return
+    raise OverflowError(f"Too long for MessagePack: {length}")
+
+def unpack(data: bytes):
+    """Decode a MessagePack document written by `pack`."""
+    obj, offset = _unpack(data, 0)
+    if offset != len(data):
+        raise ValueError(f"Trailing data after MessagePack document at byte {offset}")
+    return obj
+
+_FIXED = {
+    0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+    0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q',
+    0xca: '>f', 0xcb: '>d'
+}
+_LENGTHS = {
+    0xd9: ('str', '>B'), 0xda: ('str', '>H'), 0xdb: ('str', '>I'),
+    0xc4: ('bin', '>B'), 0xc5: ('bin', '>H'), 0xc6: ('bin', '>I'),
+    0xdc: ('array', '>H'), 0xdd: ('array', '>I'),
+    0xde: ('map', '>H'), 0xdf: ('map', '>I')
+}
+
+def _unpack(data: bytes, offset: int):
+    code = data[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if code in (0xc0, 0xc2, 0xc3):
+        return (None, False, True)[(0xc0, 0xc2, 0xc3).index(code)], offset
+    if code in _FIXED:
+        fmt = _FIXED[code]
+        return struct.unpack_from(fmt, data, offset)[0], offset + struct.calcsize(fmt)
+
+    if 0xa0 <= code <= 0xbf:
+        kind, length = 'str', code & 0x1f
+    elif 0x90 <= code <= 0x9f:
+        kind, length = 'array', code & 0x0f
+    elif 0x80 <= code <= 0x8f:
+        kind, length = 'map', code & 0x0f
+    elif code in _LENGTHS:
+        kind, fmt = _LENGTHS[code]
+        length = struct.unpack_from(fmt, data, offset)[0]
+        offset += struct.calcsize(fmt)
+    else:
+        raise ValueError(f"Unsupported MessagePack type 0x{code:02x} at byte {offset - 1}")
+
+    if kind in ('str', 'bin'):
+        raw = data[offset:offset + length]
+        return (raw.decode('utf-8') if kind == 'str' else bytes(raw)), offset + length
+    if kind == 'array':
+        items = []
+        for _ in range(length):
+            value, offset = _unpack(data, offset)
+            items.append(value)
+        return items, offset
+    result = {}
+    for _ in range(length):
+        key, offset = _unpack(data, offset)
+        result[key], offset = _unpack(data, offset)
+    return result, offset
+
+def _minified(data) -> bytes:
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+# Format name -> (file suffix after the stem, encoder, decoder)
+OUTPUT_FORMATS: Dict[str, Tuple[str, Callable, Callable]] = {
+    "json": (".json", lambda data: json.dumps(data, indent=4).encode('utf-8'), json.loads),
+    "min": (".min.json", _minified, json.loads),
+    # mtime=0 keeps the archive byte-identical when the document is
+    "gz": (".min.json.gz", lambda data: gzip.compress(_minified(data), 9, mtime=0), lambda raw: json.loads(gzip.decompress(raw))),
+    "br": (".min.json.br", lambda data: brotli.compress(_minified(data)), lambda raw: json.loads(brotli.decompress(raw))),
+    "msgpack": (".msgpack", pack, unpack),
+}
+# Formats whose encoder does not go through JSON, so the document is normalized for them first
+NORMALIZED_FORMATS = {"msgpack"}
+
+def parse_output_formats(value: str) -> List[str]:
+    """Parse a comma separated list of output formats."""
+    formats = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in formats if name not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output formats: {', '.join(unknown)} (choose from {', '.join(OUTPUT_FORMATS)})")
+    return formats
+
+def write_outputs(data, json_file: Path, formats: Sequence[str] = DEFAULT_OUTPUT_FORMATS) -> List[Path]:
+    """
+    Write `data` next to `json_file` in every requested format, e.g. data.json, data.min.json.gz, data.msgpack.
+    Formats that are not JSON get the document normalized to what JSON can represent (e.g. int dict keys
+    become strings), so every format carries the same document. Files are written as bytes, so data.json
+    has LF line endings everywhere.
+    """
+    json_file = Path(json_file)
+    normalized = None
+    stem = json_file.name[:-len(".json")] if json_file.name.endswith(".json") else json_file.name
+    written = []
+    for name in formats:
+        if name == "br" and brotli is None:
+            logger.warning(f"Skipping {stem}{OUTPUT_FORMATS[name][0]}: the brotli package is not installed")
+            continue
+        suffix, encode, _ = OUTPUT_FORMATS[name]
+        file_path = json_file.with_name(stem + suffix)
+        if name in NORMALIZED_FORMATS:
+            if normalized is None:
+                normalized = json.loads(_minified(data))
+            raw = encode(normalized)
+        else:
+            raw = encode(data)
+        with atomic_write(file_path, 'wb') as f:
+            f.write(raw)
+        logger.debug(f"Wrote {os.path.relpath(file_path)} ({len(raw)} bytes)")
+        written.append(file_path)
+    return written
@@ -0,0 +1,101 @@
+import os
+import zlib
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple, Union
+from services.pak_index import PakEntry, PakIndex
+from services.helper import atomic_write
+from services.metrics import track
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+DEFAULT_MEMORY_CAP = 64 * 1024 * 1024  # Bytes buffered across all workers
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+
+class PakExtractor:
+    """
+    Copies pak members to disk in bounded chunks on a thread pool.
+    Each worker thread reads through its own file handle (or its own ZipFile for members
+    zipfile has to decode), and zlib releases the GIL while inflating, so copies run in parallel.
+    """
+
+    def __init__(self, pak_index: PakIndex, workers: int = DEFAULT_WORKERS, memory_cap: int = DEFAULT_MEMORY_CAP):
+        self.pak_index = pak_index
+        self.workers = max(1, workers)
+        # A worker holds at most one compressed and one decompressed chunk at a time
+        self.chunk_size = min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, memory_cap // (2 * self.workers)))
+        self._local = threading.local()
+        self._handles: List[Union[BinaryIO, zipfile.ZipFile]] = []
+        self._handles_lock = threading.Lock()
+
+    def _handle(self, kind: str):
+        """Return this thread's open pak file or ZipFile."""
+        handle = getattr(self._local, kind, None)
+        if handle is None:
+            handle = open(self.pak_index.pak_path, 'rb') if kind == "file" else zipfile.ZipFile(self.pak_index.pak_path, 'r')
+            setattr(self._local, kind, handle)
+            with self._handles_lock:
+                self._handles.append(handle)
+        return handle
+
+    def _copy(self, entry: PakEntry, destination: Path) -> None:
+        """Stream one member to `destination`, verifying its CRC. On failure any previous file is left as it was."""
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with atomic_write(destination, 'wb') as target:
+            if entry.flag_bits & 0x1 or entry.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                # zipfile checks the CRC itself
+                with self._handle("zip").open(entry.name) as source:
+                    for chunk in iter(lambda: source.read(self.chunk_size), b""):
+                        target.write(chunk)
+                return
+
+            pak = self._handle("file")
+            pak.seek(self.pak_index.data_offset(pak, entry))
+            remaining = entry.compress_size
+            crc = 0
+            inflater = zlib.decompressobj(-15) if entry.compress_type == zipfile.ZIP_DEFLATED else None
+            while remaining:
+                chunk = pak.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    raise zipfile.BadZipFile(f"Truncated member {entry.name} in {self.pak_index.pak_path.name}")
+                remaining -= len(chunk)
+                if inflater is None:
+                    crc = zlib.crc32(chunk, crc)
+                    target.write(chunk)
+                    continue
+                # Bound the inflated output per call so highly compressed chunks stay within the cap
+                while chunk:
+                    data = inflater.decompress(chunk, self.chunk_size)
+                    crc = zlib.crc32(data, crc)
+                    target.write(data)
+                    chunk = inflater.unconsumed_tail
+            if inflater is not None:
+                data = inflater.flush()
+                crc = zlib.crc32(data, crc)
+                target.write(data)
+            if crc != entry.crc:
+                raise zipfile.BadZipFile(f"CRC mismatch for {entry.name} in {self.pak_index.pak_path.name}")
+
+    def _run(self, job: Tuple[PakEntry, Path]) -> Optional[Exception]:
+        try:
+            self._copy(*job)
+        except Exception as e:
+            return e
+        return None
+
+    def extract(self, jobs: List[Tuple[PakEntry, Path]]) -> List[Optional[Exception]]:
+        """Extract (entry, destination) jobs; returns the error of each job (None on success) in job order."""
+        try:
+            with track("pak_extract", items=len(jobs), bytes=sum(entry.file_size for entry, _ in jobs)):
+                if self.workers == 1 or len(jobs) <= 1:
+                    return [self._run(job) for job in jobs]
+                with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pak-extract") as executor:
+                    return list(executor.map(self._run, jobs))
+        finally:
+            with self._handles_lock:
+                for handle in self._handles:
+                    handle.close()
+                self._handles.clear()
+            self._local = threading.local()
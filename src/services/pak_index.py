@@ -0,0 +1,143 @@
+import os
+import json
+import zlib
+import struct
+import hashlib
+import zipfile
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+from utils.logger import logger
+from constants.dir_constants import CACHE_DIR
+from services.helper import atomic_write
+from services.metrics import track
+
+# Bump when the index layout changes so stale caches are rebuilt
+INDEX_FORMAT_VERSION = 1
+
+# Local file header: signature, versions, flags, method, time, date, crc, sizes, name and extra lengths
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+class PakEntry(NamedTuple):
+    """A member of a .pak archive, as recorded in its central directory."""
+    name: str
+    crc: int
+    compress_size: int
+    file_size: int
+    header_offset: int
+    compress_type: int
+    flag_bits: int
+    order: int  # Position in the central directory, so archive order can be restored
+
+class PakIndex:
+    """
+    Central-directory index of a .pak (zip) archive, sorted by member name.
+    Prefix queries are answered with a binary search over the sorted names.
+    """
+
+    def __init__(self, pak_path: Path, entries: List[PakEntry]):
+        self.pak_path = pak_path
+        self.entries = sorted(entries, key=lambda entry: entry.name)
+        self._names = [entry.name for entry in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, name: str) -> Optional[PakEntry]:
+        """Return the entry for an exact member name, or None."""
+        position = bisect_left(self._names, name)
+        if position < len(self._names) and self._names[position] == name:
+            return self.entries[position]
+        return None
+
+    def prefix(self, prefix: str) -> List[PakEntry]:
+        """Return the file members whose name starts with `prefix`, in archive order."""
+        start = bisect_left(self._names, prefix)
+        end = start
+        while end < len(self._names) and self._names[end].startswith(prefix):
+            end += 1
+        return sorted((entry for entry in self.entries[start:end] if not entry.name.endswith('/')), key=lambda entry: entry.order)
+
+    def data_offset(self, pak_file, entry: PakEntry) -> int:
+        """Return the offset of an entry's data in an open pak file, after its local header."""
+        return member_data_offset(self.pak_path, pak_file, entry)
+
+    def read(self, entry: PakEntry, pak_file=None) -> bytes:
+        """Read and decompress a member without reopening the archive's central directory."""
+        return read_member(self.pak_path, entry, pak_file)
+
+def member_data_offset(pak_path: Path, pak_file, entry: PakEntry) -> int:
+    """Return the offset of an entry's data in an open pak file, after its local header."""
+    pak_file.seek(entry.header_offset)
+    header = pak_file.read(_LOCAL_HEADER.size)
+    fields = _LOCAL_HEADER.unpack(header)
+    if fields[0] != _LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local header for {entry.name} in {Path(pak_path).name}")
+    return entry.header_offset + _LOCAL_HEADER.size + fields[9] + fields[10]
+
+def read_member(pak_path: Path, entry: PakEntry, pak_file=None) -> bytes:
+    """
+    Read and decompress a pak member from its index entry, through `pak_file` when given.
+    Compression methods other than stored/deflate fall back to zipfile.
+    """
+    if entry.flag_bits & 0x1 or entry.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        with zipfile.ZipFile(pak_path, 'r') as pak:
+            return pak.read(entry.name)
+
+    if pak_file is None:
+        with open(pak_path, 'rb') as f:
+            return read_member(pak_path, entry, f)
+
+    pak_file.seek(member_data_offset(pak_path, pak_file, entry))
+    data = pak_file.read(entry.compress_size)
+    if entry.compress_type == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(data, -15)
+    if zlib.crc32(data) != entry.crc:
+        raise zipfile.BadZipFile(f"CRC mismatch for {entry.name} in {Path(pak_path).name}")
+    return data
+
+def scan_pak(pak_path: Path) -> PakIndex:
+    """Build an index by reading the archive's central directory."""
+    with zipfile.ZipFile(pak_path, 'r') as pak:
+        entries = [
+            PakEntry(info.filename, info.CRC, info.compress_size, info.file_size,
+                     info.header_offset, info.compress_type, info.flag_bits, order)
+            for order, info in enumerate(pak.infolist())
+        ]
+    return PakIndex(pak_path, entries)
+
+def _index_file(pak_path: Path, cache_dir: Path) -> Path:
+    """Cache file for a pak, unique per absolute path so same-named paks do not collide."""
+    path_hash = hashlib.sha1(str(Path(pak_path).resolve()).encode('utf-8')).hexdigest()[:12]
+    return cache_dir / "paks" / f"{Path(pak_path).name}.{path_hash}.index.json"
+
+def load_pak_index(pak_path: Path, cache_dir: Path = CACHE_DIR) -> PakIndex:
+    """Load the index of a pak, rescanning its central directory only when its size or mtime changed."""
+    pak_path = Path(pak_path)
+    stat = pak_path.stat()
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    index_file = _index_file(pak_path, cache_dir)
+
+    if index_file.exists():
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get("format") == INDEX_FORMAT_VERSION and payload.get("source") == source:
+                logger.debug(f"Loaded pak index for {pak_path.name} from {os.path.relpath(index_file)}")
+                return PakIndex(pak_path, [PakEntry(*entry) for entry in payload["entries"]])
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable pak index {os.path.relpath(index_file)}: {e}")
+
+    logger.info(f"Scanning {pak_path.name} central directory...")
+    with track("pak_scan", bytes=stat.st_size) as record:
+        index = scan_pak(pak_path)
+        record["items"] = len(index.entries)
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(index_file, encoding='utf-8') as f:
+        json.dump({
+            "format": INDEX_FORMAT_VERSION,
+            "source": source,
+            "entries": [list(entry) for entry in index.entries]
+        }, f, ensure_ascii=False, separators=(',', ':'))
+    return index
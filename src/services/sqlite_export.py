@@ -0,0 +1,105 @@
+import os
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+from utils.logger import logger
+from services.helper import NEW_FILE_MODE
+from templates.data_json_mappings import priority_stats
+
+REFERENCE_TABLES = ["weapon_types", "armor_types", "dice_badges"]
+# Indexed in every table that has them, besides the priority stats
+INDEXED_COLUMNS = ["Id", "Name", "Type", "EquipSlot"]
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _sql_type(values) -> str:
+    types = {type(value) for value in values if value is not None}
+    if types and types <= {int, bool}:
+        return "INTEGER"
+    if types and types <= {int, float, bool}:
+        return "REAL"
+    return "TEXT"
+
+def _sql_value(value):
+    # Lists and objects (e.g. armor type filters) are stored as JSON text
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+
+def flatten_item(item: dict) -> Dict[str, object]:
+    """Flatten an item's stats into its attributes; a stat named like an attribute gets a stat_ prefix."""
+    row = {key: value for key, value in item.items() if key != "stats"}
+    # SQLite column names are case-insensitive
+    attributes = {key.lower() for key in row}
+    for key, value in item.get("stats", {}).items():
+        row[f"stat_{key}" if key.lower() in attributes else key] = value
+    return row
+
+def table_rows(records) -> Tuple[List[str], List[Dict[str, object]]]:
+    """
+    Turn a data.json table into (columns, rows). Lists of records keep their keys as columns,
+    in order of first appearance; objects of objects (dice_badges) become group/key/value rows.
+    """
+    if isinstance(records, dict):
+        rows = [
+            {"group": group, "key": key, "value": value}
+            for group, values in records.items() for key, value in values.items()
+        ]
+        return ["group", "key", "value"], rows
+    columns: Dict[str, None] = {}
+    for record in records:
+        columns.update(dict.fromkeys(record))
+    return list(columns), records
+
+def _create_table(conn: sqlite3.Connection, table: str, columns: List[str], rows: List[Dict[str, object]]) -> None:
+    column_defs = ", ".join(f"{_quote(column)} {_sql_type(row.get(column) for row in rows)}" for column in columns)
+    conn.execute(f"CREATE TABLE {_quote(table)} ({column_defs})")
+    conn.executemany(
+        f"INSERT INTO {_quote(table)} VALUES ({', '.join('?' for _ in columns)})",
+        ([_sql_value(row.get(column)) for column in columns] for row in rows)
+    )
+    # Indexes are built after the bulk insert, which is much faster than maintaining them row by row
+    table_columns = {column.lower(): column for column in columns}
+    for indexed in [*INDEXED_COLUMNS, *priority_stats]:
+        column = table_columns.get(indexed.lower())
+        if column is not None:
+            conn.execute(f"CREATE INDEX {_quote(f'idx_{table}_{column}')} ON {_quote(table)} ({_quote(column)})")
+
+def export_sqlite(data: dict, output_dir: Path) -> Path:
+    """
+    Write the data.json document to output_dir/data.sqlite: an items_<subcategory> table per items
+    subcategory with the stats flattened into columns, a table per reference table, and a meta table
+    with the version.
+    The database is built in one transaction in a temp file and then moved into place.
+    """
+    sqlite_file = output_dir / "data.sqlite"
+    fd, temp_path = tempfile.mkstemp(prefix=".data.sqlite.", suffix=".tmp", dir=output_dir)
+    os.close(fd)
+    try:
+        # Transactions are managed explicitly, so the table definitions are part of the one transaction too
+        conn = sqlite3.connect(temp_path, isolation_level=None)
+        try:
+            # Nothing to recover if the build dies halfway, the temp file is discarded anyway
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("BEGIN")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (json.dumps(data.get("version")),))
+            for subcategory, items in data.get("items", {}).items():
+                rows = [flatten_item(item) for item in items]
+                _create_table(conn, f"items_{subcategory}", *table_rows(rows))
+            for table in REFERENCE_TABLES:
+                if table in data:
+                    _create_table(conn, table, *table_rows(data[table]))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        os.chmod(temp_path, NEW_FILE_MODE)
+        os.replace(temp_path, sqlite_file)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    logger.info(f"Exported data.sqlite to {os.path.relpath(sqlite_file)}")
+    return sqlite_file
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from utils.logger import logger
+from constants.dir_constants import CACHE_DIR
+from services.helper import atomic_write
+from services.build_context import BuildContext
+from services.localization_index import file_fingerprint
+from services.metrics import track
+
+# Bump when the cache layout changes so every stage reruns once
+STAGE_CACHE_FORMAT_VERSION = 1
+
+src_dir = Path(__file__).resolve().parent.parent
+
+# The stage code and the mapping tables it applies; a change to any of them reruns every stage
+STAGE_CODE_FILES = [
+    src_dir / "main.py",
+    src_dir / "templates/data_json_mappings.py",
+    src_dir / "services/extraction_plan.py",
+    src_dir / "services/item_parser.py",
+    src_dir / "services/armor_classifier.py",
+    src_dir / "services/helper.py",
+    src_dir / "services/localization_index.py",
+]
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A build stage and what it touches: the kcd2_xmls entries it parses and the data.json keys it reads and writes.
+    A stage runs after the stages that write the keys it reads, and after the stages named in `after`.
+    """
+    name: str
+    run: Callable[[Dict[str, str], BuildContext], None]
+    inputs: Tuple[str, ...]
+    writes: Tuple[str, ...]
+    reads: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+
+def _json_bytes(value) -> bytes:
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def code_hash(files: Sequence[Path] = STAGE_CODE_FILES) -> str:
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(file.name.encode('utf-8'))
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+class StageCache:
+    """
+    Outputs of the build stages under CACHE_DIR/stages, keyed by a hash of everything a stage depends on:
+    its input XMLs, the data.json keys it reads or updates, and the stage code and mapping tables.
+    Input XMLs whose size and mtime match the last run reuse the recorded content hash.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, force: bool = False):
+        self.cache_dir = cache_dir / "stages"
+        self.force = force
+        self.code = code_hash()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Stages may run on several threads
+
+    def _entry_file(self, stage: Stage) -> Path:
+        return self.cache_dir / f"{stage.name}.json"
+
+    def _load_entry(self, stage: Stage) -> dict:
+        entry_file = self._entry_file(stage)
+        if not entry_file.exists():
+            return {}
+        try:
+            with open(entry_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable stage cache {os.path.relpath(entry_file)}: {e}")
+            return {}
+        return entry if entry.get("format") == STAGE_CACHE_FORMAT_VERSION else {}
+
+    def fingerprint_inputs(self, stage: Stage, kcd2_xmls: Dict[str, str], entry: dict) -> Dict[str, Optional[dict]]:
+        """XmlId -> path, size, mtime and SHA-256 of each input; None when it is missing."""
+        cached = entry.get("inputs", {})
+        inputs: Dict[str, Optional[dict]] = {}
+        for xml_id in stage.inputs:
+            path = kcd2_xmls.get(xml_id)
+            if path is None or not Path(path).exists():
+                inputs[xml_id] = None
+                continue
+            fingerprint: dict = {"path": str(path), **file_fingerprint(Path(path), with_hash=False)}
+            previous = cached.get(xml_id)
+            if previous and all(previous[key] == fingerprint[key] for key in ("path", "size", "mtime_ns")):
+                fingerprint["sha256"] = previous["sha256"]
+            else:
+                fingerprint["sha256"] = file_fingerprint(Path(path))["sha256"]
+            inputs[xml_id] = fingerprint
+        return inputs
+
+    def stage_key(self, stage: Stage, inputs: Dict[str, Optional[dict]], data: dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(_json_bytes({
+            "format": STAGE_CACHE_FORMAT_VERSION,
+            "stage": stage.name,
+            "code": self.code,
+            "inputs": {xml_id: fingerprint and fingerprint["sha256"] for xml_id, fingerprint in inputs.items()}
+        }))
+        # Keys a stage writes are included too, since stages like xml_dice update the template in place
+        for key in dict.fromkeys([*stage.reads, *stage.writes]):
+            digest.update(key.encode('utf-8'))
+            digest.update(_json_bytes(data.get(key)))
+        return digest.hexdigest()
+
+    def run(self, stage: Stage, kcd2_xmls: Dict[str, str], ctx: BuildContext) -> bool:
+        """Run a stage, or apply its cached outputs when its inputs are unchanged. Returns True on a cache hit."""
+        with track(f"build:{stage.name}") as record:
+            record["cached"] = self._run(stage, kcd2_xmls, ctx)
+            if "items" in stage.writes:
+                record["items"] = sum(len(items) for items in ctx.data["items"].values())
+        return record["cached"]
+
+    def _run(self, stage: Stage, kcd2_xmls: Dict[str, str], ctx: BuildContext) -> bool:
+        entry = self._load_entry(stage)
+        inputs = self.fingerprint_inputs(stage, kcd2_xmls, entry)
+        key = self.stage_key(stage, inputs, ctx.data)
+
+        if not self.force and entry.get("key") == key:
+            ctx.data.update(entry["outputs"])
+            with self._lock:
+                self.hits += 1
+            logger.info(f"Stage {stage.name} is up to date, reusing its cached output")
+            return True
+
+        start = time.perf_counter()
+        stage.run(kcd2_xmls, ctx)
+        with self._lock:
+            self.misses += 1
+        # Keep the document in its JSON form, so a rebuild from the cache gives back the same document
+        outputs = json.loads(_json_bytes({key: ctx.data[key] for key in stage.writes}))
+        ctx.data.update(outputs)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self._entry_file(stage), encoding='utf-8') as f:
+            json.dump({"format": STAGE_CACHE_FORMAT_VERSION, "key": key, "inputs": inputs, "outputs": outputs}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        logger.debug(f"Stage {stage.name} ran in {time.perf_counter() - start:.2f}s")
+        return False
@@ -0,0 +1,115 @@
+import copy
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Sequence
+from utils.logger import logger
+from services.build_context import BuildContext
+from services.stage_cache import Stage, StageCache
+
+class StageError(RuntimeError):
+    """A build stage failed; `stage` is its name and the original exception is the cause."""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Build stage {stage} failed: {type(error).__name__}: {error}")
+        self.stage = stage
+
+def stage_dependencies(stages: Sequence[Stage]) -> Dict[str, List[str]]:
+    """
+    Stage name -> names of the stages it waits for: the ones that write a data.json key it reads, plus its `after`.
+    Raises ValueError for unknown stages, keys written by two stages, and cycles.
+    """
+    writers: Dict[str, str] = {}
+    for stage in stages:
+        for key in stage.writes:
+            if key in writers:
+                raise ValueError(f"Stages {writers[key]} and {stage.name} both write {key}")
+            writers[key] = stage.name
+
+    names = {stage.name for stage in stages}
+    dependencies = {}
+    for stage in stages:
+        unknown = [name for name in stage.after if name not in names]
+        if unknown:
+            raise ValueError(f"Stage {stage.name} waits for unknown stages: {', '.join(unknown)}")
+        waits = [writers[key] for key in stage.reads if key in writers and writers[key] != stage.name]
+        dependencies[stage.name] = list(dict.fromkeys([*waits, *stage.after]))
+
+    # Kahn's algorithm, only to reject cycles up front
+    remaining = {name: set(names) for name, names in dependencies.items()}
+    while remaining:
+        ready = {name for name, blockers in remaining.items() if not blockers}
+        if not ready:
+            raise ValueError(f"Build stages depend on each other in a cycle: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for blockers in remaining.values():
+            blockers.difference_update(ready)
+    return dependencies
+
+def _stage_context(stage: Stage, ctx: BuildContext, outputs: Dict[str, dict]) -> BuildContext:
+    """
+    A private document for a stage: the keys it reads and writes, with the outputs of finished stages.
+    Written keys are copied, since stages may update the template values in place.
+    """
+    merged = {key: value for stage_outputs in outputs.values() for key, value in stage_outputs.items()}
+    data = {}
+    for key in dict.fromkeys([*stage.reads, *stage.writes]):
+        value = merged[key] if key in merged else ctx.data.get(key)
+        if value is not None or key in ctx.data:
+            data[key] = copy.deepcopy(value) if key in stage.writes else value
+    return BuildContext(ctx.version, ctx.output_dir, data, ctx.formats)
+
+def run_stages(
+    stages: Sequence[Stage],
+    kcd2_xmls: Dict[str, str],
+    ctx: BuildContext,
+    cache: StageCache,
+    workers: Optional[int] = None
+) -> Dict[str, float]:
+    """
+    Run the stages on a thread pool, each as soon as the stages it depends on are done, and return the
+    seconds each one took. Outputs are merged into the document in stage order, whatever order the stages
+    finish in. The first failing stage stops the build: nothing new is started and a StageError naming it is raised.
+    """
+    dependencies = stage_dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    outputs: Dict[str, dict] = {}
+    durations: Dict[str, float] = {}
+
+    def run_stage(stage: Stage, stage_ctx: BuildContext) -> dict:
+        start = time.perf_counter()
+        cache.run(stage, kcd2_xmls, stage_ctx)
+        durations[stage.name] = time.perf_counter() - start
+        return {key: stage_ctx.data[key] for key in stage.writes}
+
+    start = time.perf_counter()
+    pending = {stage.name for stage in stages}
+    running: Dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=workers or len(stages) or 1, thread_name_prefix="build-stage") as executor:
+        while pending or running:
+            # Submit in stage order so runs are reproducible with a single worker
+            for stage in stages:
+                if stage.name in pending and all(name in outputs for name in dependencies[stage.name]):
+                    pending.discard(stage.name)
+                    running[executor.submit(run_stage, stage, _stage_context(stage, ctx, outputs))] = stage.name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    for other in running:
+                        other.cancel()
+                    if running:
+                        logger.warning(f"Waiting for {', '.join(sorted(running.values()))} to stop after {name} failed")
+                    raise StageError(name, error) from error
+                outputs[name] = future.result()
+
+    for stage in stages:
+        ctx.data.update(outputs[stage.name])
+
+    elapsed = time.perf_counter() - start
+    timings = ", ".join(f"{name} {durations[name]:.2f}s" for name in by_name)
+    logger.info(f"Build stages: {cache.misses} ran, {cache.hits} reused from the cache ({timings})")
+    logger.info(f"Build stages took {elapsed:.2f}s, {sum(durations.values()):.2f}s of stage time")
+    return durations
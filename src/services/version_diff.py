@@ -0,0 +1,160 @@
+import json
+from pathlib import Path
+from typing import Dict, List
+from utils.logger import logger
+
+def _load_json(file_path: Path):
+    if not file_path.exists():
+        logger.warning(f"{file_path} not found, diffing it as empty")
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _record_id(record):
+    return record.get("Id", record.get("id")) if isinstance(record, dict) else None
+
+def diff_fields(old: dict, new: dict) -> Dict[str, list]:
+    """Field -> [old, new] for every field that differs; a missing field is None."""
+    return {
+        key: [old.get(key), new.get(key)]
+        for key in dict.fromkeys([*old, *new])
+        if old.get(key) != new.get(key)
+    }
+
+def diff_items(old_items: Dict[str, List[dict]], new_items: Dict[str, List[dict]]) -> dict:
+    """Align the items of two data.json documents by Id and report added, removed and changed items."""
+    def by_id(items):
+        return {item["Id"]: (subcategory, item) for subcategory, entries in items.items() for item in entries}
+
+    def summary(item_id, subcategory, item):
+        return {"Id": item_id, "Name": item.get("Name"), "subcategory": subcategory}
+
+    def order(entry):
+        return entry["subcategory"], entry["Name"] or "", entry["Id"]
+
+    old_by_id, new_by_id = by_id(old_items), by_id(new_items)
+
+    added = [summary(item_id, *new_by_id[item_id]) for item_id in new_by_id.keys() - old_by_id.keys()]
+    removed = [summary(item_id, *old_by_id[item_id]) for item_id in old_by_id.keys() - new_by_id.keys()]
+    changed = []
+    for item_id in old_by_id.keys() & new_by_id.keys():
+        (old_subcategory, old_item), (new_subcategory, new_item) = old_by_id[item_id], new_by_id[item_id]
+        if old_item == new_item and old_subcategory == new_subcategory:
+            continue
+        change = summary(item_id, new_subcategory, new_item)
+        if old_subcategory != new_subcategory:
+            change["moved_from"] = old_subcategory
+        attributes = diff_fields(
+            {k: v for k, v in old_item.items() if k != "stats"}, {k: v for k, v in new_item.items() if k != "stats"}
+        )
+        stats = diff_fields(old_item.get("stats", {}), new_item.get("stats", {}))
+        if attributes:
+            change["attributes"] = attributes
+        if stats:
+            change["stats"] = stats
+        changed.append(change)
+
+    return {"added": sorted(added, key=order), "removed": sorted(removed, key=order), "changed": sorted(changed, key=order)}
+
+def diff_records(old_records, new_records) -> dict:
+    """Diff a reference table: lists of records are aligned by Id/id, anything else is compared as a whole."""
+    aligned = (
+        isinstance(old_records, list) and isinstance(new_records, list)
+        and all(_record_id(record) is not None for record in [*old_records, *new_records])
+    )
+    if not aligned:
+        return {} if old_records == new_records else {"old": old_records, "new": new_records}
+
+    old_by_id = {_record_id(record): record for record in old_records}
+    new_by_id = {_record_id(record): record for record in new_records}
+    ids = list(dict.fromkeys([*old_by_id, *new_by_id]))
+    result = {
+        "added": [new_by_id[record_id] for record_id in ids if record_id not in old_by_id],
+        "removed": [old_by_id[record_id] for record_id in ids if record_id not in new_by_id],
+        "changed": [
+            {"Id": record_id, "fields": diff_fields(old_by_id[record_id], new_by_id[record_id])}
+            for record_id in ids
+            if record_id in old_by_id and record_id in new_by_id and old_by_id[record_id] != new_by_id[record_id]
+        ]
+    }
+    return {key: value for key, value in result.items() if value}
+
+def diff_mapping(old: Dict[str, str], new: Dict[str, str]) -> dict:
+    """Diff a kcd2_icons / kcd2_xmls style mapping of Id -> path."""
+    return {
+        "added": {key: new[key] for key in sorted(new.keys() - old.keys())},
+        "removed": {key: old[key] for key in sorted(old.keys() - new.keys())},
+        "changed": {key: [old[key], new[key]] for key in sorted(old.keys() & new.keys()) if old[key] != new[key]}
+    }
+
+def diff_versions(old_dir: Path, new_dir: Path) -> dict:
+    """Compare the data.json, kcd2_icons.json and kcd2_xmls.json of two versioned output directories."""
+    old_data, new_data = _load_json(old_dir / "data.json"), _load_json(new_dir / "data.json")
+    tables = {}
+    for key in dict.fromkeys([*old_data, *new_data]):
+        if key in ("items", "version"):
+            continue
+        table_diff = diff_records(old_data.get(key), new_data.get(key))
+        if table_diff:
+            tables[key] = table_diff
+
+    return {
+        "old": old_dir.name,
+        "new": new_dir.name,
+        "items": diff_items(old_data.get("items", {}), new_data.get("items", {})),
+        "tables": tables,
+        "kcd2_icons": diff_mapping(_load_json(old_dir / "kcd2_icons.json"), _load_json(new_dir / "kcd2_icons.json")),
+        "kcd2_xmls": diff_mapping(_load_json(old_dir / "kcd2_xmls.json"), _load_json(new_dir / "kcd2_xmls.json"))
+    }
+
+def _md_value(value) -> str:
+    text = json.dumps(value, ensure_ascii=False) if not isinstance(value, str) else value
+    return text.replace("|", "\\|")
+
+def diff_to_markdown(diff: dict) -> str:
+    """Render a diff from `diff_versions` as a Markdown changelog."""
+    items = diff["items"]
+    lines = [
+        f"# Changes from {diff['old']} to {diff['new']}",
+        "",
+        "| | Added | Removed | Changed |",
+        "|---|---:|---:|---:|",
+        f"| Items | {len(items['added'])} | {len(items['removed'])} | {len(items['changed'])} |",
+    ]
+    for key in ("kcd2_icons", "kcd2_xmls"):
+        mapping = diff[key]
+        lines.append(f"| {key} | {len(mapping['added'])} | {len(mapping['removed'])} | {len(mapping['changed'])} |")
+
+    for title, entries in (("Added items", items["added"]), ("Removed items", items["removed"])):
+        if entries:
+            lines += ["", f"## {title}", ""]
+            lines += [f"- **{entry['Name']}** ({entry['subcategory']}, `{entry['Id']}`)" for entry in entries]
+
+    if items["changed"]:
+        lines += ["", "## Changed items"]
+        for entry in items["changed"]:
+            lines += ["", f"### {entry['Name']} ({entry['subcategory']}, `{entry['Id']}`)", ""]
+            if "moved_from" in entry:
+                lines.append(f"Moved from {entry['moved_from']}.")
+                lines.append("")
+            if not entry.get("attributes") and not entry.get("stats"):
+                continue
+            lines += ["| Field | Old | New |", "|---|---|---|"]
+            for group in ("attributes", "stats"):
+                for field, (old, new) in entry.get(group, {}).items():
+                    lines.append(f"| {field} | {_md_value(old)} | {_md_value(new)} |")
+
+    if diff["tables"]:
+        lines += ["", "## Reference tables", ""]
+        for key, table_diff in diff["tables"].items():
+            counts = ", ".join(f"{len(value)} {kind}" for kind, value in table_diff.items() if kind in ("added", "removed", "changed"))
+            lines.append(f"- **{key}**: {counts or 'replaced'}")
+
+    for key in ("kcd2_icons", "kcd2_xmls"):
+        mapping = diff[key]
+        if any(mapping.values()):
+            lines += ["", f"## {key}", ""]
+            lines += [f"- Added `{name}`" for name in mapping["added"]]
+            lines += [f"- Removed `{name}`" for name in mapping["removed"]]
+            lines += [f"- Changed `{name}`: {old} -> {new}" for name, (old, new) in mapping["changed"].items()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The code imports from src/, the way main.py and the scripts run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,32 @@
+from services.armor_classifier import ArmorTypeClassifier, ArmorTypeStats
+
+ARMOR_TYPES = [
+    {"Id": 1, "Name": "Head", "filters": ["Hood", "helmet"]},
+    {"Id": 2, "Name": "Body", "filters": ["gambeson", "hood"]},
+    {"Id": 3, "Name": "Legs", "filters": ["hose"]},
+]
+
+def test_first_listed_filter_wins_wherever_it_matches():
+    classifier = ArmorTypeClassifier(ARMOR_TYPES)
+    # "hood" belongs to Head, listed first, even though Body lists it too
+    assert classifier.classify("Gambeson with hood") == 1
+    assert classifier.classify("Padded GAMBESON") == 2
+    assert classifier.classify("Hose") == 3
+    assert classifier.classify("Ring") is None
+
+def test_stats_count_matches_and_merge():
+    classifier = ArmorTypeClassifier(ARMOR_TYPES)
+    for name in ("Helmet", "Hood", "Hose", "Ring"):
+        classifier.classify(name)
+    other = ArmorTypeStats()
+    other.counts[3] += 1
+    other.unmatched.append("Belt")
+    classifier.stats.merge(other)
+
+    assert classifier.stats.counts == {1: 2, 3: 2}
+    assert classifier.stats.unmatched == ["Ring", "Belt"]
+    assert classifier.stats.summary(ARMOR_TYPES) == "4 armors classified (Head: 2, Legs: 2), 2 unmatched"
+
+def test_no_filters_matches_nothing():
+    classifier = ArmorTypeClassifier([{"Id": 1, "Name": "Head"}])
+    assert classifier.classify("Helmet") is None
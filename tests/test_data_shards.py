@@ -0,0 +1,38 @@
+import json
+from services.data_shards import SHARD_MANIFEST, id_range, split_shards, write_data_shards
+
+DATA = {
+    "version": {"Branch": {"version": "1.2"}},
+    "categories": ["weapons", "armors"],
+    "items": {"weapons": [{"Id": "b"}, {"Id": "a"}], "armors": [{"Id": "c"}]},
+    "weapon_types": [{"id": 2}, {"id": 1}],
+    "dice_badges": {"types": {"1": "x"}}
+}
+
+def test_id_range():
+    assert id_range([{"Id": "b"}, {"Id": "a"}, {"Name": "no id"}]) == ["a", "b"]
+    assert id_range([{"id": 2}, {"id": 1}]) == [1, 2]
+    assert id_range([{"Id": 1}, {"Id": "a"}]) is None  # Not comparable
+    assert id_range({"types": {}}) is None
+
+def test_split_shards_keeps_the_version_out():
+    shards = split_shards(DATA)
+    assert set(shards) == {"items.weapons", "items.armors", "weapon_types", "dice_badges", "core"}
+    assert shards["core"] == {"categories": ["weapons", "armors"]}
+
+def test_write_data_shards(tmp_path):
+    (tmp_path / "shards").mkdir()
+    (tmp_path / "shards/items.gone.json").write_text("[]")
+    manifest_file = write_data_shards(DATA, tmp_path)
+    assert manifest_file == tmp_path / "shards" / SHARD_MANIFEST
+    manifest = json.loads(manifest_file.read_text())
+    assert manifest["version"] == DATA["version"]
+    assert manifest["shards"]["items.weapons"]["count"] == 2
+    assert manifest["shards"]["items.weapons"]["id_range"] == ["a", "b"]
+    assert json.loads((tmp_path / "shards/items.weapons.json").read_text()) == DATA["items"]["weapons"]
+    assert not (tmp_path / "shards/items.gone.json").exists()
+
+    # A new version with the same content keeps every shard hash
+    hashes = {name: entry["sha256"] for name, entry in manifest["shards"].items()}
+    manifest = json.loads(write_data_shards({**DATA, "version": {"Branch": {"version": "1.3"}}}, tmp_path).read_text())
+    assert {name: entry["sha256"] for name, entry in manifest["shards"].items()} == hashes
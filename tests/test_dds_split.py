@@ -0,0 +1,34 @@
+import pytest
+from services.dds_split import DDS_HEADER_SIZE, dds_header_size, merge_split_dds, split_part_number
+
+def dds_file(four_cc=b'DXT5', extra=b''):
+    header = bytearray(DDS_HEADER_SIZE)
+    header[:4] = b'DDS '
+    header[84:88] = four_cc
+    return bytes(header) + extra
+
+def test_split_part_number():
+    assert split_part_number("icon.dds.1") == 1
+    assert split_part_number("ICON.DDS.12") == 12
+    assert split_part_number("icon.dds") is None
+    assert split_part_number("icon.dds.1a") is None
+
+def test_merge_puts_largest_mips_first():
+    dds = dds_file(extra=b'small')
+    merged = merge_split_dds(dds, {1: b'mid', 3: b'largest', 2: b'big'})
+    assert merged == dds[:DDS_HEADER_SIZE] + b'largest' + b'big' + b'mid' + b'small'
+    assert merge_split_dds(dds, {}) == dds
+
+def test_merge_keeps_the_dx10_header():
+    dx10 = b'x' * 20
+    dds = dds_file(b'DX10', dx10 + b'small')
+    assert dds_header_size(dds) == DDS_HEADER_SIZE + 20
+    assert merge_split_dds(dds, {1: b'big'}) == dds[:DDS_HEADER_SIZE] + dx10 + b'big' + b'small'
+
+def test_merge_rejects_missing_chunks_and_other_files():
+    with pytest.raises(ValueError, match=r"\.dds\.2"):
+        merge_split_dds(dds_file(), {1: b'a', 3: b'c'})
+    with pytest.raises(ValueError, match="Not a DDS"):
+        merge_split_dds(b'PNG', {1: b'a'})
+    with pytest.raises(ValueError, match="Truncated"):
+        dds_header_size(dds_file(b'DX10'))
@@ -0,0 +1,78 @@
+import os
+import random
+import zipfile
+import pytest
+from scripts import extract_icon
+from scripts.synthetic_install import ICONS_PREFIX, dxt5, icon_image
+from services.pak_index import load_pak_index
+from utils.logger import logger
+
+def write_icon_pak(pak_path, images):
+    """Write the icons, given as images or as DDS bytes, into an icon pak."""
+    with zipfile.ZipFile(pak_path, 'w', zipfile.ZIP_DEFLATED) as pak:
+        for icon_id, image in images.items():
+            pak.writestr(f"{ICONS_PREFIX}{icon_id}_icon.dds", image if isinstance(image, bytes) else dxt5(image))
+
+def with_reserved_bytes(dds, value):
+    """The same DDS, with other bytes in the header's reserved field."""
+    return dds[:32] + value + dds[32 + len(value):]
+
+@pytest.fixture
+def icon_build(tmp_path, monkeypatch):
+    """Run process_icons against a pak under tmp_path, starting kcd2_icons from the icons directory like a fresh run."""
+    pak_path = tmp_path / "IPL_GameData.pak"
+    output_dir = tmp_path / "src/data/icons"
+    output_dir.mkdir(parents=True)
+    monkeypatch.setattr(extract_icon, "compressed_icons_file", pak_path)
+    monkeypatch.setattr(extract_icon, "base_dir", tmp_path)
+    monkeypatch.setattr(extract_icon, "output_dir", output_dir)
+    monkeypatch.setattr(extract_icon, "temp_dds_dir", output_dir / "temp")
+    monkeypatch.setattr(extract_icon, "conv_dds_dir", output_dir / "temp/conv")
+    monkeypatch.setattr(extract_icon, "manifest_file", output_dir / ".extract_manifest.json")
+    monkeypatch.setattr(extract_icon, "load_pak_index", lambda path: load_pak_index(path, tmp_path / "cache"))
+
+    def build(images):
+        write_icon_pak(pak_path, images)
+        # The same index prepare_extraction builds from the icons directory
+        kcd2_icons = {
+            file[:-len('.webp')].replace('_icon', ''): os.path.relpath(os.path.join(root, file), tmp_path).replace('\\', '/')
+            for root, _, files in os.walk(output_dir) for file in files if file.endswith('.webp')
+        }
+        return extract_icon.process_icons(logger, kcd2_icons, workers=1, convert_workers=1)[5]
+    return build
+
+def test_identical_icons_share_one_webp(icon_build, tmp_path):
+    rng = random.Random(1)
+    shared = icon_image(rng, 64)
+    icons = icon_build({"a": shared, "b": shared, "c": icon_image(rng, 64)})
+    assert set(icons) == {"a", "b", "c"}
+    assert icons["b"] == icons["a"] != icons["c"]
+    assert sorted(path.name for path in (tmp_path / "src/data/icons").glob("*.webp")) == ["a_icon.webp", "c_icon.webp"]
+
+def test_identical_pixels_are_encoded_once(icon_build, monkeypatch):
+    encoded = []
+    encode_pak_icon = extract_icon.encode_pak_icon
+    def counting_encode(pak_path, entries):
+        result = encode_pak_icon(pak_path, entries)
+        encoded.append(result[1] is not None)
+        return result
+    monkeypatch.setattr(extract_icon, "encode_pak_icon", counting_encode)
+
+    dds = dxt5(icon_image(random.Random(1), 64))
+    icons = icon_build({"a": dds, "b": with_reserved_bytes(dds, b"KCD2")})
+    assert icons["b"] == icons["a"]
+    # Both icons are decoded and hashed, but only one is encoded
+    assert sorted(encoded) == [False, True]
+
+def test_removed_icon_with_aliases_stays_removed(icon_build, tmp_path):
+    rng = random.Random(1)
+    shared, other = icon_image(rng, 64), icon_image(rng, 64)
+    icon_build({"a": shared, "b": shared, "d": shared, "c": other})
+
+    # "a" owns the WEBP that "b" and "d" alias; removing it must not bring it back on later runs
+    for _ in range(2):
+        icons = icon_build({"b": shared, "d": shared, "c": other})
+        assert set(icons) == {"b", "c", "d"}
+        assert icons["d"] == icons["b"] == "src/data/icons/b_icon.webp"
+        assert (tmp_path / icons["b"]).exists()
+    assert not (tmp_path / "src/data/icons/a_icon.webp").exists()
@@ -0,0 +1,51 @@
+from services.extract_manifest import ExtractManifest
+
+def test_record_is_current_and_reload(tmp_path):
+    manifest = ExtractManifest.load(tmp_path / "manifest.json")
+    manifest.record("weapon", "xml/weapon.xml", {"Libs/weapon.xml": (123, 10)})
+    assert manifest.is_current("weapon", {"Libs/weapon.xml": (123, 10)})
+    assert not manifest.is_current("weapon", {"Libs/weapon.xml": (124, 10)})
+    assert not manifest.is_current("armor", {})
+    manifest.record("weapon", "xml/weapon.xml", {"Libs/weapon.xml": (124, 10)})
+    assert manifest.changes == {"added": 1, "changed": 1, "removed": 0}
+
+    manifest.save()
+    reloaded = ExtractManifest.load(tmp_path / "manifest.json")
+    assert reloaded.entries == manifest.entries
+    (tmp_path / "manifest.json").write_text("{")
+    assert ExtractManifest.load(tmp_path / "manifest.json").entries == {}
+
+def test_remove_missing_deletes_unshared_outputs(tmp_path):
+    (tmp_path / "a.webp").write_bytes(b"a")
+    (tmp_path / "c.webp").write_bytes(b"c")
+    manifest = ExtractManifest(tmp_path / "manifest.json", {})
+    manifest.record("a", "a.webp", {"a.dds": (1, 1)})
+    manifest.record("c", "c.webp", {"c.dds": (2, 1)})
+
+    assert manifest.remove_missing({"c"}, tmp_path) == ["a"]
+    assert not (tmp_path / "a.webp").exists()
+    assert (tmp_path / "c.webp").exists()
+    assert manifest.changes["removed"] == 1
+
+def test_remove_missing_moves_shared_output_to_a_remaining_key(tmp_path):
+    (tmp_path / "a.webp").write_bytes(b"shared")
+    manifest = ExtractManifest(tmp_path / "manifest.json", {})
+    for key in ("a", "d", "b"):
+        manifest.record(key, "a.webp", {f"{key}.dds": (1, 1)})
+    own_outputs = {key: f"{key}.webp" for key in ("a", "b", "d")}
+
+    assert manifest.remove_missing({"b", "d"}, tmp_path, own_outputs) == ["a"]
+    # The first remaining key by name takes over the file, and every sharer points at it
+    assert not (tmp_path / "a.webp").exists()
+    assert (tmp_path / "b.webp").read_bytes() == b"shared"
+    assert {key: entry["output"] for key, entry in manifest.entries.items()} == {"b": "b.webp", "d": "b.webp"}
+
+def test_remove_missing_keeps_shared_output_without_own_outputs(tmp_path):
+    (tmp_path / "a.webp").write_bytes(b"shared")
+    manifest = ExtractManifest(tmp_path / "manifest.json", {})
+    manifest.record("a", "a.webp", {"a.dds": (1, 1)})
+    manifest.record("b", "a.webp", {"b.dds": (1, 1)})
+
+    manifest.remove_missing({"b"}, tmp_path)
+    assert (tmp_path / "a.webp").exists()
+    assert manifest.entries["b"]["output"] == "a.webp"
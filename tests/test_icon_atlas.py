@@ -0,0 +1,49 @@
+import json
+import random
+import pytest
+from PIL import Image
+from services import icon_atlas
+from scripts.synthetic_install import icon_image
+
+@pytest.fixture
+def atlas_build(tmp_path, monkeypatch):
+    """Build atlases of icons written under tmp_path; returns the index and how many sheets were drawn."""
+    monkeypatch.setattr(icon_atlas, "base_dir", tmp_path)
+    (tmp_path / "icons").mkdir()
+    drawn = []
+    new_image = Image.new
+    monkeypatch.setattr(icon_atlas.Image, "new", lambda *args, **kwargs: drawn.append(args) or new_image(*args, **kwargs))
+
+    def build(images, sheets=1):
+        kcd2_icons = {}
+        for IconId, image in images.items():
+            image.save(tmp_path / f"icons/{IconId}_icon.webp", 'WEBP')
+            kcd2_icons[IconId] = f"icons/{IconId}_icon.webp"
+        items = {"weapons": [{"IconId": IconId} for IconId in images]}
+        drawn.clear()
+        index_file = icon_atlas.build_icon_atlases(items, kcd2_icons, tmp_path / "out", sheets)
+        return json.loads(index_file.read_text()), len(drawn)
+    return build
+
+def test_atlas_places_every_icon(atlas_build):
+    rng = random.Random(1)
+    index, drawn = atlas_build({f"icon{i}": icon_image(rng, 32 + 8 * i) for i in range(6)}, sheets=2)
+    assert drawn == len(index["sheets"]) == 2
+    assert sorted(index["icons"]) == [f"icon{i}" for i in range(6)]
+    assert all(rect["w"] == rect["h"] == 32 + 8 * int(IconId[4:]) for IconId, rect in index["icons"].items())
+
+def test_unchanged_sheets_are_not_redrawn(atlas_build, tmp_path):
+    rng = random.Random(1)
+    images = {f"icon{i}": icon_image(rng, 32) for i in range(6)}
+    first, _ = atlas_build(images)
+    again, drawn = atlas_build(images)
+    assert drawn == 0
+    assert again == first
+
+    # A changed icon, or a sheet file that no longer matches the index, redraws the sheet
+    images["icon3"] = icon_image(rng, 32)
+    changed, drawn = atlas_build(images)
+    assert drawn == 1 and changed["sheets"]["weapons_0"]["key"] != first["sheets"]["weapons_0"]["key"]
+    (tmp_path / changed["sheets"]["weapons_0"]["file"]).write_bytes(b"")
+    restored, drawn = atlas_build(images)
+    assert drawn == 1 and restored == changed
@@ -0,0 +1,76 @@
+import json
+import mmap
+import pytest
+from services import item_store
+from services.item_store import ItemStore, MISSING_INT
+
+DATA = {
+    "version": {"Branch": {"version": "1.2"}},
+    "items": {
+        "armors": [
+            {"Id": "a1", "Name": "Hood", "IconId": "hood", "stats": {"DefenseSlash": 3, "Weight": 0.7, "Material": "cloth"}},
+            {"Id": "a2", "Name": "Coat", "IconId": "coat", "stats": {"DefenseSlash": 25, "Weight": 4}},
+            {"Id": "a3", "Name": "Cap", "IconId": "hood", "stats": {"Weight": 0.2, "Material": "felt"}},
+        ],
+        "weapons": [{"Id": "w1", "Name": "Sword", "IconId": "sword", "stats": {"Attack": 75, "Bonus": True}}]
+    },
+    "weapon_types": [{"id": 1, "name": "sword"}]
+}
+
+@pytest.fixture
+def data_json(tmp_path):
+    path = tmp_path / "1.2/data.json"
+    path.parent.mkdir()
+    path.write_text(json.dumps(DATA))
+    return path
+
+def check_store(store):
+    assert store.version == DATA["version"] and store.other["weapon_types"] == DATA["weapon_types"]
+    for subcategory, items in DATA["items"].items():
+        assert list(store.items(subcategory)) == items
+    assert store.get("a2")["Name"] == "Coat" and store.get("missing") is None
+    assert [item["Id"] for item in store.by_icon("hood")] == ["a1", "a3"]
+    assert [item["Id"] for item in store.range("armors", "DefenseSlash", low=3)] == ["a1", "a2"]
+    assert [item["Id"] for item in store.range("armors", "Weight", high=1)] == ["a3", "a1"]
+
+def test_store_without_cache(data_json):
+    store = ItemStore.open(data_json, cache_dir=None)
+    check_store(store)
+    assert list(store.column("armors", "DefenseSlash")) == [3, 25, MISSING_INT]
+    # Text and bool stats stay plain lists
+    assert store.column("armors", "Material") == ["cloth", None, "felt"]
+    assert store.column("weapons", "Bonus") == [True]
+
+def test_store_from_cache_matches_data_json(data_json, tmp_path):
+    check_store(ItemStore.open(data_json, tmp_path / "cache"))
+    cached = ItemStore.open(data_json, tmp_path / "cache")
+    assert cached.tables and cached._mmap is not None  # Loaded from the cache file, not data.json
+    check_store(cached)
+    cached.close()
+
+def test_changed_data_json_is_read_again(data_json, tmp_path):
+    ItemStore.open(data_json, tmp_path / "cache").tables
+    changed = json.loads(json.dumps(DATA))
+    changed["items"]["weapons"][0]["Name"] = "Longsword"
+    data_json.write_text(json.dumps(changed))
+    assert ItemStore.open(data_json, tmp_path / "cache").get("w1")["Name"] == "Longsword"
+
+def test_broken_cache_is_closed_and_rebuilt(data_json, tmp_path, monkeypatch):
+    store = ItemStore.open(data_json, tmp_path / "cache")
+    store.tables
+    cache_file = store._cache_file(tmp_path / "cache")
+    header_size = int.from_bytes(cache_file.read_bytes()[:8], 'little')
+    header = json.loads(cache_file.read_bytes()[8:8 + header_size])
+    # Same header size, but the second column cannot be cast, after the first one is already mapped
+    header["tables"]["armors"]["stats"]["Weight"]["type"] = "x"
+    raw = json.dumps(header, separators=(',', ':')).encode('utf-8').ljust(header_size)
+    cache_file.write_bytes(cache_file.read_bytes()[:8] + raw + cache_file.read_bytes()[8 + header_size:])
+
+    mappings = []
+    real_mmap = mmap.mmap
+    def recording_mmap(*args, **kwargs):
+        mappings.append(real_mmap(*args, **kwargs))
+        return mappings[-1]
+    monkeypatch.setattr(item_store.mmap, "mmap", recording_mmap)
+    check_store(ItemStore.open(data_json, tmp_path / "cache"))
+    assert len(mappings) == 1 and mappings[0].closed
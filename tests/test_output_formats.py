@@ -0,0 +1,53 @@
+import json
+import pytest
+from services import output_formats
+from services.output_formats import OUTPUT_FORMATS, brotli, pack, unpack, parse_output_formats, write_outputs
+
+FORMATS = [name for name in OUTPUT_FORMATS if name != "br" or brotli is not None]
+
+STRING_KEYED = {
+    "version": "1.2",
+    "items": {"weapons": [{"Id": "a", "Name": "Sword", "stats": {"Attack": 75, "Weight": 2.5, "Noise": -0.1}}]},
+    "armor_types": [{"Id": 1, "filters": ["hood", "čepice"]}],
+    "empty": {},
+    "flags": [True, False, None]
+}
+# dice_badges stores its types and subtypes under int keys
+INT_KEYED = {"dice_badges": {"types": {1: "a", 2: "b"}, "subtypes": {10: {"name": "x"}}}}
+
+def decode_file(name, file_path):
+    return OUTPUT_FORMATS[name][2](file_path.read_bytes())
+
+@pytest.mark.parametrize("name", FORMATS)
+@pytest.mark.parametrize("data", [STRING_KEYED, INT_KEYED], ids=["string_keys", "int_keys"])
+def test_every_format_decodes_to_the_json_document(tmp_path, name, data):
+    written = write_outputs(data, tmp_path / "data.json", [name])
+    assert [path.name for path in written] == ["data" + OUTPUT_FORMATS[name][0]]
+    # Every format carries the document as JSON represents it, so int keys come back as strings
+    assert decode_file(name, written[0]) == json.loads(json.dumps(data))
+
+def test_formats_carry_the_same_document(tmp_path):
+    written = write_outputs(INT_KEYED, tmp_path / "data.json", FORMATS)
+    documents = [decode_file(name, path) for name, path in zip(FORMATS, written)]
+    assert all(document == documents[0] for document in documents)
+
+def test_json_output_keeps_the_indented_layout(tmp_path):
+    (written,) = write_outputs(STRING_KEYED, tmp_path / "data.json", ["json"])
+    assert written.read_bytes() == json.dumps(STRING_KEYED, indent=4).encode("utf-8")
+
+def test_only_formats_that_need_it_are_normalized(tmp_path, monkeypatch):
+    normalized = []
+    minified = output_formats._minified
+    monkeypatch.setattr(output_formats, "_minified", lambda data: normalized.append(data) or minified(data))
+    write_outputs(INT_KEYED, tmp_path / "data.json", ["json"])
+    assert normalized == []
+    write_outputs(INT_KEYED, tmp_path / "data.json", ["json", "msgpack"])
+    assert normalized == [INT_KEYED]
+
+@pytest.mark.parametrize("value", [0, 127, 128, -1, -32, -33, 2 ** 16, -2 ** 31, 2 ** 64 - 1, -2 ** 63, 1.5, "", "x" * 40, "ü" * 300, [None] * 20, {str(i): i for i in range(20)}])
+def test_msgpack_round_trips(value):
+    assert unpack(pack(value)) == value
+
+def test_unknown_formats_are_rejected():
+    with pytest.raises(ValueError, match="yaml"):
+        parse_output_formats("json,yaml")
@@ -0,0 +1,44 @@
+import json
+import sqlite3
+from services.sqlite_export import export_sqlite, flatten_item, table_rows
+
+DATA = {
+    "version": {"Branch": {"version": "1.2"}},
+    "items": {
+        "weapons": [
+            {"Id": "w1", "Name": "Sword", "stats": {"Attack": 75, "Weight": 2.5, "Name": "stat named like an attribute"}},
+            {"Id": "w2", "Name": "Axe", "stats": {"Attack": 60}},
+        ]
+    },
+    "armor_types": [{"id": 1, "name": "hood", "filters": ["hood", "čepice"]}],
+    "dice_badges": {"types": {"1": "reroll"}, "subtypes": {"10": "silver"}}
+}
+
+def test_flatten_item_prefixes_stats_named_like_attributes():
+    row = flatten_item(DATA["items"]["weapons"][0])
+    assert row == {"Id": "w1", "Name": "Sword", "Attack": 75, "Weight": 2.5, "stat_Name": "stat named like an attribute"}
+
+def test_table_rows_of_records_and_groups():
+    columns, rows = table_rows([{"a": 1}, {"b": 2, "a": 3}])
+    assert columns == ["a", "b"] and rows == [{"a": 1}, {"b": 2, "a": 3}]
+    columns, rows = table_rows(DATA["dice_badges"])
+    assert columns == ["group", "key", "value"]
+    assert rows == [{"group": "types", "key": "1", "value": "reroll"}, {"group": "subtypes", "key": "10", "value": "silver"}]
+
+def test_export_sqlite(tmp_path):
+    sqlite_file = export_sqlite(DATA, tmp_path)
+    assert sqlite_file == tmp_path / "data.sqlite"
+    assert [path.name for path in tmp_path.iterdir()] == ["data.sqlite"]  # No temp file left behind
+    conn = sqlite3.connect(sqlite_file)
+    try:
+        assert json.loads(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]) == DATA["version"]
+        rows = conn.execute('SELECT "Id", "Attack", "Weight", "stat_Name" FROM items_weapons ORDER BY "Attack"').fetchall()
+        assert rows == [("w2", 60, None, None), ("w1", 75, 2.5, "stat named like an attribute")]
+        assert conn.execute("SELECT filters FROM armor_types").fetchone()[0] == '["hood", "čepice"]'
+        assert conn.execute("SELECT COUNT(*) FROM dice_badges").fetchone()[0] == 2
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_items_weapons_Id", "idx_items_weapons_Name"} <= indexes
+        types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(items_weapons)")}
+        assert types["Attack"] == "INTEGER" and types["Weight"] == "REAL" and types["Name"] == "TEXT"
+    finally:
+        conn.close()
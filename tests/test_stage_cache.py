@@ -0,0 +1,42 @@
+from services.build_context import BuildContext
+from services.stage_cache import Stage, StageCache
+
+def counting_stage(runs):
+    """A stage copying the XML into data["weapons"] and counting its runs."""
+    def run(kcd2_xmls, ctx):
+        runs.append(1)
+        with open(kcd2_xmls["weapon"]) as f:
+            ctx.data["weapons"] = {"text": f.read(), "base": ctx.data["base"]}
+    return Stage("xml_weapons", run, inputs=("weapon",), writes=("weapons",), reads=("base",))
+
+def test_hit_then_miss_after_input_change(tmp_path):
+    xml = tmp_path / "weapon.xml"
+    xml.write_text("<a/>")
+    kcd2_xmls = {"weapon": str(xml)}
+    runs = []
+    stage = counting_stage(runs)
+    cache = StageCache(tmp_path / "cache")
+
+    first = BuildContext("1.0", tmp_path, {"base": 1})
+    assert cache.run(stage, kcd2_xmls, first) is False
+    second = BuildContext("1.0", tmp_path, {"base": 1})
+    assert cache.run(stage, kcd2_xmls, second) is True
+    assert second.data == first.data == {"base": 1, "weapons": {"text": "<a/>", "base": 1}}
+    assert len(runs) == 1
+
+    xml.write_text("<b/>")
+    changed = BuildContext("1.0", tmp_path, {"base": 1})
+    assert cache.run(stage, kcd2_xmls, changed) is False
+    assert changed.data["weapons"]["text"] == "<b/>"
+    assert (len(runs), cache.hits, cache.misses) == (2, 1, 2)
+
+def test_miss_after_read_key_change_and_when_forced(tmp_path):
+    xml = tmp_path / "weapon.xml"
+    xml.write_text("<a/>")
+    runs = []
+    stage = counting_stage(runs)
+    StageCache(tmp_path / "cache").run(stage, {"weapon": str(xml)}, BuildContext("1.0", tmp_path, {"base": 1}))
+
+    assert StageCache(tmp_path / "cache").run(stage, {"weapon": str(xml)}, BuildContext("1.0", tmp_path, {"base": 2})) is False
+    assert StageCache(tmp_path / "cache", force=True).run(stage, {"weapon": str(xml)}, BuildContext("1.0", tmp_path, {"base": 2})) is False
+    assert len(runs) == 3
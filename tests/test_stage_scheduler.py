@@ -0,0 +1,60 @@
+import threading
+import pytest
+from services.build_context import BuildContext
+from services.stage_cache import Stage, StageCache
+from services.stage_scheduler import StageError, run_stages, stage_dependencies
+
+def writer(name, key, value, reads=(), order=None):
+    def run(kcd2_xmls, ctx):
+        if order is not None:
+            order.append(name)
+        ctx.data[key] = value(ctx.data) if callable(value) else value
+    return Stage(name, run, inputs=(), writes=(key,), reads=reads)
+
+def test_dependencies_follow_reads_and_reject_cycles():
+    stages = [writer("b", "y", 0, reads=("x",)), writer("a", "x", 0)]
+    assert stage_dependencies(stages) == {"b": ["a"], "a": []}
+    with pytest.raises(ValueError, match="cycle"):
+        stage_dependencies([writer("a", "x", 0, reads=("y",)), writer("b", "y", 0, reads=("x",))])
+    with pytest.raises(ValueError, match="both write"):
+        stage_dependencies([writer("a", "x", 0), writer("b", "x", 0)])
+
+def test_stages_run_after_what_they_read(tmp_path):
+    order = []
+    stages = [
+        writer("double", "doubled", lambda data: data["base"] * 2, reads=("base",), order=order),
+        writer("base", "base", 21, order=order),
+    ]
+    ctx = BuildContext("1.0", tmp_path, {})
+    durations = run_stages(stages, {}, ctx, StageCache(tmp_path / "cache"), workers=1)
+    assert order == ["base", "double"]
+    assert ctx.data == {"doubled": 42, "base": 21}
+    assert set(durations) == {"base", "double"}
+
+def test_failing_stage_raises_stage_error_and_stops_the_build(tmp_path):
+    started = []
+    release = threading.Event()
+
+    def slow(kcd2_xmls, ctx):
+        started.append("slow")
+        release.wait(5)
+        ctx.data["slow"] = 1
+
+    def fail(kcd2_xmls, ctx):
+        started.append("fail")
+        release.set()
+        raise KeyError("Id")
+
+    stages = [
+        Stage("slow", slow, inputs=(), writes=("slow",)),
+        Stage("fail", fail, inputs=(), writes=("fail",)),
+        writer("after", "after", 1, reads=("fail",), order=started),
+    ]
+    ctx = BuildContext("1.0", tmp_path, {"kept": True})
+    with pytest.raises(StageError) as excinfo:
+        run_stages(stages, {}, ctx, StageCache(tmp_path / "cache"), workers=2)
+    assert excinfo.value.stage == "fail"
+    assert isinstance(excinfo.value.__cause__, KeyError)
+    # The stage waiting on the failed one never starts and the document is left untouched
+    assert "after" not in started
+    assert ctx.data == {"kept": True}
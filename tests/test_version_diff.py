@@ -0,0 +1,66 @@
+import json
+from services.version_diff import diff_items, diff_mapping, diff_records, diff_to_markdown, diff_versions
+
+OLD = {
+    "version": {"Branch": {"version": "1.1"}},
+    "items": {
+        "weapons": [
+            {"Id": "w1", "Name": "Sword", "stats": {"Attack": 70}},
+            {"Id": "w2", "Name": "Axe", "stats": {"Attack": 60}},
+        ],
+        "armors": [{"Id": "a1", "Name": "Hood", "stats": {}}]
+    },
+    "weapon_types": [{"id": 1, "name": "sword"}]
+}
+NEW = {
+    "version": {"Branch": {"version": "1.2"}},
+    "items": {
+        "weapons": [
+            {"Id": "w1", "Name": "Sword", "stats": {"Attack": 75, "Weight": 2}},
+            {"Id": "a1", "Name": "Hood", "stats": {}},
+            {"Id": "w3", "Name": "Mace", "stats": {}},
+        ]
+    },
+    "weapon_types": [{"id": 1, "name": "longsword"}, {"id": 2, "name": "mace"}]
+}
+
+def test_diff_items():
+    diff = diff_items(OLD["items"], NEW["items"])
+    assert diff["added"] == [{"Id": "w3", "Name": "Mace", "subcategory": "weapons"}]
+    assert diff["removed"] == [{"Id": "w2", "Name": "Axe", "subcategory": "weapons"}]
+    assert diff["changed"] == [
+        {"Id": "a1", "Name": "Hood", "subcategory": "weapons", "moved_from": "armors"},
+        {"Id": "w1", "Name": "Sword", "subcategory": "weapons", "stats": {"Attack": [70, 75], "Weight": [None, 2]}},
+    ]
+
+def test_diff_records():
+    assert diff_records(OLD["weapon_types"], NEW["weapon_types"]) == {
+        "added": [{"id": 2, "name": "mace"}],
+        "changed": [{"Id": 1, "fields": {"name": ["sword", "longsword"]}}]
+    }
+    assert diff_records({"a": 1}, {"a": 1}) == {}
+    assert diff_records({"a": 1}, {"a": 2}) == {"old": {"a": 1}, "new": {"a": 2}}
+
+def test_diff_mapping():
+    assert diff_mapping({"a": "1", "b": "2"}, {"b": "3", "c": "4"}) == {
+        "added": {"c": "4"}, "removed": {"a": "1"}, "changed": {"b": ["2", "3"]}
+    }
+
+def test_diff_versions_and_markdown(tmp_path):
+    for name, data in (("1.1", OLD), ("1.2", NEW)):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "data.json").write_text(json.dumps(data))
+    (tmp_path / "1.2/kcd2_icons.json").write_text(json.dumps({"mace": "icons/mace.webp"}))
+
+    diff = diff_versions(tmp_path / "1.1", tmp_path / "1.2")
+    assert (diff["old"], diff["new"]) == ("1.1", "1.2")
+    assert set(diff["tables"]) == {"weapon_types"}  # The version itself is not a change
+    assert diff["kcd2_icons"]["added"] == {"mace": "icons/mace.webp"}
+    assert diff["kcd2_xmls"] == {"added": {}, "removed": {}, "changed": {}}  # Missing on both sides
+
+    markdown = diff_to_markdown(diff)
+    assert markdown.startswith("# Changes from 1.1 to 1.2\n")
+    assert "| Items | 1 | 1 | 2 |" in markdown
+    assert "| Attack | 70 | 75 |" in markdown
+    assert "Moved from armors." in markdown
+    assert "- **weapon_types**: 1 added, 1 changed" in markdown